@@ -0,0 +1,129 @@
+"""Cascade evaluation vs running all three models on every reading.
+
+Trains one ensemble on normal readings and replays a stream with injected
+anomalies through detectors that share it: full evaluation, the cascade
+with full votes on flagged readings, and the plain cascade. Reports the
+measured model costs against the configured cascade order, per-model calls (and how many of
+the full run's IF/SVM calls were saved), per-reading latency, and agreement
+with the full run on is_anomaly and on explanation confidence of flagged
+readings.
+
+Usage:
+    python -m benchmarks.bench_cascade --readings 3000 --batch-readings 100000
+"""
+import argparse
+import time
+import numpy as np
+from src.config import FEATURE_COLUMNS
+from src.ml_engine import AnomalyDetector, MODEL_NAMES
+from src.records import to_block, iter_readings
+from src.simulator import SensorSimulator, ANOMALY_TYPES
+
+SHORT_NAMES = {'Isolation Forest': 'IF', 'One-Class SVM': 'SVM'}
+MODES = {
+    'full': dict(cascade=False),
+    'cascade+full_votes': dict(cascade=True, full_votes=True),
+    'cascade': dict(cascade=True, full_votes=False)
+}
+
+
+def make_stream(num_training: int, num_readings: int, anomaly_rate: float, seed: int):
+    simulator = SensorSimulator(seed=seed)
+    data = simulator.generate_dataset_vectorized(
+        num_training + num_readings, anomaly_count=int(num_readings * anomaly_rate),
+        anomaly_types=ANOMALY_TYPES, anomaly_start=num_training
+    )
+    return data.iloc[:num_training], data.iloc[num_training:]
+
+
+def detectors(training):
+    """One detector per mode, all sharing a single fitted ensemble."""
+    base = AnomalyDetector(background_retrain=False, cascade=False)
+    base.train_models(training[FEATURE_COLUMNS])
+    window = training[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    built = {}
+    for mode, options in MODES.items():
+        detector = AnomalyDetector(background_retrain=False, **options)
+        detector.install_models(base.models.current, base.training_data, window)
+        built[mode] = detector
+    return built
+
+
+def confidence(models_triggered) -> str:
+    return 'HIGH' if sum(1 for m in models_triggered if m) == 3 else 'MEDIUM'
+
+
+def report(mode, detector, elapsed, count, flagged, reference):
+    calls = detector.model_calls
+    saved = ''
+    if reference is not None:
+        full_calls = reference['calls']
+        saved_calls = {name: full_calls[name] - calls[name] for name in MODEL_NAMES[1:]}
+        saved = ' '.join(f"{SHORT_NAMES[name]} {saved_calls[name] / max(full_calls[name], 1):.0%}"
+                         for name in MODEL_NAMES[1:])
+        agree = np.mean(flagged['is_anomaly'] == reference['is_anomaly'])
+        both = flagged['is_anomaly'] & reference['is_anomaly']
+        conf = (np.mean(flagged['confidence'][both] == reference['confidence'][both]) if both.any() else 1.0)
+    else:
+        agree = conf = 1.0
+    print(f"  {mode:<20} {elapsed / count * 1e6:>10.1f} {calls['Isolation Forest']:>9} {calls['One-Class SVM']:>9} "
+          f"{saved:>14} {agree:>8.4f} {conf:>10.4f}")
+    return {'calls': dict(calls), **flagged}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--training', type=int, default=1000)
+    parser.add_argument('--readings', type=int, default=3000, help="Readings scored one at a time per mode")
+    parser.add_argument('--batch-readings', type=int, default=100_000, help="Readings scored with detect_batch")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--anomaly-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    training, stream = make_stream(args.training, max(args.readings, args.batch_readings), args.anomaly_rate, args.seed)
+    header = f"  {'mode':<20} {'us/reading':>10} {'IF calls':>9} {'SVM calls':>9} {'calls saved':>14} {'agree':>8} {'confidence':>10}"
+
+    built = detectors(training)
+    cascade = built['cascade']
+    costs = cascade.measure_model_costs(cascade.models.current, cascade.training_data[:1], repeats=20)
+    print("Measured single-reading cost: " + ", ".join(f"{name}={seconds * 1e3:.2f}ms" for name, seconds in costs.items()))
+    print(f"Cascade order: Rolling Stats, {', '.join(cascade.cascade_order)}")
+
+    readings = list(iter_readings(to_block(stream.iloc[:args.readings])))
+    print(f"\ndetect_anomaly, {len(readings)} readings:")
+    print(header)
+    reference = None
+    for mode, detector in built.items():
+        is_anomaly, confidences = [], []
+        start = time.perf_counter()
+        for reading in readings:
+            result = detector.detect_anomaly(reading)
+            is_anomaly.append(result['is_anomaly'])
+            confidences.append(confidence(result['models_triggered']))
+        elapsed = time.perf_counter() - start
+        flagged = {'is_anomaly': np.array(is_anomaly), 'confidence': np.array(confidences)}
+        result = report(mode, detector, elapsed, len(readings), flagged, reference)
+        reference = reference or result
+
+    block = to_block(stream.iloc[:args.batch_readings])
+    print(f"\ndetect_batch, {len(block)} readings in batches of {args.batch_size}:")
+    print(header)
+    built = detectors(training)
+    reference = None
+    for mode, detector in built.items():
+        parts = []
+        start = time.perf_counter()
+        for offset in range(0, len(block), args.batch_size):
+            parts.append(detector.detect_batch(block[offset:offset + args.batch_size]))
+        elapsed = time.perf_counter() - start
+        flagged = {
+            'is_anomaly': np.concatenate([p['is_anomaly'].to_numpy() for p in parts]),
+            'confidence': np.array([confidence(m) for p in parts for m in p['models_triggered']])
+        }
+        result = report(mode, detector, elapsed, len(block), flagged, reference)
+        reference = reference or result
+
+
+if __name__ == '__main__':
+    main()
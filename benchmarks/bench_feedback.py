@@ -0,0 +1,115 @@
+"""Feedback bookkeeping: list slicing vs the ledger's window counters, and ledger reload time.
+
+Records `--feedback` simulated verdicts spread over `--stations` stations
+and the explainer's causes, and times per feedback:
+
+- list: the previous approach, append to a list and count FALSE_POSITIVE
+  in its last 20 entries (a per-station/cause rate must scan the list)
+- ledger (memory): `FeedbackLedger(path=None)`, O(1) window counters for
+  the pair, the station, the cause and the total
+- ledger (file): the same, appended to the NDJSON ledger, with and
+  without fsync
+
+Then reloads the on-disk ledger from its checkpoint and by full replay.
+
+Usage:
+    python -m benchmarks.bench_feedback --feedback 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from src.feedback import FeedbackLedger
+
+CAUSES = ['Chemical Spill', 'Sensor Drift', 'Algae Bloom', 'Sewage Overflow', 'Temperature Anomaly', 'Unknown Cause']
+
+
+def make_feedback(n: int, stations: int, seed: int):
+    rng = np.random.default_rng(seed)
+    station_ids = [f"station_{k:03d}" for k in rng.integers(0, stations, n)]
+    causes = [CAUSES[k] for k in rng.integers(0, len(CAUSES), n)]
+    verdicts = np.where(rng.random(n) < 0.3, 'FALSE_POSITIVE', 'TRUE_POSITIVE').tolist()
+    return list(zip(range(n), verdicts, station_ids, causes))
+
+
+def time_list(feedback, query_every: int):
+    history = []
+    start = time.perf_counter()
+    for alert_id, verdict, station_id, cause in feedback:
+        history.append({'alert_id': alert_id, 'feedback': verdict, 'station_id': station_id,
+                        'likely_cause': cause, 'timestamp': None})
+        recent = history[-20:]
+        sum(1 for f in recent if f['feedback'] == 'FALSE_POSITIVE') / 20
+    record = (time.perf_counter() - start) / len(feedback)
+
+    start = time.perf_counter()
+    queries = feedback[::query_every]
+    for _, _, station_id, cause in queries:
+        recent = [f for f in history if f['station_id'] == station_id and f['likely_cause'] == cause][-20:]
+        sum(1 for f in recent if f['feedback'] == 'FALSE_POSITIVE') / len(recent)
+    return record, (time.perf_counter() - start) / len(queries)
+
+
+def time_ledger(feedback, query_every: int, path=None, fsync=False):
+    ledger = FeedbackLedger(path, fsync=fsync)
+    start = time.perf_counter()
+    for alert_id, verdict, station_id, cause in feedback:
+        ledger.record(alert_id, verdict, None, station_id, cause)
+    record = (time.perf_counter() - start) / len(feedback)
+
+    start = time.perf_counter()
+    queries = feedback[::query_every]
+    for _, _, station_id, cause in queries:
+        ledger.fp_rate(station_id, cause)
+    query = (time.perf_counter() - start) / len(queries)
+    ledger.close()
+    return record, query, ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feedback', type=int, default=200_000)
+    parser.add_argument('--fsync-feedback', type=int, default=2000, help="Feedbacks for the fsync run")
+    parser.add_argument('--stations', type=int, default=50)
+    parser.add_argument('--query-every', type=int, default=100, help="Feedbacks between per-pair rate queries")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    feedback = make_feedback(args.feedback, args.stations, args.seed)
+    print(f"{args.feedback} feedbacks, {args.stations} stations x {len(CAUSES)} causes")
+    print(f"  {'approach':<22} {'record us':>10} {'pair FP rate us':>16}")
+    record, query = time_list(feedback, args.query_every)
+    print(f"  {'list (last 20)':<22} {record * 1e6:>10.1f} {query * 1e6:>16.1f}")
+    record, query, _ = time_ledger(feedback, args.query_every)
+    print(f"  {'ledger (memory)':<22} {record * 1e6:>10.1f} {query * 1e6:>16.2f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fsync_path = os.path.join(tmp, 'fsync', 'feedback.ndjson')
+        record, query, _ = time_ledger(feedback[:args.fsync_feedback], args.query_every, fsync_path, fsync=True)
+        print(f"  {'ledger (file, fsync)':<22} {record * 1e6:>10.1f} {query * 1e6:>16.2f}")
+
+        path = os.path.join(tmp, 'feedback.ndjson')
+        record, query, ledger = time_ledger(feedback, args.query_every, path)
+        print(f"  {'ledger (file)':<22} {record * 1e6:>10.1f} {query * 1e6:>16.2f}")
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.startswith('feedback'))
+        print(f"Ledger: {ledger.seq} records, {size / 1024 ** 2:.1f} MB on disk, {len(ledger.counters)} window counters")
+
+        expected = ledger.summary()
+        restored = FeedbackLedger(path)
+        start = time.perf_counter()
+        replayed = restored.load()
+        checkpointed = time.perf_counter() - start
+        assert restored.summary() == expected
+        os.remove(restored.checkpoint_path)
+        start = time.perf_counter()
+        restored.load()
+        full = time.perf_counter() - start
+        assert restored.summary() == expected
+        restored.log.close()
+        print(f"Reload: checkpoint + {replayed} records {checkpointed * 1e3:.1f} ms, "
+              f"full replay {full * 1e3:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
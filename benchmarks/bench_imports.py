@@ -0,0 +1,62 @@
+"""Cold import time of the scoring-only modules against SCORING_IMPORT_BUDGET_S.
+
+Each run starts a fresh interpreter, imports the modules a scoring worker
+needs and reports the wall time, plus whether any heavy optional dependency
+(scikit-learn, matplotlib, joblib) was pulled in. Exits 1 if the median
+import time is over budget or a heavy dependency was loaded.
+
+Usage:
+    python -m benchmarks.bench_imports --runs 5
+    python -m benchmarks.bench_imports --modules src.main
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from src.config import PROJECT_ROOT, SCORING_IMPORT_BUDGET_S
+
+SCORING_MODULES = ['src.model_store', 'src.station_engine', 'src.streaming']
+HEAVY_MODULES = ['sklearn', 'matplotlib', 'joblib']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules, heavy=HEAVY_MODULES):
+    """Import `modules` in a fresh interpreter; (seconds, heavy modules loaded)."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(modules=list(modules), heavy=list(heavy))],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], result['loaded']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=SCORING_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=SCORING_IMPORT_BUDGET_S)
+    args = parser.parse_args()
+
+    runs = [measure(args.modules) for _ in range(args.runs)]
+    median = statistics.median(seconds for seconds, _ in runs)
+    loaded = sorted({name for _, names in runs for name in names})
+    print(f"modules: {' '.join(args.modules)}")
+    print(f"import time: median={median:.3f}s min={min(s for s, _ in runs):.3f}s "
+          f"max={max(s for s, _ in runs):.3f}s budget={args.budget:.3f}s")
+    print(f"heavy dependencies loaded: {', '.join(loaded) or 'none'}")
+    ok = median <= args.budget and not loaded
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
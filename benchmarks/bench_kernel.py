@@ -0,0 +1,86 @@
+"""Single-reading scoring: scikit-learn models vs the exported NumPy kernel.
+
+Trains one ensemble per SVM backend, exports its `InferenceKernel` and
+times, per reading, the IF and SVM votes through scikit-learn `predict`
+and through the kernel, plus `detect_anomaly` end to end with and without
+the kernel. Reports vote agreement, the largest decision-value difference
+and the kernel's export time and on-disk size.
+
+Usage:
+    python -m benchmarks.bench_kernel --readings 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from src.config import FEATURE_COLUMNS
+from src.ml_engine import AnomalyDetector
+from src.inference import InferenceKernel
+from src.records import to_block, iter_readings
+from src.simulator import SensorSimulator, ANOMALY_TYPES
+
+
+def per_reading_us(fn, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--training', type=int, default=1000)
+    parser.add_argument('--readings', type=int, default=2000)
+    parser.add_argument('--agreement-readings', type=int, default=50_000, help="Readings checked for vote agreement")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    total = args.training + max(args.readings, args.agreement_readings)
+    data = SensorSimulator(seed=args.seed).generate_dataset_vectorized(
+        total, anomaly_count=total // 50, anomaly_types=ANOMALY_TYPES, anomaly_start=args.training
+    )
+    training, stream = data.iloc[:args.training], data.iloc[args.training:]
+    window = training[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    readings = list(iter_readings(to_block(stream.iloc[:args.readings])))
+
+    for backend in ('exact', 'sgd'):
+        detector = AnomalyDetector(background_retrain=False, svm_backend=backend, use_kernel=False)
+        detector.train_models(training[FEATURE_COLUMNS])
+        models = detector.models.current
+        start = time.perf_counter()
+        kernel = InferenceKernel.from_models(models)
+        exported = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'kernel.npz')
+            kernel.save(path)
+            size = os.path.getsize(path)
+
+        scaled = kernel.transform(stream[FEATURE_COLUMNS].to_numpy()[:args.agreement_readings])
+        if_agree = np.mean(kernel.if_votes(scaled) == (models.isolation_forest.predict(scaled) == -1))
+        svm_agree = np.mean(kernel.svm_votes(scaled) == (models.one_class_svm.predict(scaled) == -1))
+        if_diff = np.max(np.abs(kernel.if_decision(scaled) - models.isolation_forest.decision_function(scaled)))
+        svm_diff = np.max(np.abs(kernel.svm_decision(scaled) - models.one_class_svm.decision_function(scaled)))
+
+        print(f"SVM backend '{backend}': export {exported * 1e3:.1f} ms, {size / 1024:.0f} KiB on disk")
+        print(f"  agreement on {len(scaled)} readings: IF {if_agree:.4%} (max |diff| {if_diff:.1e}), "
+              f"SVM {svm_agree:.4%} (max |diff| {svm_diff:.1e})")
+
+        rows = [kernel.transform(r.values)[None, :] for r in readings]
+        print(f"  per reading ({len(readings)} readings):")
+        print(f"    {'IF   sklearn predict':<32} {per_reading_us(models.isolation_forest.predict, rows):>9.1f} us")
+        print(f"    {'IF   kernel':<32} {per_reading_us(kernel.if_votes, rows):>9.1f} us")
+        print(f"    {'SVM  sklearn predict':<32} {per_reading_us(models.one_class_svm.predict, rows):>9.1f} us")
+        print(f"    {'SVM  kernel':<32} {per_reading_us(kernel.svm_votes, rows):>9.1f} us")
+        print(f"    {'kernel.score (raw values)':<32} {per_reading_us(kernel.score, [r.values for r in readings]):>9.1f} us")
+
+        for use_kernel in (False, True):
+            for cascade in (False, True):
+                scorer = AnomalyDetector(background_retrain=False, cascade=cascade, use_kernel=use_kernel)
+                scorer.install_models(models, detector.training_data, window)
+                label = f"detect_anomaly {'kernel' if use_kernel else 'sklearn'}{' cascade' if cascade else ''}"
+                print(f"    {label:<32} {per_reading_us(scorer.detect_anomaly, readings):>9.1f} us")
+
+
+if __name__ == '__main__':
+    main()
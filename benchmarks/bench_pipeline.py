@@ -0,0 +1,265 @@
+"""Reproducible benchmark suite for the detection pipeline.
+
+Drives each component at several data sizes and records throughput,
+per-call latency percentiles and peak RSS:
+
+  simulate   SensorSimulator.generate_dataset_vectorized (readings/s)
+  validate   DataValidator.validate_frame (readings/s)
+  train      AnomalyDetector.train_models (rows capped at --max-train-rows)
+  detect     AnomalyDetector.detect_anomaly per reading (latency) and
+             detect_batch over the whole block (readings/s)
+  explain    AlertExplainer.generate_explanation per reading (latency)
+  dashboard  DashboardRenderer.render over the whole history
+  stations   MultiStationEngine.score over --stations streams
+
+Each case runs in a fresh process so peak RSS is attributable to it.
+Results are written to --output; with --baseline, cases whose throughput
+drops (or p95 latency grows) by more than --tolerance are reported as
+regressions and the exit status is 1.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 1000 100000 --stations 10 100
+    python -m benchmarks.bench_pipeline --save-baseline   # record a new baseline
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 1000000 10000000
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from src.instrumentation import peak_rss_mb
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_RESULTS = BENCH_DIR / "results.json"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+COMPONENTS = ['simulate', 'validate', 'train', 'detect', 'explain', 'dashboard', 'stations']
+
+
+def _dataset(num_readings: int, seed: int):
+    from src.simulator import SensorSimulator, ANOMALY_TYPES
+    return SensorSimulator(seed=seed).generate_dataset_vectorized(
+        num_readings, anomaly_count=max(2, num_readings // 500), anomaly_types=ANOMALY_TYPES,
+        anomaly_start=min(800, num_readings // 2)
+    )
+
+
+def _timed_calls(fn, items) -> Dict[str, float]:
+    """Call `fn` on each item; latency summary of the individual calls."""
+    from src.instrumentation import LatencyHistogram
+    histogram = LatencyHistogram()
+    for item in items:
+        start = time.perf_counter_ns()
+        fn(item)
+        histogram.record(time.perf_counter_ns() - start)
+    return histogram.summary()
+
+
+def run_case(component: str, size: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one benchmark case; executed in its own worker process."""
+    from src.config import FEATURE_COLUMNS
+
+    seed = options['seed']
+    sample = options['latency_samples']
+    result: Dict[str, Any] = {'component': component, 'size': size}
+    start = time.perf_counter()
+
+    if component == 'simulate':
+        from src.simulator import SensorSimulator
+        SensorSimulator(seed=seed).generate_dataset_vectorized(size)
+        elapsed = time.perf_counter() - start
+        result['throughput_per_s'] = size / elapsed
+
+    elif component == 'validate':
+        from src.pipeline import DataValidator
+        data = _dataset(size, seed)
+        start = time.perf_counter()
+        DataValidator().validate_frame(data)
+        elapsed = time.perf_counter() - start
+        result['throughput_per_s'] = size / elapsed
+
+    elif component == 'train':
+        from src.ml_engine import AnomalyDetector
+        rows = min(size, options['max_train_rows'])
+        data = _dataset(rows, seed)
+        detector = AnomalyDetector(background_retrain=False, svm_backend=options['svm_backend'])
+        start = time.perf_counter()
+        detector.train_models(data[FEATURE_COLUMNS])
+        elapsed = time.perf_counter() - start
+        result.update({'rows': rows, 'throughput_per_s': rows / elapsed})
+
+    elif component == 'detect':
+        from src.ml_engine import AnomalyDetector
+        data = _dataset(size, seed)
+        detector = AnomalyDetector(background_retrain=False, svm_backend=options['svm_backend'])
+        detector.train_models(data[FEATURE_COLUMNS].iloc[:min(size, options['max_train_rows'])])
+        rows = [data.iloc[i] for i in range(min(size, sample))]
+        result['latency'] = _timed_calls(detector.detect_anomaly, rows)
+        start = time.perf_counter()
+        detector.detect_batch(data[['timestamp'] + FEATURE_COLUMNS])
+        elapsed = time.perf_counter() - start
+        result['throughput_per_s'] = size / elapsed
+
+    elif component == 'explain':
+        from src.explainer import AlertExplainer
+        data = _dataset(size, seed)
+        explainer = AlertExplainer()
+        rows = [data.iloc[i] for i in range(min(size, sample))]
+        models = ['Statistical', 'Isolation Forest', None]
+        result['latency'] = _timed_calls(lambda row: explainer.generate_explanation(row, models), rows)
+        elapsed = result['latency']['total_s']
+        result['throughput_per_s'] = len(rows) / elapsed
+
+    elif component == 'dashboard':
+        from src.dashboard import DashboardRenderer
+        data = _dataset(size, seed)
+        renderer = DashboardRenderer(filename=Path(options['scratch_dir']) / 'bench_dashboard.png',
+                                     background=False)
+        renderer.append(data)
+        result['latency'] = _timed_calls(lambda _: renderer.render(), range(3))
+        elapsed = result['latency']['total_s']
+        result['throughput_per_s'] = 3 * size / elapsed
+
+    elif component == 'stations':
+        from src.simulator import SensorSimulator
+        from src.station_engine import MultiStationEngine
+        readings = options['station_readings']
+        cutoff = int(readings * 0.8)
+        streams = SensorSimulator(seed=seed).generate_station_streams(size, readings)
+        with MultiStationEngine(num_workers=options['workers']) as engine:
+            engine.train({sid: df.iloc[:cutoff] for sid, df in streams.items()})
+            start = time.perf_counter()
+            engine.score({sid: df.iloc[cutoff:] for sid, df in streams.items()})
+            elapsed = time.perf_counter() - start
+        result.update({'readings_per_station': readings,
+                       'throughput_per_s': size * (readings - cutoff) / elapsed})
+
+    else:
+        raise ValueError(f"Unknown component: {component!r}")
+
+    result['elapsed_s'] = elapsed
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def run_isolated(component: str, size: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a case in a fresh spawned process so RSS and import state start clean."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(run_case, component, size, options).result()
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"{result['component']}/{result['size']}"
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+                     tolerance: float) -> List[str]:
+    """Cases slower than the baseline by more than `tolerance` (fraction)."""
+    previous = {case_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None:
+            continue
+        if result['throughput_per_s'] < before['throughput_per_s'] * (1 - tolerance):
+            regressions.append(f"{case_key(result)}: throughput {result['throughput_per_s']:.0f}/s "
+                               f"vs baseline {before['throughput_per_s']:.0f}/s")
+        if 'latency' in result and 'latency' in before:
+            now, then = result['latency']['p95_ms'], before['latency']['p95_ms']
+            if now > then * (1 + tolerance):
+                regressions.append(f"{case_key(result)}: p95 {now:.3f}ms vs baseline {then:.3f}ms")
+    return regressions
+
+
+def print_result(result: Dict[str, Any]):
+    latency = result.get('latency')
+    percentiles = (f"p50={latency['p50_ms']:8.3f}ms p95={latency['p95_ms']:8.3f}ms "
+                   f"p99={latency['p99_ms']:8.3f}ms" if latency else ' ' * 44)
+    print(f"{result['component']:>9} {result['size']:>9}  {result['throughput_per_s']:>12.0f}/s  "
+          f"{percentiles}  rss={result['peak_rss_mb']:8.1f}MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', nargs='+', choices=COMPONENTS, default=COMPONENTS)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--stations', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--station-readings', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=0, help="MultiStationEngine workers (0 = in-process)")
+    parser.add_argument('--max-train-rows', type=int, default=20_000,
+                        help="Cap on training rows (the exact SVM fit is roughly quadratic)")
+    parser.add_argument('--max-dashboard-rows', type=int, default=100_000)
+    parser.add_argument('--latency-samples', type=int, default=1000,
+                        help="Single-reading calls timed per latency case")
+    parser.add_argument('--svm-backend', default='exact', choices=['exact', 'sgd'])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Also write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before flagging (fraction)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run cases in this process (faster, but peak RSS is cumulative)")
+    args = parser.parse_args(argv)
+
+    options = {
+        'seed': args.seed,
+        'latency_samples': args.latency_samples,
+        'max_train_rows': args.max_train_rows,
+        'svm_backend': args.svm_backend,
+        'station_readings': args.station_readings,
+        'workers': args.workers,
+        'scratch_dir': str(args.output.parent)
+    }
+    cases = []
+    for component in args.components:
+        if component == 'stations':
+            cases += [(component, n) for n in args.stations]
+        elif component == 'dashboard':
+            cases += [(component, n) for n in args.sizes if n <= args.max_dashboard_rows]
+        else:
+            cases += [(component, n) for n in args.sizes]
+
+    runner = run_case if args.in_process else run_isolated
+    print(f"{'component':>9} {'size':>9}  {'throughput':>14}  {'latency':<44}  peak")
+    results = []
+    for component, size in cases:
+        result = runner(component, size, options)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'options': options,
+        'results': results
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    status = 0
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"No regressions vs {args.baseline}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Per-reading memory and latency: pandas rows / dicts vs Reading, Alert and blocks.
+
+Memory is measured with tracemalloc as the bytes retained per held record
+(readings kept for storage, alerts kept by the dashboard). Latency covers
+the monitoring loop's per-reading path: fetching the row, preparing the
+detector input, detection, and building the alert record.
+
+Usage:
+    python -m benchmarks.bench_records --readings 20000
+"""
+import argparse
+import time
+import tracemalloc
+import pandas as pd
+from src.config import FEATURE_COLUMNS
+from src.ml_engine import AnomalyDetector
+from src.explainer import AlertExplainer
+from src.records import build_alert, to_block, iter_readings
+from src.simulator import SensorSimulator
+
+
+def retained_bytes(build) -> int:
+    """Bytes still allocated after `build()` returns (its result is kept alive)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def legacy_alert(alert_id: int, reading: dict, explanation: dict) -> dict:
+    """The nested dict alert used before `Alert` (full reading copy, string timestamps)."""
+    reading = {**reading, 'timestamp': str(reading['timestamp'])}
+    return {'id': alert_id, 'timestamp': reading['timestamp'], 'reading': reading,
+            'explanation': explanation,
+            'severity': 'CRITICAL' if explanation['confidence'] == 'HIGH' else 'WARNING'}
+
+
+def per_call_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=20_000)
+    parser.add_argument('--detect-readings', type=int, default=2_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    data = SensorSimulator(seed=args.seed).generate_dataset_vectorized(args.readings, anomaly_count=args.readings // 50)
+    block = to_block(data)
+    n = len(data)
+
+    print(f"Memory per held reading ({n} readings):")
+    rows = {
+        'pd.Series rows': lambda: [data.iloc[i] for i in range(n)],
+        'dict rows': lambda: data.to_dict('records'),
+        'Reading': lambda: list(iter_readings(block)),
+        'READING_DTYPE block': lambda: to_block(data)
+    }
+    for name, build in rows.items():
+        print(f"  {name:<20} {retained_bytes(build) / n:>8.0f} B")
+
+    explainer = AlertExplainer()
+    explanation = explainer.generate_explanation(data.iloc[0], ['Rolling Stats', 'Isolation Forest', None])
+    records = data.to_dict('records')
+    readings = list(iter_readings(block))
+    print("Memory per held alert (reading retained elsewhere):")
+    print(f"  {'dict alert':<20} {retained_bytes(lambda: [legacy_alert(i, r, explanation) for i, r in enumerate(records)]) / n:>8.0f} B")
+    print(f"  {'Alert':<20} {retained_bytes(lambda: [build_alert(i, r, explanation) for i, r in enumerate(readings)]) / n:>8.0f} B")
+
+    detector = AnomalyDetector(background_retrain=False)
+    detector.train_models(data[FEATURE_COLUMNS].iloc[:1000])
+    scaler = detector.scaler
+    m = min(args.detect_readings, n)
+    indices = range(m)
+
+    print(f"Per-reading latency ({m} readings):")
+    print(f"  {'row fetch  iloc':<28} {per_call_us(lambda i: data.iloc[i], indices):>8.1f} us")
+    start = time.perf_counter()
+    for _ in iter_readings(block[:m]):
+        pass
+    print(f"  {'row fetch  iter_readings':<28} {(time.perf_counter() - start) / m * 1e6:>8.1f} us")
+
+    series = [data.iloc[i] for i in indices]
+    print(f"  {'prepare   DataFrame+transform':<28} "
+          f"{per_call_us(lambda r: scaler.transform(pd.DataFrame([r])[FEATURE_COLUMNS]), series):>8.1f} us")
+    print(f"  {'prepare   Reading.values':<28} "
+          f"{per_call_us(lambda r: (r.values - scaler.mean_) / scaler.scale_, readings[:m]):>8.1f} us")
+    print(f"  {'detect    pd.Series':<28} {per_call_us(detector.detect_anomaly, series):>8.1f} us")
+    print(f"  {'detect    Reading':<28} {per_call_us(detector.detect_anomaly, readings[:m]):>8.1f} us")
+    print(f"  {'alert     dict':<28} "
+          f"{per_call_us(lambda r: legacy_alert(1, r.to_dict(), explanation), series):>8.1f} us")
+    print(f"  {'alert     Alert':<28} {per_call_us(lambda r: build_alert(1, r, explanation), readings[:m]):>8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
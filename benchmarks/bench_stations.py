@@ -0,0 +1,46 @@
+"""Scale-out benchmark for the multi-station engine.
+
+Usage:
+    python -m benchmarks.bench_stations --stations 100 --readings 1000 --workers 1 2 4
+"""
+import argparse
+import time
+from src.simulator import SensorSimulator
+from src.station_engine import MultiStationEngine
+
+
+def run(num_stations: int, num_readings: int, workers: int, training_cutoff: int):
+    streams = SensorSimulator().generate_station_streams(num_stations, num_readings)
+    training = {sid: df.iloc[:training_cutoff] for sid, df in streams.items()}
+    monitoring = {sid: df.iloc[training_cutoff:] for sid, df in streams.items()}
+
+    with MultiStationEngine(num_workers=workers) as engine:
+        start = time.perf_counter()
+        engine.train(training)
+        train_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = engine.score(monitoring)
+        score_s = time.perf_counter() - start
+
+    scored = sum(len(df) for df in monitoring.values())
+    alerts = sum(int(df['is_anomaly'].sum()) for df in results.values())
+    print(f"workers={workers:<3} train={train_s:7.2f}s  score={score_s:7.2f}s  "
+          f"throughput={scored / score_s:10.0f} readings/s  alerts={alerts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stations', type=int, default=100)
+    parser.add_argument('--readings', type=int, default=1000)
+    parser.add_argument('--training-cutoff', type=int, default=800)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"Stations: {args.stations} | Readings/station: {args.readings}")
+    for workers in args.workers:
+        run(args.stations, args.readings, workers, args.training_cutoff)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Exact RBF One-Class SVM vs the Nystroem + SGD approximation.
+
+Reports fit time, predict time and prediction agreement with the exact
+model on a held-out set of normal readings plus injected anomalies.
+The exact SVM scales roughly quadratically, so it is skipped above
+--exact-max-rows (agreement is then reported as n/a).
+
+Usage:
+    python -m benchmarks.bench_svm_backends --rows 10000 100000 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from src.config import FEATURE_COLUMNS
+from src.ml_engine import make_one_class_svm
+from src.simulator import SensorSimulator, ANOMALY_TYPES
+
+
+def make_data(num_rows: int, num_test: int, seed: int):
+    simulator = SensorSimulator(seed=seed)
+    train = simulator.generate_dataset_vectorized(num_rows, anomaly_count=0)
+    test = pd.concat([
+        simulator.generate_dataset_vectorized(num_test, anomaly_count=0),
+        simulator.generate_dataset_vectorized(num_test // 20, anomaly_count=num_test // 20,
+                                              anomaly_types=ANOMALY_TYPES, anomaly_start=0)
+    ], ignore_index=True)
+    return train[FEATURE_COLUMNS], test[FEATURE_COLUMNS]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--test-rows', type=int, default=20_000)
+    parser.add_argument('--exact-max-rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'backend':>7} {'fit_s':>9} {'predict_s':>10} {'agreement':>10} {'anomaly_recall':>15}")
+    for num_rows in args.rows:
+        train, test = make_data(num_rows, args.test_rows, args.seed)
+        scaler = StandardScaler().fit(train)
+        X, T = scaler.transform(train), scaler.transform(test)
+        is_injected = np.arange(len(T)) >= args.test_rows
+
+        predictions = {}
+        for backend in ['exact', 'sgd']:
+            if backend == 'exact' and num_rows > args.exact_max_rows:
+                print(f"{num_rows:>9} {backend:>7} {'skipped':>9}")
+                continue
+            model, fit_s = timed(make_one_class_svm(backend).fit, X)
+            pred, predict_s = timed(model.predict, T)
+            predictions[backend] = pred
+
+            agreement = '-' if backend == 'exact' else 'n/a'
+            if backend != 'exact' and 'exact' in predictions:
+                agreement = f"{np.mean(pred == predictions['exact']):.4f}"
+            recall = np.mean(pred[is_injected] == -1)
+            print(f"{num_rows:>9} {backend:>7} {fit_s:>9.3f} {predict_s:>10.4f} {agreement:>10} {recall:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
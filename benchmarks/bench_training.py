@@ -0,0 +1,113 @@
+"""Peak memory and time of in-memory vs out-of-core (chunked) training.
+
+Writes a simulated multi-station history CSV of each size, then trains
+from it in a fresh subprocess per mode so peak RSS is per run:
+
+- in-memory: read the whole CSV, validate it, fit the scaler on every row
+  and IF/SVM on a `--sample-size` random sample (fitting the exact SVM on
+  millions of rows is not feasible, so this is the in-memory best case)
+- streaming: `AnomalyDetector.train_models_streaming` over CSV chunks
+  (scaler `partial_fit`, streaming uniform sample)
+
+Also reports how far the streamed scaler is from the full-data fit.
+
+Usage:
+    python -m benchmarks.bench_training --sizes 100000 1000000 4000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+
+def write_history(path: str, num_readings: int, stations: int, seed: int):
+    from src.simulator import SensorSimulator
+    per_station = num_readings // stations
+    first = True
+    for k, child in enumerate(np.random.SeedSequence(seed).spawn(stations)):
+        simulator = SensorSimulator(seed=seed, rng=np.random.default_rng(child))
+        for chunk in simulator.iter_dataset_chunks(per_station, chunk_size=200_000, anomaly_count=0):
+            chunk.insert(0, 'station_id', f"station_{k:03d}")
+            chunk.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+            first = False
+
+
+def run_mode(mode: str, path: str, sample_size: int, chunk_size: int) -> dict:
+    """Train in this process and return timing, memory and scaler statistics."""
+    from src.config import FEATURE_COLUMNS
+    from src.ml_engine import AnomalyDetector
+    from src.pipeline import DataValidator
+    from src.instrumentation import peak_rss_mb
+
+    detector = AnomalyDetector(background_retrain=False)
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        from sklearn.preprocessing import StandardScaler
+        data = pd.read_csv(path, parse_dates=['timestamp'])
+        valid = DataValidator().filter_valid(data, training=True)
+        scaler = StandardScaler().fit(valid[FEATURE_COLUMNS].to_numpy())
+        rows = len(valid)
+        sample = valid.sample(min(sample_size, rows), random_state=0)
+        training = scaler.transform(sample[FEATURE_COLUMNS].to_numpy())
+        detector.install_models(detector._fit_models(scaler, training), training,
+                                valid[FEATURE_COLUMNS].to_numpy()[-50:])
+    else:
+        validator = DataValidator()
+
+        def chunks():
+            for chunk in pd.read_csv(path, chunksize=chunk_size, parse_dates=['timestamp']):
+                yield validator.filter_valid(chunk, training=True)
+
+        rows = detector.train_models_streaming(chunks(), sample_size=sample_size)['rows']
+    return {
+        'rows': rows,
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+        'scaler_mean': detector.scaler.mean_.tolist(),
+        'scaler_scale': detector.scaler.scale_.tolist()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--stations', type=int, default=10)
+    parser.add_argument('--sample-size', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'CSV'), help=argparse.SUPPRESS)  # Child process
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run[0], args.run[1], args.sample_size, args.chunk_size)))
+        return
+
+    print(f"{'readings':>10} {'CSV MB':>8} {'mode':>10} {'seconds':>8} {'peak RSS MB':>12} {'scaler rel. diff':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"history_{size}.csv")
+            write_history(path, size, args.stations, args.seed)
+            results = {}
+            for mode in ('in-memory', 'streaming'):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_training', '--run', mode, path,
+                     '--sample-size', str(args.sample_size), '--chunk-size', str(args.chunk_size)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                results[mode] = json.loads(output.strip().splitlines()[-1])
+            reference = results['in-memory']
+            for mode, result in results.items():
+                diff = max(np.max(np.abs(np.subtract(result[key], reference[key]) / reference['scaler_scale']))
+                           for key in ('scaler_mean', 'scaler_scale'))
+                print(f"{size:>10} {os.path.getsize(path) / 1024 ** 2:>8.0f} {mode:>10} {result['seconds']:>8.1f} "
+                      f"{result['peak_rss_mb']:>12.0f} {diff:>17.1e}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+from src.config import (
+    ALERTS_LOG_FILENAME, ALERT_LOG_FLUSH_RECORDS, ALERT_LOG_FLUSH_INTERVAL_S, ALERT_LOG_FSYNC,
+    ALERT_LOG_MAX_BYTES, ALERT_LOG_MAX_AGE_S, ALERT_LOG_COMPRESS, ALERT_LOG_SEGMENTS_KEPT
+)
+
+# Rotated segment names: <stem>.<first>-<last>.<seq>.ndjson[.gz]
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+SEGMENT_PATTERN = r'^{stem}\.(\d{{8}}T\d{{12}})-(\d{{8}}T\d{{12}})\.(\d+)\.ndjson(\.gz)?$'
+
+TimeBound = Optional[Union[str, pd.Timestamp]]
+
+
+def _segment_time(value: str) -> pd.Timestamp:
+    return pd.Timestamp(pd.to_datetime(value, format=SEGMENT_TIME_FORMAT))
+
+
+class AlertLog:
+    """Append-only newline-delimited JSON log with rotation and compression.
+
+    Records are buffered and flushed every `flush_records` records or
+    `flush_interval` seconds (and on close); with `fsync=True` each flush
+    is also forced to disk. The active file rotates once it exceeds
+    `max_bytes` or `max_age` seconds: it is renamed to a segment carrying
+    its first/last record times, gzipped when `compress`, and only the
+    newest `keep` segments are kept. Every file is kept in `time_field`
+    order, which `AlertLogReader`'s range reads rely on: a record older
+    than the newest one in the active file (e.g. from a later run over
+    earlier data) rotates the file first, so it starts a new segment.
+    Segments may then overlap in time. A file left by an earlier process
+    is as old as its first record.
+    """
+
+    def __init__(self, path: Path = ALERTS_LOG_FILENAME, time_field: str = 'timestamp',
+                 flush_records: int = ALERT_LOG_FLUSH_RECORDS, flush_interval: float = ALERT_LOG_FLUSH_INTERVAL_S,
+                 fsync: bool = ALERT_LOG_FSYNC, max_bytes: int = ALERT_LOG_MAX_BYTES,
+                 max_age: float = ALERT_LOG_MAX_AGE_S, compress: bool = ALERT_LOG_COMPRESS,
+                 keep: int = ALERT_LOG_SEGMENTS_KEPT):
+        self.path = Path(path)
+        self.time_field = time_field
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.keep = keep
+        self.records_written = 0
+
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._opened_at = 0.0
+        self._first_time: Optional[pd.Timestamp] = None
+        self._last_time: Optional[pd.Timestamp] = None
+
+    def write(self, record: Dict[str, Any]):
+        """Append one record (flushed according to the buffering policy).
+
+        Records may also be objects with a `to_dict` method (`Alert`, `Incident`).
+        """
+        if not isinstance(record, dict):
+            record = record.to_dict()
+        timestamp = pd.Timestamp(record[self.time_field])
+        if self._last_time is None and self.path.exists() and self.path.stat().st_size > 0:
+            previous = _last_record(self.path)  # Active file left by an earlier process
+            if previous is not None:
+                self._last_time = pd.Timestamp(previous[self.time_field])
+        if self._last_time is not None and timestamp < self._last_time:
+            self.flush()
+            self.rotate()  # Out of order: keep every file sorted by starting a new one
+        if self._first_time is None:
+            self._first_time = timestamp
+        self._last_time = timestamp
+        self._buffer.append(json.dumps(record, default=str) + '\n')
+        self.records_written += 1
+        if len(self._buffer) >= self.flush_records or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records out (and fsync if configured), rotating if due."""
+        if self._buffer:
+            if self._file is None:
+                self._open()
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+        if self._file is not None and (self._file.tell() >= self.max_bytes
+                                       or time.time() - self._opened_at >= self.max_age):
+            self.rotate()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotate(self) -> Optional[Path]:
+        """Close the active file and turn it into a (compressed) segment."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+
+        first, last = self._first_time, self._last_time
+        if first is None:  # Active file left over from an earlier process
+            first, last = _file_time_bounds(self.path, self.time_field)
+        sequence = AlertLogReader(self.path, self.time_field).next_sequence()
+        name = (f"{self.path.stem}.{first.strftime(SEGMENT_TIME_FORMAT)}-{last.strftime(SEGMENT_TIME_FORMAT)}"
+                f".{sequence}.ndjson")
+        segment = self.path.with_name(name)
+        self.path.rename(segment)
+        if self.compress:
+            with open(segment, 'rb') as src, gzip.open(f"{segment}.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            segment.unlink()
+            segment = Path(f"{segment}.gz")
+        self._first_time = self._last_time = None
+        self._prune()
+        return segment
+
+    def read(self, start: TimeBound = None, end: TimeBound = None,
+             severity: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Flush, then stream matching records (see `AlertLogReader.read`)."""
+        self.flush()
+        return AlertLogReader(self.path, self.time_field).read(start, end, severity)
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """Flush, then return the most recently written record (None for an empty log)."""
+        self.flush()
+        return AlertLogReader(self.path, self.time_field).last()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+        if self._file.tell() > 0:
+            # Appending to a previous run's file: its first record bounds the segment and
+            # dates the file (the mtime moves with every append, so it can't be used for max_age)
+            first = _file_time_bounds(self.path, self.time_field)[0]
+            self._opened_at = min(first.to_pydatetime().timestamp(), self._opened_at)
+            if self._first_time is not None:
+                self._first_time = first
+
+    def _segments(self) -> List[Path]:
+        return [path for path, _, _ in AlertLogReader(self.path, self.time_field).segments()]
+
+    def _prune(self):
+        segments = self._segments()
+        for path in segments[:-self.keep] if self.keep > 0 else []:
+            path.unlink(missing_ok=True)
+
+
+class AlertLogReader:
+    """Streams records from an `AlertLog`'s segments and active file.
+
+    Records come in write order, file by file; each file is in time order.
+    Segments outside the requested time range are skipped by name; in the
+    uncompressed active file the start time is found by binary search over
+    byte offsets. Matching records are yielded one at a time, so memory
+    use does not depend on log size.
+    """
+
+    def __init__(self, path: Path = ALERTS_LOG_FILENAME, time_field: str = 'timestamp'):
+        self.path = Path(path)
+        self.time_field = time_field
+        self._pattern = re.compile(SEGMENT_PATTERN.format(stem=re.escape(self.path.stem)))
+
+    def _matches(self) -> List[Tuple[int, Path, re.Match]]:
+        if not self.path.parent.exists():
+            return []
+        found = []
+        for path in self.path.parent.iterdir():
+            match = self._pattern.match(path.name)
+            if match:
+                found.append((int(match.group(3)), path, match))
+        return sorted(found, key=lambda item: item[0])
+
+    def segments(self) -> List[Tuple[Path, pd.Timestamp, pd.Timestamp]]:
+        """Rotated segments in write order, with their first/last record times."""
+        return [(path, _segment_time(match.group(1)), _segment_time(match.group(2)))
+                for _, path, match in self._matches()]
+
+    def next_sequence(self) -> int:
+        found = self._matches()
+        return found[-1][0] + 1 if found else 0
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """The most recently written record (None for an empty log)."""
+        if self.path.exists() and self.path.stat().st_size > 0:
+            return _last_record(self.path)
+        for _, path, _ in reversed(self._matches()):
+            record = _last_record(path)
+            if record is not None:
+                return record
+        return None
+
+    def read(self, start: TimeBound = None, end: TimeBound = None,
+             severity: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Records with start <= time <= end (either bound optional) and the given severity."""
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        for path, first, last in self.segments():
+            if (start is not None and last < start) or (end is not None and first > end):
+                continue
+            opener = gzip.open if path.suffix == '.gz' else open
+            with opener(path, 'rb') as f:
+                yield from self._filter(f, start, end, severity)
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                if start is not None:
+                    self._seek(f, start)
+                yield from self._filter(f, start, end, severity)
+
+    def _filter(self, f, start, end, severity) -> Iterator[Dict[str, Any]]:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # Record still being written
+            record = json.loads(line)
+            timestamp = pd.Timestamp(record[self.time_field])
+            if start is not None and timestamp < start:
+                continue
+            if end is not None and timestamp > end:
+                break
+            if severity is None or record.get('severity') == severity:
+                yield record
+
+    def _seek(self, f, start: pd.Timestamp, linear_below: int = 64 * 1024):
+        """Position `f` at (or shortly before) the first record at or after `start`."""
+        f.seek(0, os.SEEK_END)
+        low, high = 0, f.tell()
+        while high - low > linear_below:
+            middle = (low + high) // 2
+            f.seek(middle)
+            f.readline()  # Skip to the next record boundary
+            line = f.readline()
+            if not line.endswith(b'\n') or pd.Timestamp(json.loads(line)[self.time_field]) >= start:
+                high = middle
+            else:
+                low = middle
+        f.seek(low)
+        if low:
+            f.readline()  # The record containing `low` is before `start`
+
+
+def _file_time_bounds(path: Path, time_field: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """First and last record times of an uncompressed log file."""
+    with open(path, 'rb') as f:
+        first = pd.Timestamp(json.loads(f.readline())[time_field])
+    return first, pd.Timestamp(_last_record(path)[time_field])
+
+
+def _last_record(path: Path) -> Optional[Dict[str, Any]]:
+    """Last complete record of a log file or (read through) compressed segment."""
+    if path.suffix == '.gz':
+        last = None
+        with gzip.open(path, 'rb') as f:
+            for line in f:
+                if line.endswith(b'\n') and line.strip():
+                    last = line
+        return json.loads(last) if last is not None else None
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - 64 * 1024, 0))
+        lines = [line for line in f.read().split(b'\n')[:-1] if line.strip()]  # [:-1]: record still being written
+    return json.loads(lines[-1]) if lines else None
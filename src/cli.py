@@ -0,0 +1,312 @@
+"""Command-line entry point for WAVE.
+
+    python -m src train    --input history.csv | --columnar data/columnar [--station ID] [--sample-size 5000]
+    python -m src score    --input readings.csv [--batch-size 10000] [--workers 4] [--output scored.csv]
+    python -m src replay   --input readings.csv [--speed 60 | --speed 0]
+    python -m src simulate [--stations 1] [--readings 1000] [--workers 4] [--no-dashboard] [--no-feedback]
+
+`train` streams the history in chunks (fixed memory however long it is),
+fits the ensemble and saves it to the model store; `score` and `replay`
+load the latest saved models, so run `train` (or `simulate`) first.
+`score --workers N` gives every station its own copy of the models and
+rolling window (at the station's sensitivity from the feedback ledger,
+when operators have tuned it) and scores the stations on N processes;
+without it the file is scored as one stream, in file order.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from src.config import (
+    ensure_directories, MODELS_DIR, ALERTS_LOG_FILENAME, INCIDENTS_LOG_FILENAME,
+    SVM_BACKEND, STREAM_DETECT_BATCH, STREAM_QUEUE_SIZE, RANDOM_SEED, COLUMNAR_DATA_DIR,
+    TRAINING_CHUNK_ROWS, TRAINING_SAMPLE_SIZE, FEEDBACK_LOG_FILENAME
+)
+
+
+def _load_detector(args: argparse.Namespace):
+    from src.ml_engine import AnomalyDetector
+    from src.model_store import ModelStore
+    detector = AnomalyDetector(background_retrain=False)
+    ModelStore(args.models_dir).load_into(detector, version=args.version)
+    return detector
+
+
+def _training_chunks(args: argparse.Namespace, counts: Dict[str, int]) -> Iterator[pd.DataFrame]:
+    """Valid historical readings, chunk by chunk, from a CSV, the columnar store or the simulator."""
+    from src.pipeline import DataValidator, ColumnarStorage
+    from src.simulator import SensorSimulator
+
+    if args.input:
+        source = pd.read_csv(args.input, nrows=args.rows, chunksize=args.chunk_size, parse_dates=['timestamp'])
+    elif args.columnar:
+        source = ColumnarStorage(args.columnar).iter_chunks(args.start, args.end)
+    else:
+        source = SensorSimulator(seed=args.seed).iter_dataset_chunks(
+            args.rows or 800, chunk_size=args.chunk_size, anomaly_count=0
+        )
+    validator = DataValidator()
+    for chunk in source:
+        if args.station is not None and 'station_id' in chunk.columns:
+            chunk = chunk[chunk['station_id'] == args.station]
+        valid_mask, reasons = validator.validate_frame(chunk)
+        trainable = validator.training_mask(valid_mask, reasons)  # Spiking rows are valid, but not trained on
+        counts['total'] += len(chunk)
+        counts['valid'] += int(trainable.sum())
+        yield chunk[trainable]
+
+
+def cmd_train(args: argparse.Namespace) -> int:
+    from src.ml_engine import AnomalyDetector
+    from src.model_store import ModelStore
+    from src.instrumentation import reset_peak_rss
+
+    counts = {'total': 0, 'valid': 0}
+    reset_peak_rss()  # Report the peak of the training run, not of start-up
+    detector = AnomalyDetector(background_retrain=False, svm_backend=args.svm_backend)
+    stats = detector.train_models_streaming(_training_chunks(args, counts), sample_size=args.sample_size)
+    print(f"Trained on {counts['valid']} of {counts['total']} readings ({counts['total'] - counts['valid']} invalid) "
+          f"in {stats['stream_seconds'] + stats['fit_seconds']:.2f}s "
+          f"(streaming {stats['stream_seconds']:.2f}s, fitting {stats['fit_seconds']:.2f}s)")
+    ModelStore(args.models_dir).save(detector)
+    return 0
+
+
+def _score_by_station(engine, args: argparse.Namespace, valid: pd.DataFrame,
+                      station_rates: Dict[str, float]) -> pd.DataFrame:
+    """`detect_batch` output for `valid`, each station scored by its own detector on the engine's workers."""
+    if 'station_id' in valid.columns:
+        stations = valid['station_id'].fillna('').astype(str)
+    else:
+        stations = pd.Series('', index=valid.index)
+    batches = {station_id: rows for station_id, rows in valid.groupby(stations, sort=False)}
+    new = [station_id for station_id in batches if station_id not in engine.stations]
+    if new:
+        engine.load(new, args.models_dir, args.version)
+        tuned = {station_id: station_rates[station_id] for station_id in new if station_id in station_rates}
+        if tuned:
+            engine.update_contamination_rate(tuned)
+    results = engine.score(batches)
+    if not results:
+        return pd.DataFrame({'is_anomaly': np.zeros(0, dtype=bool), 'models_triggered': []}, index=valid.index)
+    return pd.concat(list(results.values())).loc[valid.index]
+
+
+def cmd_score(args: argparse.Namespace) -> int:
+    from src.pipeline import DataValidator, spike_columns
+    from src.explainer import AlertExplainer
+    from src.incidents import IncidentAggregator, LOG_TIME_FIELD
+    from src.alert_log import AlertLog
+    from src.records import build_alert, to_block, iter_readings
+
+    engine = detector = None
+    station_rates: Dict[str, float] = {}
+    if args.workers:
+        from src.model_store import ModelStore
+        from src.station_engine import MultiStationEngine
+        from src.feedback import FeedbackLedger
+        args.version = args.version or ModelStore(args.models_dir).latest()  # Every shard loads the same version
+        if args.version is None:
+            raise FileNotFoundError(f"No saved models in {args.models_dir}")
+        engine = MultiStationEngine(num_workers=args.workers)
+        if args.feedback_log.exists():
+            ledger = FeedbackLedger(args.feedback_log)
+            ledger.load()
+            station_rates = ledger.station_rates()
+    else:
+        detector = _load_detector(args)
+    validator = DataValidator()
+    explainer = AlertExplainer() if args.explain else None
+    alert_log = AlertLog(args.alerts_log) if args.explain else None
+    incident_log = AlertLog(args.incidents_log, time_field=LOG_TIME_FIELD) if args.explain else None
+    last_alert = alert_log.last() if args.explain else None
+    next_alert_id = last_alert['id'] + 1 if last_alert is not None else 1  # Ids continue across runs
+    last_incident = incident_log.last() if args.explain else None
+    first_incident_id = last_incident['id'] + 1 if last_incident is not None else 1
+    incidents = IncidentAggregator(first_id=first_incident_id) if args.explain else None
+
+    total = invalid = flagged = 0
+    start = time.perf_counter()
+    for chunk_index, chunk in enumerate(pd.read_csv(args.input, chunksize=args.batch_size, parse_dates=['timestamp'])):
+        valid_mask, reasons = validator.validate_frame(chunk)
+        valid = chunk[valid_mask]
+        results = detector.detect_batch(valid) if engine is None else _score_by_station(engine, args, valid, station_rates)
+        anomalies = valid[results['is_anomaly'].to_numpy()]
+        total += len(chunk)
+        invalid += len(chunk) - len(valid)
+        flagged += len(anomalies)
+
+        if explainer is not None and len(anomalies):
+            explanations = explainer.explain_batch(anomalies, results.loc[anomalies.index, 'models_triggered'],
+                                                   spikes=spike_columns(reasons.loc[anomalies.index]))
+            for reading, explanation in zip(iter_readings(to_block(anomalies)), explanations.to_dict('records')):
+                alert = build_alert(next_alert_id, reading, explanation)
+                next_alert_id += 1
+                alert_log.write(alert)
+                _, _, closed = incidents.add(alert)
+                for incident in closed:
+                    incident_log.write(incident.to_dict())
+
+        if args.output:
+            scored = chunk.assign(valid=valid_mask, spike=[';'.join(cols) for cols in spike_columns(reasons)])
+            scored['is_anomaly'] = False
+            scored.loc[valid.index, 'is_anomaly'] = results['is_anomaly'].to_numpy()
+            scored.loc[valid.index, 'models_triggered'] = [
+                ';'.join(m for m in models if m) for models in results['models_triggered']
+            ]
+            scored.to_csv(args.output, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False)
+
+    if engine is not None:
+        engine.shutdown()
+    if explainer is not None:
+        for incident in incidents.flush():
+            incident_log.write(incident.to_dict())
+        alert_log.close()
+        incident_log.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {total} readings in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} readings/s): "
+          f"{invalid} invalid, {flagged} anomalies"
+          + (f" in {incidents.incident_count} incidents" if incidents is not None else ""))
+    return 0
+
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    from src.alert_log import AlertLog
+    from src.streaming import StreamingPipeline, replay_source
+
+    detector = _load_detector(args)
+    alert_log = AlertLog(args.alerts_log)
+    pipeline = StreamingPipeline(detector, on_alert=alert_log.write,
+                                 queue_size=args.queue_size, detect_batch=args.batch_size)
+    start = time.perf_counter()
+    stats = asyncio.run(pipeline.run(replay_source(args.input, speed=args.speed, chunk_size=args.chunk_size)))
+    alert_log.close()
+
+    print(f"Replayed in {time.perf_counter() - start:.2f}s, {pipeline.alert_count} alerts")
+    for stage in stats:
+        print(f"  {stage['stage']:>8}: processed={stage['processed']:<8} dropped={stage['dropped']:<6} "
+              f"malformed={stage['malformed']:<6} "
+              f"throughput={stage['throughput_per_s']:10.0f}/s utilization={stage['utilization']:.1%}")
+    return 0
+
+
+def cmd_simulate(args: argparse.Namespace) -> int:
+    if args.stations == 1:
+        if args.workers is not None or args.batch_size is not None:
+            print("--workers and --batch-size need --stations > 1 (one station runs the reading-by-reading loop)",
+                  file=sys.stderr)
+            return 2
+        from src.main import WAVESystem
+        system = WAVESystem(warm_start=args.warm_start, instrument=args.instrument,
+                            dashboard=args.dashboard, feedback=args.feedback, seed=args.seed)
+        system.run(args.readings, training_cutoff=int(args.readings * args.training_fraction))
+        return 0
+
+    from src.simulator import SensorSimulator
+    from src.station_engine import MultiStationEngine
+    cutoff = int(args.readings * args.training_fraction)
+    batch_size = args.batch_size or STREAM_DETECT_BATCH
+    streams = SensorSimulator(seed=args.seed).generate_station_streams(args.stations, args.readings)
+    with MultiStationEngine(num_workers=args.workers) as engine:
+        start = time.perf_counter()
+        engine.train({sid: df.iloc[:cutoff] for sid, df in streams.items()})
+        print(f"Trained {args.stations} stations in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        alerts = dict.fromkeys(streams, 0)
+        for offset in range(cutoff, args.readings, batch_size):
+            results = engine.score({sid: df.iloc[offset:offset + batch_size] for sid, df in streams.items()})
+            for sid, result in results.items():
+                alerts[sid] += int(result['is_anomaly'].sum())
+        elapsed = time.perf_counter() - start
+
+    scored = args.stations * (args.readings - cutoff)
+    print(f"Scored {scored} readings in {elapsed:.2f}s ({scored / max(elapsed, 1e-9):.0f} readings/s), "
+          f"{sum(alerts.values())} alerts")
+    busiest = sorted(alerts.items(), key=lambda item: -item[1])[:5]
+    print("Most alerts: " + ", ".join(f"{sid}={count}" for sid, count in busiest))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='wave', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def model_args(command: argparse.ArgumentParser):
+        command.add_argument('--models-dir', type=Path, default=MODELS_DIR)
+        command.add_argument('--version', default=None, help="Model version to load (default: latest)")
+
+    train = commands.add_parser('train', help="Fit the ensemble on historical readings and save it")
+    source = train.add_mutually_exclusive_group()
+    source.add_argument('--input', type=Path, help="CSV of normal readings (default: simulate them)")
+    source.add_argument('--columnar', type=Path, nargs='?', const=COLUMNAR_DATA_DIR,
+                        help=f"Train on the columnar store (default directory: {COLUMNAR_DATA_DIR})")
+    train.add_argument('--rows', type=int, default=None, help="CSV or simulated history: use only the first N rows")
+    train.add_argument('--start', default=None, help="Columnar store: first timestamp to use")
+    train.add_argument('--end', default=None, help="Columnar store: last timestamp to use")
+    train.add_argument('--station', default=None, help="Only use readings of this station")
+    train.add_argument('--chunk-size', type=int, default=TRAINING_CHUNK_ROWS, help="Rows read per chunk")
+    train.add_argument('--sample-size', type=int, default=TRAINING_SAMPLE_SIZE,
+                       help="Rows sampled from the history to fit IF and SVM")
+    train.add_argument('--svm-backend', choices=['exact', 'sgd'], default=SVM_BACKEND)
+    train.add_argument('--models-dir', type=Path, default=MODELS_DIR)
+    train.add_argument('--seed', type=int, default=RANDOM_SEED)
+    train.set_defaults(handler=cmd_train)
+
+    score = commands.add_parser('score', help="Score a CSV file in chunks at full speed")
+    score.add_argument('--input', type=Path, required=True)
+    score.add_argument('--output', type=Path, help="Write the readings with validity and anomaly columns")
+    score.add_argument('--batch-size', type=int, default=10_000, help="Rows read and scored per chunk")
+    score.add_argument('--workers', type=int, default=0,
+                       help="Score each station separately on this many processes (0 = one stream, in-process)")
+    score.add_argument('--no-explain', dest='explain', action='store_false',
+                       help="Skip explanations, alert and incident logs")
+    score.add_argument('--alerts-log', type=Path, default=ALERTS_LOG_FILENAME)
+    score.add_argument('--incidents-log', type=Path, default=INCIDENTS_LOG_FILENAME)
+    score.add_argument('--feedback-log', type=Path, default=FEEDBACK_LOG_FILENAME,
+                       help="Feedback ledger whose per-station sensitivities --workers applies")
+    model_args(score)
+    score.set_defaults(handler=cmd_score)
+
+    replay = commands.add_parser('replay', help="Stream a recorded CSV through the pipeline")
+    replay.add_argument('--input', type=Path, required=True)
+    replay.add_argument('--speed', type=float, default=0.0,
+                        help="Rate relative to real time (1 = real time, 0 = as fast as possible)")
+    replay.add_argument('--batch-size', type=int, default=STREAM_DETECT_BATCH, help="Max readings per detect call")
+    replay.add_argument('--queue-size', type=int, default=STREAM_QUEUE_SIZE)
+    replay.add_argument('--chunk-size', type=int, default=10_000, help="CSV rows read at a time")
+    replay.add_argument('--alerts-log', type=Path, default=ALERTS_LOG_FILENAME)
+    model_args(replay)
+    replay.set_defaults(handler=cmd_replay)
+
+    simulate = commands.add_parser('simulate', help="Run the simulated system on one or many stations")
+    simulate.add_argument('--stations', type=int, default=1)
+    simulate.add_argument('--readings', type=int, default=1000, help="Readings per station")
+    simulate.add_argument('--training-fraction', type=float, default=0.8)
+    simulate.add_argument('--workers', type=int, default=None,
+                          help="Station worker processes (0 = in-process, default one per core); --stations > 1 only")
+    simulate.add_argument('--batch-size', type=int, default=None,
+                          help=f"Readings scored per call (default {STREAM_DETECT_BATCH}); --stations > 1 only")
+    simulate.add_argument('--no-dashboard', dest='dashboard', action='store_false')
+    simulate.add_argument('--no-feedback', dest='feedback', action='store_false')
+    simulate.add_argument('--warm-start', action='store_true', help="Load saved models instead of training")
+    simulate.add_argument('--instrument', action='store_true', help="Record per-stage latency metrics")
+    simulate.add_argument('--seed', type=int, default=RANDOM_SEED)
+    simulate.set_defaults(handler=cmd_simulate)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    ensure_directories()
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,10 +8,14 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 LOGS_DIR = DATA_DIR / "logs"
+MODELS_DIR = DATA_DIR / "models"
+COLUMNAR_DATA_DIR = DATA_DIR / "columnar"
 
-# Ensure directories exist
-RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
-LOGS_DIR.mkdir(parents=True, exist_ok=True)
+
+def ensure_directories():
+    """Create the data directories (done by entry points, not at import)."""
+    for directory in (RAW_DATA_DIR, LOGS_DIR, MODELS_DIR, COLUMNAR_DATA_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Sensor Baselines & Thresholds
 BASELINE_PH = (7.0, 7.4)
@@ -25,14 +29,126 @@ VALID_RANGE_TURBIDITY = (0.0, 1000.0) # Assumed max
 VALID_RANGE_TDS = (0.0, 2000.0)       # Assumed max
 VALID_RANGE_TEMP = (-10.0, 50.0)
 
+# Sensor Health Checks
+STUCK_READINGS_THRESHOLD = 10  # Flag a sensor whose value is unchanged for more readings than this
+SPIKE_THRESHOLDS = {           # Max plausible change between consecutive readings
+    'pH': 5.0,
+    'turbidity_ntu': 200.0,
+    'tds_mgl': 1000.0,
+    'temp_celsius': 15.0
+}
+
+# Alert Explanation Rules
+# Status thresholds per explained parameter: above `high` is HIGH, below `low` is LOW
+EXPLAINER_THRESHOLDS = {
+    'pH': {'column': 'pH', 'high': BASELINE_PH[1] + 0.5, 'low': BASELINE_PH[0] - 0.5},
+    'turbidity': {'column': 'turbidity_ntu', 'high': BASELINE_TURBIDITY[1] + 1.0},  # Only high matters
+    'tds': {'column': 'tds_mgl', 'high': BASELINE_TDS[1] + 50},
+    'temp': {'column': 'temp_celsius', 'high': BASELINE_TEMP[1] + 3.0}
+}
+# Cause patterns, first match wins; a condition is one status or a list of statuses
+EXPLAINER_PATTERNS = [
+    {'when': {'pH': 'HIGH', 'turbidity': 'NORMAL'}, 'cause': "Alkaline Discharge",
+     'action': "Check nearby industrial outlets for alkaline waste."},
+    {'when': {'pH': 'LOW', 'turbidity': 'NORMAL'}, 'cause': "Acidic Discharge",
+     'action': "Potentially acidic industrial runoff. Inspect upstream."},
+    {'when': {'turbidity': 'HIGH', 'tds': 'HIGH'}, 'cause': "Significant Contamination",
+     'action': "High turbidity and dissolved solids. Possible sewage or mixed waste."},
+    {'when': {'turbidity': 'HIGH', 'pH': 'NORMAL'}, 'cause': "Sewage/Sediment",
+     'action': "Likely sewage discharge or high sediment load. Check structural integrity."},
+    {'when': {'temp': 'HIGH'}, 'cause': "Thermal Pollution",
+     'action': "Abnormal temperature rise. Check coolant discharge lines."},
+    {'when': {'pH': ['HIGH', 'LOW'], 'turbidity': 'HIGH'}, 'cause': "Complex Chemical Spill",
+     'action': "Multiple parameters deviation indicates complex spill. Immediate isolation required."}
+]
+EXPLAINER_FALLBACK = {'cause': "Unknown Anomaly", 'action': "Unusual pattern detected. Manual sampling recommended."}
+
+# Sensor Feature Columns (order used by the ML models)
+FEATURE_COLUMNS = ['pH', 'turbidity_ntu', 'tds_mgl', 'temp_celsius']
+
 # Model Parameters
 ROLLING_WINDOW_SIZE = 24
+ZSCORE_THRESHOLD = 3.0
 ANOMALY_CONTAMINATION_RATE_INIT = 0.05
 NU_PARAMETER = 0.05
+SVM_BACKEND = 'exact'  # 'exact' (RBF OneClassSVM) or 'sgd' (Nystroem + SGDOneClassSVM)
+SGD_SVM_COMPONENTS = 300  # Kernel approximation size for the 'sgd' backend
 RANDOM_SEED = 42
+BACKGROUND_RETRAIN = True  # Refit models on a worker thread and swap them in
+IF_THRESHOLD_RECALIBRATION = True  # Sensitivity changes move the IF threshold instead of refitting
+DETECTION_CASCADE = True     # Run IF/SVM cheapest-first and skip the rest once the 2-of-3 vote is decided
+DETECTION_FULL_VOTES = True  # ...except on flagged readings, whose explanation confidence needs every vote
+DETECTION_CASCADE_ORDER = ['One-Class SVM', 'Isolation Forest']  # Cheapest first (benchmarks/bench_cascade.py)
+INFERENCE_KERNEL = True      # Score single readings with the exported NumPy kernel (falls back to scikit-learn)
+
+# Continual Training (bounded training sample + drift-triggered refits)
+TRAINING_RESERVOIR_SIZE = 2000   # Readings confirmed normal kept for refits
+TRAINING_STRATUM_S = 24 * 3600   # The sample is stratified by time in buckets this wide...
+TRAINING_STRATA = 7              # ...keeping equal shares of the most recent ones
+DRIFT_HALF_LIFE_READINGS = 1440  # EWMA half-life of the per-sensor drift statistic (~1 day at 1/min)
+DRIFT_MEAN_THRESHOLD = 0.5       # Refit when a sensor's EWMA mean moves this many training std devs...
+DRIFT_SCALE_THRESHOLD = 1.5      # ...or its EWMA std grows/shrinks by this factor
+DRIFT_CLIP = 3.0                 # Standardized values are clipped here so short anomalies barely register
+CONTINUAL_TRAINING = True
+
+# Out-of-core Training (historical data streamed in chunks)
+TRAINING_CHUNK_ROWS = 100_000  # Rows read per chunk
+TRAINING_SAMPLE_SIZE = 5000    # Uniform sample of the history the IF/SVM are fitted on
+
+# Columnar Storage
+STORAGE_FLUSH_SIZE = 1000         # Buffered readings per flush
+STORAGE_FLUSH_INTERVAL_S = 5.0    # Max seconds a reading stays buffered
+
+# Streaming Ingest
+STREAM_QUEUE_SIZE = 1000   # Bounded queue between pipeline stages (backpressure)
+STREAM_DETECT_BATCH = 256  # Max readings scored per detect_batch call
+
+# Incident Aggregation
+INCIDENT_MERGE_GAP_S = 600  # Alerts with the same station and cause this close merge into one incident
+INCIDENT_MAX_OPEN = 1000    # Open incidents tracked at once (stalest closed first)
+
+# Alert Log (newline-delimited JSON)
+ALERT_LOG_FLUSH_RECORDS = 100          # Buffered records per write
+ALERT_LOG_FLUSH_INTERVAL_S = 1.0       # Max seconds a record stays buffered
+ALERT_LOG_FSYNC = False                # fsync after every flush (durable, slower)
+ALERT_LOG_MAX_BYTES = 64 * 1024 ** 2   # Rotate the active file above this size...
+ALERT_LOG_MAX_AGE_S = 24 * 3600        # ...or once it is this old
+ALERT_LOG_COMPRESS = True              # gzip rotated segments
+ALERT_LOG_SEGMENTS_KEPT = 30
+
+# Feedback Ledger (append-only operator feedback with sliding-window FP statistics)
+FEEDBACK_WINDOW = 20                # Feedbacks per station/cause window (and per sensitivity decision)
+FEEDBACK_FP_HIGH = 0.6              # Window FP rate above which sensitivity is lowered...
+FEEDBACK_FP_LOW = 0.2               # ...and below which it is raised
+FEEDBACK_CAUSE_MIN_FEEDBACK = 10    # Feedbacks needed before a cause's FP rate changes its alerting
+FEEDBACK_SHADOW_EVERY = 5           # Every Nth suppressed alert still goes to operators, so its cause can recover
+FEEDBACK_CHECKPOINT_RECORDS = 1000  # Ledger records between counter checkpoints (bounds reload replay)
+FEEDBACK_LOG_FSYNC = True           # Force every feedback record to disk
+
+# Dashboard
+DASHBOARD_UPDATE_INTERVAL = 100  # Readings between dashboard renders
+DASHBOARD_MAX_POINTS = 2000      # Points per series after min/max decimation
+DASHBOARD_BACKGROUND_RENDER = True  # Render on a worker thread, off the detection loop
+
+# Model Persistence
+MODEL_ARTIFACT_FORMAT = 1
+MODEL_VERSIONS_KEPT = 5
+
+# Multi-Station Engine
+STATION_WORKERS = None  # Worker processes; None = one per CPU core, 0 = in-process
 
 # File Names
 DATASET_FILENAME = RAW_DATA_DIR / "wave_monitoring_data.csv"
+EXPLAINER_RULES_FILENAME = DATA_DIR / "explainer_rules.json"  # Optional global/per-station rule overrides
 DASHBOARD_FILENAME = PROJECT_ROOT / "wave_dashboard.png"
-ALERTS_LOG_FILENAME = LOGS_DIR / "alerts_log.json"
+ALERTS_LOG_FILENAME = LOGS_DIR / "alerts_log.ndjson"
+INCIDENTS_LOG_FILENAME = LOGS_DIR / "incidents_log.ndjson"
 LEARNING_METRICS_FILENAME = LOGS_DIR / "learning_metrics.json"
+FEEDBACK_LOG_FILENAME = LOGS_DIR / "feedback_ledger.ndjson"
+PERFORMANCE_METRICS_FILENAME = LOGS_DIR / "performance_metrics.json"
+PROFILE_FILENAME = LOGS_DIR / "wave_profile.prof"
+
+# Instrumentation
+INSTRUMENTATION_ENABLED = False
+SCORING_IMPORT_BUDGET_S = 1.5  # Max cold import time of the scoring-only modules
+METRICS_PORT = 9108  # Local Prometheus-style /metrics endpoint
@@ -1,54 +1,213 @@
-import matplotlib.pyplot as plt
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
-from src.config import DASHBOARD_FILENAME
+from src.config import (
+    DASHBOARD_FILENAME, DASHBOARD_MAX_POINTS, DASHBOARD_BACKGROUND_RENDER, FEATURE_COLUMNS
+)
 
-class DashboardGenerator:
-    def create_dashboard(self, data: pd.DataFrame, alerts: List[Dict[str, Any]]):
-        """Generate static dashboard image."""
+if TYPE_CHECKING:  # matplotlib is imported on first use; scoring-only processes never load it
+    from matplotlib.figure import Figure
+
+# (column, title, color) per panel, in FEATURE_COLUMNS order
+PANELS = [
+    ('pH', 'pH Level', 'blue'),
+    ('turbidity_ntu', 'Turbidity (NTU)', 'brown'),
+    ('tds_mgl', 'TDS (mg/L)', 'green'),
+    ('temp_celsius', 'Temperature (°C)', 'red')
+]
+
+
+def minmax_decimate(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Sorted indices of a min/max decimation of `values` to ~`max_points` points.
+
+    Each bucket keeps its lowest and highest sample, so spikes survive
+    downsampling (unlike striding). First and last points are always kept.
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    bucket = -(-n // max(max_points // 2, 1))  # ceil
+    full = (n // bucket) * bucket
+    blocks = values[:full].reshape(-1, bucket)
+    offsets = np.arange(0, full, bucket)
+    indices = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        tail = values[full:]
+        indices.append([full + tail.argmin(), full + tail.argmax()])
+    return np.unique(np.concatenate(indices))
+
+
+class DashboardRenderer:
+    """Persistent dashboard that appends new readings instead of redrawing history.
+
+    The figure, axes and line artists are built once; each render swaps in
+    min/max-decimated series (at most ~`max_points` each), so render cost
+    stays flat however long the run. With `background=True` renders run on
+    a worker thread; requests made while one is in flight are coalesced.
+    """
+
+    def __init__(self, filename: Optional[Path] = None, max_points: int = DASHBOARD_MAX_POINTS,
+                 background: bool = DASHBOARD_BACKGROUND_RENDER):
+        self.filename = Path(filename) if filename is not None else DASHBOARD_FILENAME
+        self.max_points = max_points
+        self.background = background
+        self.render_count = 0
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self._times = np.empty(1024)  # matplotlib date numbers
+        self._values = np.empty((1024, len(FEATURE_COLUMNS)))
+        self._alert_times: List[float] = []
+        self._alert_values: List[List[float]] = []
+        self._latest_alert: Optional[Dict[str, Any]] = None
+
+        self._figure: Optional['Figure'] = None
+        self._pending = threading.Event()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, data: pd.DataFrame):
+        """Add readings (rows after the ones already appended)."""
+        import matplotlib.dates as mdates
         if data.empty:
             return
+        times = mdates.date2num(pd.to_datetime(data['timestamp']).to_numpy())
+        values = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        with self._lock:
+            end = self._size + len(data)
+            if end > len(self._times):
+                # Grow into new buffers; an in-flight render keeps reading the old ones
+                capacity = max(end, 2 * len(self._times))
+                grown_times = np.empty(capacity)
+                grown_values = np.empty((capacity, len(FEATURE_COLUMNS)))
+                grown_times[:self._size] = self._times[:self._size]
+                grown_values[:self._size] = self._values[:self._size]
+                self._times, self._values = grown_times, grown_values
+            self._times[self._size:end] = times
+            self._values[self._size:end] = values
+            self._size = end
+
+    def add_alert(self, alert: Dict[str, Any]):
+        """Mark an alert on every panel at its reading's timestamp."""
+        import matplotlib.dates as mdates
+        reading = alert['reading']
+        with self._lock:
+            self._alert_times.append(mdates.date2num(pd.Timestamp(alert['timestamp'])))
+            self._alert_values.append([reading.get(col, np.nan) for col in FEATURE_COLUMNS])
+            self._latest_alert = alert
+
+    def render(self):
+        """Redraw the image (queued on the worker thread when `background`)."""
+        if not self.background:
+            self._render()
+            return
+        if self._thread is None:
+            # A renderer reused after close() starts a fresh worker
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name='wave-dashboard', daemon=True)
+            self._thread.start()
+        self._pending.set()
 
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-        fig.suptitle(f'WAVE System Dashboard (Last {len(data)} Readings)', fontsize=16)
-        
-        # Plot parameters
-        params = [
-            ('pH', 'pH Level', axes[0, 0], 'blue'),
-            ('turbidity_ntu', 'Turbidity (NTU)', axes[0, 1], 'brown'),
-            ('tds_mgl', 'TDS (mg/L)', axes[1, 0], 'green'),
-            ('temp_celsius', 'Temperature (°C)', axes[1, 1], 'red')
-        ]
-        
-        timestamps = pd.to_datetime(data['timestamp'])
-        
-        for col, title, ax, color in params:
-            ax.plot(timestamps, data[col], label=col, color=color)
+    def close(self):
+        """Stop the worker thread and write a final, up-to-date image.
+
+        The renderer stays usable: a later `render` starts a new worker.
+        """
+        if self._thread is not None:
+            self._closing = True
+            self._pending.set()
+            self._thread.join()
+            self._thread = None
+        self._render()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            if self._closing:
+                return
+            try:
+                self._render()
+            except Exception as e:
+                print(f"Dashboard render failed: {e}")
+
+    def _build_figure(self):
+        import matplotlib.dates as mdates
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=(15, 10))
+        FigureCanvasAgg(figure)
+        axes = figure.subplots(2, 2).ravel()
+        self._title = figure.suptitle('', fontsize=16)
+        self._lines, self._markers = [], []
+        for ax, (col, title, color) in zip(axes, PANELS):
+            self._lines.append(ax.plot([], [], label=col, color=color)[0])
+            self._markers.append(ax.plot([], [], linestyle='none', marker='x', color='black',
+                                         markersize=8, label='alert')[0])
             ax.set_title(title)
             ax.grid(True, alpha=0.3)
-            
-            # Highlight anomalies from recent data
-            # (In a real dashboard we'd map alerts to timestamps exactly)
-            
-        # Add Alert Summary Text (simplified for static image)
-        alert_text = f"Active Alerts: {len(alerts)}\n"
-        if alerts:
-            last_alert = alerts[-1]
-            alert_text += f"Latest: {last_alert['explanation']['likely_cause']} ({last_alert['timestamp']})"
-            
-        fig.text(0.5, 0.02, alert_text, ha='center', fontsize=12, bbox=dict(facecolor='white', alpha=0.8))
-        
-        plt.tight_layout(rect=[0, 0.05, 1, 0.95])
-        plt.savefig(DASHBOARD_FILENAME)
-        plt.close()
-        print(f"Dashboard updated: {DASHBOARD_FILENAME}")
+            ax.xaxis_date()
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+        self._summary = figure.text(0.5, 0.02, '', ha='center', fontsize=12,
+                                    bbox=dict(facecolor='white', alpha=0.8))
+        figure.tight_layout(rect=[0, 0.05, 1, 0.95])
+        self._axes = axes
+        self._figure = figure
+
+    def _render(self):
+        with self._lock:
+            size, times, values = self._size, self._times, self._values
+            alert_times = np.array(self._alert_times)
+            alert_values = np.array(self._alert_values).reshape(-1, len(FEATURE_COLUMNS))
+            latest_alert = self._latest_alert
+        if size == 0:
+            return
+        if self._figure is None:
+            self._build_figure()
+
+        times = times[:size]
+        for index, (ax, line, markers) in enumerate(zip(self._axes, self._lines, self._markers)):
+            series = values[:size, index]
+            keep = minmax_decimate(series, self.max_points)
+            line.set_data(times[keep], series[keep])
+            markers.set_data(alert_times, alert_values[:, index])
+            ax.relim()
+            ax.autoscale_view()
+
+        self._title.set_text(f'WAVE System Dashboard (Last {size} Readings)')
+        alert_text = f"Active Alerts: {len(alert_times)}\n"
+        if latest_alert:
+            alert_text += f"Latest: {latest_alert['explanation']['likely_cause']} ({latest_alert['timestamp']})"
+        self._summary.set_text(alert_text)
+
+        self._figure.savefig(self.filename)
+        self.render_count += 1
+        print(f"Dashboard updated: {self.filename}")
+
+
+class DashboardGenerator:
+    def create_dashboard(self, data: pd.DataFrame, alerts: List[Dict[str, Any]]):
+        """Generate static dashboard image (one-shot; use DashboardRenderer in loops)."""
+        if data.empty:
+            return
+
+        renderer = DashboardRenderer(background=False)
+        renderer.append(data)
+        for alert in alerts:
+            renderer.add_alert(alert)
+        renderer.render()
 
 class FeedbackInterface:
     def simulate_feedback(self, alert: Dict[str, Any]) -> str:
         """Simulate operator feedback based on ground truth."""
         # Check if the alert corresponds to a real injected anomaly
         reading_type = alert['reading'].get('dataset_type', 'normal')
-        
+
         if reading_type == 'anomaly':
             # It was a real anomaly
             return 'TRUE_POSITIVE'
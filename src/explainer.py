@@ -1,75 +1,244 @@
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Union
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, List
-from src.config import BASELINE_PH, BASELINE_TURBIDITY, BASELINE_TDS, BASELINE_TEMP
+from src.config import (
+    EXPLAINER_THRESHOLDS, EXPLAINER_PATTERNS, EXPLAINER_FALLBACK, EXPLAINER_RULES_FILENAME
+)
+from src.records import Reading, block_frame
+
+STATUSES = ['NORMAL', 'HIGH', 'LOW']  # Status codes 0, 1, 2
+
+
+def merge_thresholds(base: Dict[str, Dict[str, Any]],
+                     overrides: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-parameter merge: override fields replace base fields, new parameters are added."""
+    merged = {param: dict(spec) for param, spec in base.items()}
+    for param, spec in overrides.items():
+        merged.setdefault(param, {}).update(spec)
+        if 'column' not in merged[param]:
+            raise ValueError(f"Threshold for new parameter {param!r} needs a 'column'")
+    return merged
+
+
+def _bound(value: Optional[float], default: float) -> float:
+    return default if value is None else float(value)
+
+
+class CompiledRules:
+    """A threshold + pattern rule table compiled into a status-code lookup.
+
+    Each reading's parameter statuses form a base-3 code (NORMAL=0, HIGH=1,
+    LOW=2 per parameter). Every possible code is matched against the
+    patterns once, here, so explaining a reading is thresholding plus one
+    table lookup, and a whole frame is a few vectorized comparisons.
+    """
+
+    def __init__(self, thresholds: Dict[str, Dict[str, Any]], patterns: List[Dict[str, Any]],
+                 fallback: Dict[str, str] = EXPLAINER_FALLBACK):
+        self.params = list(thresholds)
+        self.columns = [thresholds[p]['column'] for p in self.params]
+        self.high = np.array([_bound(thresholds[p].get('high'), np.inf) for p in self.params])
+        self.low = np.array([_bound(thresholds[p].get('low'), -np.inf) for p in self.params])
+        self.weights = 3 ** np.arange(len(self.params))
+        self.param_of = dict(zip(self.columns, self.params))
+        self._scalar = list(zip(self.columns, self.high.tolist(), self.low.tolist(), self.weights.tolist()))
+
+        conditions = [self._compile_condition(pattern['when']) for pattern in patterns]
+        size = 3 ** len(self.params)
+        self.causes = np.empty(size, dtype=object)
+        self.actions = np.empty(size, dtype=object)
+        self.anomalies = np.empty(size, dtype=object)
+        for code in range(size):
+            digits = self.digits(code)
+            match = next((pattern for pattern, allowed in zip(patterns, conditions)
+                          if all(digits[i] in statuses for i, statuses in allowed)), fallback)
+            self.causes[code] = match['cause']
+            self.actions[code] = match['action']
+            self.anomalies[code] = tuple(f"{param} is {STATUSES[digit]}"
+                                         for param, digit in zip(self.params, digits) if digit)
+
+    def _compile_condition(self, when: Dict[str, Union[str, List[str]]]):
+        allowed = []
+        for param, statuses in when.items():
+            if param not in self.params:
+                raise ValueError(f"Pattern condition on unknown parameter {param!r}")
+            statuses = [statuses] if isinstance(statuses, str) else statuses
+            for status in statuses:
+                if status not in STATUSES:
+                    raise ValueError(f"Unknown status {status!r} (expected one of {STATUSES})")
+            allowed.append((self.params.index(param), {STATUSES.index(s) for s in statuses}))
+        return allowed
+
+    def digits(self, code: int) -> List[int]:
+        return [(code // 3 ** i) % 3 for i in range(len(self.params))]
+
+    def code(self, reading) -> int:
+        """Status code of one reading (Reading, dict or Series)."""
+        if isinstance(reading, Reading):
+            reading = reading.to_dict()  # One conversion beats a lookup per parameter
+        code = 0
+        for column, high, low, weight in self._scalar:
+            value = reading[column]
+            if value > high:
+                code += weight
+            elif value < low:
+                code += 2 * weight
+        return code
+
+    def codes(self, values: np.ndarray) -> np.ndarray:
+        """Status codes of a (n, len(params)) value matrix."""
+        statuses = np.where(values > self.high, 1, np.where(values < self.low, 2, 0))
+        return statuses @ self.weights
+
+    def status(self, code: int) -> Dict[str, str]:
+        return {param: STATUSES[digit] for param, digit in zip(self.params, self.digits(code))}
+
+    def encode(self, status: Dict[str, str]) -> int:
+        return sum(STATUSES.index(status[param]) * 3 ** i for i, param in enumerate(self.params))
+
+
+def _sudden_changes(rules: CompiledRules, spikes: Sequence[str]) -> List[str]:
+    return [f"{rules.param_of.get(col, col)} jumped" for col in spikes]
+
 
 class AlertExplainer:
-    def get_parameter_status(self, reading: pd.Series) -> Dict[str, str]:
+    """Rule-table explanations for flagged readings.
+
+    Default thresholds and patterns come from config. `rules` (or the JSON
+    `rules_file`, when it exists) may override them globally and per station:
+
+        {"thresholds": {"tds": {"high": 400}},
+         "patterns": [{"when": {...}, "cause": "...", "action": "..."}],
+         "stations": {"station_001": {"thresholds": {...}, "patterns": [...]}}}
+
+    Threshold overrides merge per parameter; override patterns are checked
+    before the inherited ones.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None,
+                 rules_file: Optional[Path] = EXPLAINER_RULES_FILENAME):
+        if rules is None and rules_file is not None and Path(rules_file).exists():
+            with open(rules_file) as f:
+                rules = json.load(f)
+        rules = rules or {}
+        self.thresholds = merge_thresholds(EXPLAINER_THRESHOLDS, rules.get('thresholds', {}))
+        self.patterns = list(rules.get('patterns', [])) + EXPLAINER_PATTERNS
+        self.station_rules: Dict[str, Dict[str, Any]] = {}
+        self._compiled: Dict[Optional[str], CompiledRules] = {None: CompiledRules(self.thresholds, self.patterns)}
+        for station_id, overrides in rules.get('stations', {}).items():
+            self.set_station_rules(station_id, overrides.get('thresholds'), overrides.get('patterns'))
+
+    def set_station_rules(self, station_id: str, thresholds: Optional[Dict[str, Dict[str, Any]]] = None,
+                          patterns: Optional[List[Dict[str, Any]]] = None):
+        """Override thresholds and/or add patterns for one station."""
+        self.station_rules[station_id] = {'thresholds': thresholds or {}, 'patterns': patterns or []}
+        self._compiled.pop(station_id, None)
+        self.rules_for(station_id)  # Compile now so bad rules fail here
+
+    def rules_for(self, station_id: Optional[str] = None) -> CompiledRules:
+        compiled = self._compiled.get(station_id)
+        if compiled is None:
+            overrides = self.station_rules.get(station_id)
+            if overrides is None:
+                compiled = self._compiled[None]
+            else:
+                compiled = CompiledRules(merge_thresholds(self.thresholds, overrides['thresholds']),
+                                         overrides['patterns'] + self.patterns)
+            self._compiled[station_id] = compiled
+        return compiled
+
+    def get_parameter_status(self, reading: pd.Series, station_id: Optional[str] = None) -> Dict[str, str]:
         """Determine if parameters are High, Low, or Normal."""
-        status = {}
-        
-        # pH
-        if reading['pH'] > BASELINE_PH[1] + 0.5: status['pH'] = 'HIGH'
-        elif reading['pH'] < BASELINE_PH[0] - 0.5: status['pH'] = 'LOW'
-        else: status['pH'] = 'NORMAL'
-        
-        # Turbidity (only high matters)
-        if reading['turbidity_ntu'] > BASELINE_TURBIDITY[1] + 1.0: status['turbidity'] = 'HIGH'
-        else: status['turbidity'] = 'NORMAL'
-        
-        # TDS
-        if reading['tds_mgl'] > BASELINE_TDS[1] + 50: status['tds'] = 'HIGH'
-        else: status['tds'] = 'NORMAL'
-        
-        # Temp
-        if reading['temp_celsius'] > BASELINE_TEMP[1] + 3.0: status['temp'] = 'HIGH'
-        else: status['temp'] = 'NORMAL'
-        
-        return status
-
-    def match_pattern(self, status: Dict[str, str]) -> tuple[str, str]:
+        rules = self.rules_for(station_id)
+        return rules.status(rules.code(reading))
+
+    def match_pattern(self, status: Dict[str, str], station_id: Optional[str] = None) -> tuple[str, str]:
         """Match parameter patterns to likely causes."""
-        ph = status['pH']
-        turb = status['turbidity']
-        temp = status['temp']
-        
-        if ph == 'HIGH' and turb == 'NORMAL':
-            return "Alkaline Discharge", "Check nearby industrial outlets for alkaline waste."
-            
-        if ph == 'LOW' and turb == 'NORMAL':
-            return "Acidic Discharge", "Potentially acidic industrial runoff. Inspect upstream."
-            
-        if turb == 'HIGH' and status['tds'] == 'HIGH':
-            return "Significant Contamination", "High turbidity and dissolved solids. Possible sewage or mixed waste."
-
-        if turb == 'HIGH' and ph == 'NORMAL':
-            return "Sewage/Sediment", "Likely sewage discharge or high sediment load. Check structural integrity."
-            
-        if temp == 'HIGH':
-            return "Thermal Pollution", "Abnormal temperature rise. Check coolant discharge lines."
-            
-        if ph != 'NORMAL' and turb == 'HIGH':
-             return "Complex Chemical Spill", "Multiple parameters deviation indicates complex spill. Immediate isolation required."
-
-        return "Unknown Anomaly", "Unusual pattern detected. Manual sampling recommended."
-
-    def generate_explanation(self, reading: pd.Series, models_triggered: List[str]) -> Dict[str, Any]:
-        """Generate human-readable alert explanation."""
-        status = self.get_parameter_status(reading)
-        cause, action = self.match_pattern(status)
-        
-        # Calculate Deviation
-        anomalies = []
-        for param, val in status.items():
-            if val != 'NORMAL':
-                anomalies.append(f"{param} is {val}")
+        rules = self.rules_for(station_id)
+        code = rules.encode(status)
+        return rules.causes[code], rules.actions[code]
+
+    def likely_cause(self, reading: Union[Reading, pd.Series], station_id: Optional[str] = None) -> str:
+        """The cause `generate_explanation` would give `reading` (one table lookup, no models needed)."""
+        if station_id is None and self.station_rules:
+            station_id = reading.get('station_id')
+        rules = self.rules_for(station_id)
+        return rules.causes[rules.code(reading)]
+
+    def generate_explanation(self, reading: Union[Reading, pd.Series, pd.DataFrame], models_triggered: List[str],
+                             station_id: Optional[str] = None, spikes: Sequence[str] = ()) -> Dict[str, Any]:
+        """Generate human-readable alert explanation.
+
+        `spikes` are the sensor columns the validator flagged as jumping
+        since the previous reading. Given a DataFrame of flagged readings,
+        explains them all in one pass (see `explain_batch`).
+        """
+        if isinstance(reading, pd.DataFrame):
+            return self.explain_batch(reading, models_triggered, station_id, spikes or None)
+        if station_id is None and self.station_rules:
+            station_id = reading.get('station_id')
+        rules = self.rules_for(station_id)
+        code = rules.code(reading)
 
         active_models = [m for m in models_triggered if m]
         confidence = "HIGH" if len(active_models) == 3 else "MEDIUM"
-        
+
         return {
-            'anomalous_parameters': anomalies,
-            'likely_cause': cause,
-            'recommended_action': action,
+            'anomalous_parameters': list(rules.anomalies[code]),
+            'sudden_changes': _sudden_changes(rules, spikes),
+            'likely_cause': rules.causes[code],
+            'recommended_action': rules.actions[code],
             'confidence': confidence,
             'models_triggered': active_models
         }
+
+    def explain_batch(self, data: Union[pd.DataFrame, np.ndarray], models_triggered: Optional[Sequence[List[str]]] = None,
+                      station_id: Optional[str] = None, spikes: Optional[Sequence[Sequence[str]]] = None) -> pd.DataFrame:
+        """Explain every row of `data` (DataFrame or READING_DTYPE array) at once; one output row per input row.
+
+        `models_triggered` is one list per row (as in `detect_batch` output);
+        when omitted, `data`'s models_triggered column is used if present.
+        `spikes` is likewise one list of spiking sensor columns per row.
+        Rows are matched against their own station's rules when `data` has a
+        station_id column; rows without a station use the global rules.
+        """
+        if isinstance(data, np.ndarray):
+            data = block_frame(data)
+        if station_id is None and 'station_id' in data.columns:
+            groups = [(None if pd.isna(station) else station, positions)
+                      for station, positions in data.groupby('station_id', sort=False, dropna=False).indices.items()]
+        else:
+            groups = [(station_id, slice(None))]
+
+        causes = np.empty(len(data), dtype=object)
+        actions = np.empty(len(data), dtype=object)
+        anomalies = np.empty(len(data), dtype=object)
+        changes = [[] for _ in range(len(data))]
+        for group_station, positions in groups:
+            rules = self.rules_for(group_station)
+            codes = rules.codes(data.iloc[positions][rules.columns].to_numpy(dtype=np.float64))
+            causes[positions] = rules.causes[codes]
+            actions[positions] = rules.actions[codes]
+            anomalies[positions] = rules.anomalies[codes]
+            if spikes is not None:
+                for position in np.arange(len(data))[positions]:
+                    changes[position] = _sudden_changes(rules, spikes[position])
+
+        if models_triggered is None and 'models_triggered' in data.columns:
+            models_triggered = data['models_triggered']
+        if models_triggered is None:
+            active_models = [[] for _ in range(len(data))]
+        else:
+            active_models = [[m for m in models if m] for models in models_triggered]
+        model_counts = np.fromiter((len(models) for models in active_models), dtype=np.int64, count=len(data))
+
+        return pd.DataFrame({
+            'anomalous_parameters': [list(a) for a in anomalies],
+            'sudden_changes': changes,
+            'likely_cause': causes,
+            'recommended_action': actions,
+            'confidence': np.where(model_counts == 3, 'HIGH', 'MEDIUM'),
+            'models_triggered': active_models
+        }, index=data.index)
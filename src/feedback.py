@@ -0,0 +1,261 @@
+import json
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from src.config import FEEDBACK_LOG_FILENAME, FEEDBACK_WINDOW, FEEDBACK_CHECKPOINT_RECORDS, FEEDBACK_LOG_FSYNC
+from src.alert_log import AlertLog, AlertLogReader
+
+LEDGER_FORMAT = 1
+FEEDBACK_KINDS = ('TRUE_POSITIVE', 'FALSE_POSITIVE')
+ANY = '*'  # Station / cause wildcard in counter keys
+
+Key = Tuple[str, str]
+
+
+def _key(station_id: Optional[str] = None, likely_cause: Optional[str] = None) -> Key:
+    return (station_id or ANY, likely_cause or ANY)
+
+
+def _keys(station_id: Optional[str], likely_cause: Optional[str]) -> Iterable[Key]:
+    """Every counter one feedback updates: its pair, its station, its cause and the total."""
+    return {_key(station_id, likely_cause), _key(station_id), _key(None, likely_cause), _key()}
+
+
+class WindowCounter:
+    """True/false positive counts over the last `window` feedbacks of one key.
+
+    `pending` counts feedbacks since the key's sensitivity was last
+    adjusted. Every update is O(1).
+    """
+
+    __slots__ = ('outcomes', 'false_positives', 'pending')
+
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)  # True = false positive
+        self.false_positives = 0
+        self.pending = 0
+
+    def add(self, false_positive: bool):
+        if len(self.outcomes) == self.outcomes.maxlen:
+            self.false_positives -= self.outcomes[0]
+        self.outcomes.append(false_positive)
+        self.false_positives += false_positive
+        self.pending += 1
+
+    @property
+    def total(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def true_positives(self) -> int:
+        return len(self.outcomes) - self.false_positives
+
+    @property
+    def fp_rate(self) -> Optional[float]:
+        return self.false_positives / len(self.outcomes) if self.outcomes else None
+
+
+class FeedbackLedger:
+    """Durable operator feedback with sliding-window FP statistics per station and cause.
+
+    Feedback and sensitivity adjustments are appended to an NDJSON ledger
+    (an `AlertLog` flushed, and by default fsynced, after every record;
+    rotated and compressed but never pruned). Each feedback updates the
+    window counters of its (station, cause) pair, its station, its cause
+    and the total, so FP rates at any granularity are read without
+    rescanning history. Every `checkpoint_every` records the counters are
+    saved next to the ledger, and `load` restores that checkpoint and
+    replays only the records written after it. With `path=None` the
+    ledger is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = FEEDBACK_LOG_FILENAME, window: int = FEEDBACK_WINDOW,
+                 checkpoint_every: int = FEEDBACK_CHECKPOINT_RECORDS, fsync: bool = FEEDBACK_LOG_FSYNC):
+        self.path = Path(path) if path is not None else None
+        self.window = window
+        self.checkpoint_every = checkpoint_every
+        self.log = None
+        self.checkpoint_path = None
+        if self.path is not None:
+            self.log = AlertLog(self.path, time_field='recorded_at', flush_records=1, fsync=fsync, keep=0)
+            self.checkpoint_path = self.path.with_name(f"{self.path.stem}.checkpoint.json")
+        self.reset()
+
+    def reset(self):
+        """Forget all in-memory state (the ledger file is untouched)."""
+        self.counters: Dict[Key, WindowCounter] = {}
+        self.rates: Dict[Key, float] = {}  # Latest contamination rate set per key
+        self.seq = 0
+        self.last_recorded_at: Optional[datetime] = None
+        self._since_checkpoint = 0
+
+    # --- Writing ---
+
+    def record(self, alert_id: Optional[int], feedback: str, timestamp=None, station_id: Optional[str] = None,
+               likely_cause: Optional[str] = None, suppressed: bool = False,
+               incident_id: Optional[int] = None) -> Dict[str, Any]:
+        """Append one operator verdict on an alert and update its windows.
+
+        `incident_id` is the incident the alert opened, when it was sent
+        for feedback as one. `suppressed` marks a verdict on a shadow
+        alert, one that was held back from the alert log (it has no alert
+        id) but still shown to operators; it counts like any other.
+        """
+        if feedback not in FEEDBACK_KINDS:
+            raise ValueError(f"Unknown feedback: {feedback!r} (expected one of {FEEDBACK_KINDS})")
+        return self._append({
+            'event': 'feedback',
+            'alert_id': alert_id,
+            'incident_id': incident_id,
+            'timestamp': str(timestamp) if timestamp is not None else None,
+            'station_id': station_id,
+            'likely_cause': likely_cause,
+            'feedback': feedback,
+            'suppressed': suppressed
+        })
+
+    def record_adjustment(self, contamination_rate: float, station_id: Optional[str] = None,
+                          likely_cause: Optional[str] = None) -> Dict[str, Any]:
+        """Append a sensitivity change for a key; its pending count starts over."""
+        return self._append({
+            'event': 'adjust',
+            'station_id': station_id,
+            'likely_cause': likely_cause,
+            'contamination_rate': contamination_rate
+        })
+
+    def _append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        recorded_at = datetime.now()
+        if self.last_recorded_at is not None and recorded_at < self.last_recorded_at:
+            recorded_at = self.last_recorded_at  # The ledger must stay in time order
+        record = {'seq': self.seq + 1, 'recorded_at': recorded_at.isoformat(), **record}
+        if self.log is not None:
+            self.log.write(record)
+        self._apply(record)
+        self.last_recorded_at = recorded_at
+        self._since_checkpoint += 1
+        if self.checkpoint_path is not None and self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+        return record
+
+    def _apply(self, record: Dict[str, Any]):
+        self.seq = record['seq']
+        station_id, likely_cause = record.get('station_id'), record.get('likely_cause')
+        if record['event'] == 'feedback':
+            false_positive = record['feedback'] == 'FALSE_POSITIVE'
+            for key in _keys(station_id, likely_cause):
+                self._counter(key).add(false_positive)
+        elif record['event'] == 'adjust':
+            key = _key(station_id, likely_cause)
+            self.rates[key] = record['contamination_rate']
+            self._counter(key).pending = 0
+
+    def _counter(self, key: Key) -> WindowCounter:
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = WindowCounter(self.window)
+        return counter
+
+    # --- Statistics ---
+
+    def stats(self, station_id: Optional[str] = None, likely_cause: Optional[str] = None) -> WindowCounter:
+        """Window counter of a station, a cause, a pair, or (no arguments) all feedback."""
+        return self.counters.get(_key(station_id, likely_cause)) or WindowCounter(self.window)
+
+    def fp_rate(self, station_id: Optional[str] = None, likely_cause: Optional[str] = None) -> Optional[float]:
+        return self.stats(station_id, likely_cause).fp_rate
+
+    def station_rates(self) -> Dict[str, float]:
+        """Latest contamination rate set for each station (stations never adjusted are absent)."""
+        return {station_id: rate for (station_id, likely_cause), rate in self.rates.items()
+                if station_id != ANY and likely_cause == ANY}
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per key with its window counts (for metrics and reports)."""
+        return [{
+            'station_id': station_id,
+            'likely_cause': likely_cause,
+            'feedback': counter.total,
+            'false_positives': counter.false_positives,
+            'fp_rate': counter.fp_rate,
+            'pending': counter.pending,
+            'contamination_rate': self.rates.get((station_id, likely_cause))
+        } for (station_id, likely_cause), counter in sorted(self.counters.items())]
+
+    # --- Persistence ---
+
+    def checkpoint(self):
+        """Atomically save the counters and the position in the ledger."""
+        if self.checkpoint_path is None:
+            return
+        self.log.flush()
+        state = {
+            'format': LEDGER_FORMAT,
+            'window': self.window,
+            'seq': self.seq,
+            'recorded_at': self.last_recorded_at.isoformat() if self.last_recorded_at is not None else None,
+            'counters': [[station_id, likely_cause, ''.join('1' if fp else '0' for fp in counter.outcomes),
+                          counter.pending] for (station_id, likely_cause), counter in self.counters.items()],
+            'rates': [[station_id, likely_cause, rate] for (station_id, likely_cause), rate in self.rates.items()]
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def load(self) -> int:
+        """Rebuild the counters from the checkpoint plus the ledger records after it.
+
+        Without a usable checkpoint (missing, unreadable or for another
+        window size) the whole ledger is replayed. Returns the number of
+        records replayed.
+        """
+        self.reset()
+        if self.path is None:
+            return 0
+        state = self._read_checkpoint()
+        start = None
+        if state is not None:
+            for station_id, likely_cause, outcomes, pending in state['counters']:
+                counter = self._counter((station_id, likely_cause))
+                for flag in outcomes:
+                    counter.add(flag == '1')
+                counter.pending = pending
+            self.rates = {(station_id, likely_cause): rate for station_id, likely_cause, rate in state['rates']}
+            self.seq = state['seq']
+            start = state['recorded_at']
+
+        replayed = 0
+        last = None
+        for record in AlertLogReader(self.path, time_field='recorded_at').read(start=start):
+            if record['seq'] <= self.seq:
+                continue  # Already in the checkpoint
+            self._apply(record)
+            last = record['recorded_at']
+            replayed += 1
+        last = last or start
+        self.last_recorded_at = datetime.fromisoformat(last) if last is not None else None
+        self._since_checkpoint = replayed
+        return replayed
+
+    def _read_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable feedback checkpoint {self.checkpoint_path}: {e}")
+            return None
+        if state.get('format') != LEDGER_FORMAT or state.get('window') != self.window:
+            return None
+        return state
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.checkpoint()
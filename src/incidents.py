@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+from src.config import FEATURE_COLUMNS, INCIDENT_MERGE_GAP_S, INCIDENT_MAX_OPEN
+
+SEVERITY_RANK = {'WARNING': 0, 'CRITICAL': 1}
+LOG_TIME_FIELD = 'end'  # Incidents are logged as they close, which is in `end` order
+
+
+class Incident:
+    """One contamination event: a run of alerts with the same station and cause.
+
+    Only running aggregates are kept (counts, first/last time, per-parameter
+    peaks), so memory stays constant however long the event lasts.
+    """
+
+    def __init__(self, incident_id: int, key: Tuple[Optional[str], str], alert: Dict[str, Any],
+                 timestamp: pd.Timestamp):
+        self.id = incident_id
+        self.station_id, self.likely_cause = key
+        self.recommended_action = alert['explanation']['recommended_action']
+        self.start = timestamp
+        self.end = timestamp
+        self.alert_count = 0
+        self.first_alert_id = alert['id']
+        self.last_alert_id = alert['id']
+        self.severity = alert['severity']
+        self.peak: Dict[str, float] = {}
+        self.trough: Dict[str, float] = {}
+        self.model_counts: Dict[str, int] = {}
+        self.add(alert, timestamp)
+
+    def add(self, alert: Dict[str, Any], timestamp: pd.Timestamp):
+        self.end = max(self.end, timestamp)
+        self.alert_count += 1
+        self.last_alert_id = alert['id']
+        if SEVERITY_RANK.get(alert['severity'], 0) > SEVERITY_RANK.get(self.severity, 0):
+            self.severity = alert['severity']
+        reading = alert['reading']
+        for col in FEATURE_COLUMNS:
+            value = reading.get(col)
+            if value is None or value != value:  # Missing or NaN
+                continue
+            if col not in self.peak or value > self.peak[col]:
+                self.peak[col] = value
+            if col not in self.trough or value < self.trough[col]:
+                self.trough[col] = value
+        for model in alert['explanation']['models_triggered']:
+            self.model_counts[model] = self.model_counts.get(model, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'station_id': self.station_id,
+            'likely_cause': self.likely_cause,
+            'recommended_action': self.recommended_action,
+            'severity': self.severity,
+            'start': str(self.start),
+            'end': str(self.end),
+            'duration_s': (self.end - self.start).total_seconds(),
+            'alert_count': self.alert_count,
+            'first_alert_id': self.first_alert_id,
+            'last_alert_id': self.last_alert_id,
+            'peak': dict(self.peak),
+            'trough': dict(self.trough),
+            'models_triggered': dict(self.model_counts)
+        }
+
+
+class IncidentAggregator:
+    """Merges per-reading alerts into incidents.
+
+    An alert joins the open incident with the same (station_id, likely_cause)
+    if it arrives within `gap_seconds` of that incident's last alert;
+    otherwise it opens a new one. Incidents close once `gap_seconds` pass
+    without a matching alert (see `advance`), and at most `max_open` stay
+    open at a time (the stalest is closed first). Given alerts in time
+    order, incidents close in order of their `end` (last alert) time,
+    not their start. Incident ids start at `first_id`, so a run appending
+    to an existing incident log can continue its numbering.
+    """
+
+    def __init__(self, gap_seconds: float = INCIDENT_MERGE_GAP_S, max_open: int = INCIDENT_MAX_OPEN,
+                 first_id: int = 1):
+        self.gap = pd.Timedelta(seconds=gap_seconds)
+        self.max_open = max_open
+        self.open: 'OrderedDict[Tuple[Optional[str], str], Incident]' = OrderedDict()  # Least recently updated first
+        self.next_id = first_id
+        self.incident_count = 0
+        self.closed_count = 0
+
+    def add(self, alert: Dict[str, Any]) -> Tuple[Incident, bool, List[Incident]]:
+        """Fold `alert` in; returns (its incident, whether it is new, incidents closed meanwhile)."""
+        timestamp = pd.Timestamp(alert['timestamp'])
+        closed = self.advance(timestamp)
+        key = (alert['reading'].get('station_id'), alert['explanation']['likely_cause'])
+
+        incident = self.open.get(key)
+        if incident is not None:
+            incident.add(alert, timestamp)
+            self.open.move_to_end(key)
+            return incident, False, closed
+
+        self.incident_count += 1
+        incident = Incident(self.next_id, key, alert, timestamp)
+        self.next_id += 1
+        self.open[key] = incident
+        while len(self.open) > self.max_open:
+            closed.append(self._close(next(iter(self.open))))
+        return incident, True, closed
+
+    def advance(self, timestamp: pd.Timestamp) -> List[Incident]:
+        """Close incidents with no alert in the `gap_seconds` before `timestamp`."""
+        closed = []
+        while self.open:
+            key, incident = next(iter(self.open.items()))
+            if timestamp - incident.end <= self.gap:
+                break
+            closed.append(self._close(key))
+        return closed
+
+    def flush(self) -> List[Incident]:
+        """Close every open incident (end of run)."""
+        return [self._close(key) for key in list(self.open)]
+
+    def _close(self, key: Tuple[Optional[str], str]) -> Incident:
+        self.closed_count += 1
+        return self.open.pop(key)
@@ -0,0 +1,259 @@
+import numbers
+from pathlib import Path
+from typing import Dict, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.ml_engine import ModelSet
+
+KERNEL_FORMAT = 1
+BATCH_CHUNK_ROWS = 4096  # Rows traversed at once in batch mode (bounds the (rows, trees) index arrays)
+
+
+def _sequential_sum(values: np.ndarray) -> np.ndarray:
+    """Sum over the last axis strictly left to right (np.sum is pairwise).
+
+    scikit-learn accumulates tree depths one tree at a time; summing in the
+    same order keeps IF scores bit-for-bit identical.
+    """
+    return np.cumsum(values, axis=-1)[..., -1]
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average unsuccessful-search path length of a BST over n samples (as IsolationForest computes it)."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.where(n_samples == 2, 1.0, 0.0)
+    deep = n_samples > 2
+    lengths[deep] = (2.0 * (np.log(n_samples[deep] - 1.0) + np.euler_gamma)
+                     - 2.0 * (n_samples[deep] - 1.0) / n_samples[deep])
+    return lengths
+
+
+def _node_depths(tree) -> np.ndarray:
+    """Nodes on the path from the root to each node (the root counts 1), from a fitted `tree_`."""
+    depths = np.zeros(tree.node_count)
+    level, depth = np.array([0]), 1.0
+    while level.size:
+        depths[level] = depth
+        children = np.concatenate([tree.children_left[level], tree.children_right[level]])
+        level, depth = children[children >= 0], depth + 1.0
+    return depths
+
+
+def _subsamples_features(forest) -> bool:
+    """Whether the forest's trees were fitted on a subset (or reordering) of the features."""
+    max_features = forest.max_features
+    if not isinstance(max_features, numbers.Integral):
+        max_features = int(max_features * forest.n_features_in_)
+    return forest.bootstrap_features or max(1, int(max_features)) != forest.n_features_in_
+
+
+def _svm_gamma(svm) -> float:
+    """RBF gamma of a fitted OneClassSVM ('scale' and 'auto' are only resolved at fit time)."""
+    if isinstance(svm.gamma, numbers.Real):
+        return float(svm.gamma)
+    return float(svm._gamma)  # AttributeError if a scikit-learn release drops it: scoring falls back to sklearn
+
+
+class InferenceKernel:
+    """A trained ensemble (scaler + IF + SVM) exported to plain NumPy arrays.
+
+    Isolation Forest trees are flattened into one set of contiguous node
+    arrays (leaves point at themselves, so every reading walks the same
+    fixed number of levels), and the SVM is reduced to its support vectors
+    (or Nystroem landmarks and linear weights for the 'sgd' backend).
+    Scoring a reading needs no pandas, no input validation and no
+    scikit-learn, and reproduces scikit-learn's arithmetic step for step,
+    so votes are identical to `predict` (IF decision values bit for bit,
+    RBF SVM decision values to ~1e-15). Inputs must be finite (validated)
+    readings.
+
+    Export reads only public fitted attributes (`estimators_`, each tree's
+    `tree_`, `max_samples_`, support vectors and coefficients), except the
+    SVM's resolved gamma when it was fitted with gamma='scale' or 'auto'.
+    If export fails, `AnomalyDetector` scores with scikit-learn instead.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.mean = arrays['scaler_mean']
+        self.scale = arrays['scaler_scale']
+
+        self.roots = arrays['if_roots']
+        self.feature = arrays['if_feature']
+        self.threshold = arrays['if_threshold']
+        self.children = arrays['if_children']  # (nodes, 2): [left, right]
+        self._children_flat = self.children.ravel()
+        self.leaf_depth = arrays['if_leaf_depth']
+        self.depth = int(arrays['if_depth'])
+        self.if_denominator = float(arrays['if_denominator'])
+        self.if_offset = float(arrays['if_offset'])
+
+        self.svm_kind = str(arrays['svm_kind'])
+        self.svm_gamma = float(arrays['svm_gamma'])
+        self.svm_vectors = arrays['svm_vectors']
+        self.svm_vector_norms = arrays['svm_vector_norms']
+        self.svm_coef = arrays['svm_coef']
+        self.svm_weights = arrays['svm_weights']
+        self.svm_offset = float(arrays['svm_offset'])
+
+    @classmethod
+    def from_models(cls, models: 'ModelSet') -> 'InferenceKernel':
+        """Export a fitted ModelSet (AttributeError if the models lack an expected fitted attribute)."""
+        forest, svm = models.isolation_forest, models.one_class_svm
+        arrays = {
+            'format': np.int64(KERNEL_FORMAT),
+            'scaler_mean': np.asarray(models.scaler.mean_, dtype=np.float64),
+            'scaler_scale': np.asarray(models.scaler.scale_, dtype=np.float64)
+        }
+
+        # Isolation Forest: concatenate every tree's nodes
+        subsample = _subsamples_features(forest)
+        roots, features, thresholds, children, leaf_depths = [], [], [], [], []
+        offset = 0
+        for estimator, tree_features in zip(forest.estimators_, forest.estimators_features_):
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            feature = np.where(is_leaf, 0, tree.feature)
+            if subsample:
+                feature = np.asarray(tree_features)[feature]
+            roots.append(offset)
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.column_stack([
+                np.where(is_leaf, nodes, tree.children_left) + offset,
+                np.where(is_leaf, nodes, tree.children_right) + offset
+            ]))
+            leaf_depths.append(_node_depths(tree) + _average_path_length(tree.n_node_samples) - 1.0)
+            offset += tree.node_count
+        arrays.update({
+            'if_roots': np.array(roots, dtype=np.intp),
+            'if_feature': np.concatenate(features).astype(np.intp),
+            'if_threshold': np.concatenate(thresholds).astype(np.float64),
+            'if_children': np.concatenate(children).astype(np.intp),
+            'if_leaf_depth': np.concatenate(leaf_depths).astype(np.float64),
+            'if_depth': np.int64(max(estimator.tree_.max_depth for estimator in forest.estimators_)),
+            'if_denominator': np.float64(len(forest.estimators_) * _average_path_length([forest.max_samples_])[0]),
+            'if_offset': np.float64(forest.offset_)
+        })
+
+        # One-Class SVM: RBF support vectors, or Nystroem landmarks + SGD weights
+        if hasattr(svm, 'support_vectors_'):
+            vectors = np.asarray(svm.support_vectors_, dtype=np.float64)
+            arrays.update({
+                'svm_kind': np.str_('rbf'),
+                'svm_gamma': np.float64(_svm_gamma(svm)),
+                'svm_vectors': vectors,
+                'svm_coef': np.asarray(svm.dual_coef_, dtype=np.float64).ravel(),
+                'svm_weights': np.empty((0, 0)),
+                'svm_offset': np.float64(-svm.intercept_[0])  # libsvm's rho
+            })
+        else:
+            feature_map, model = svm.feature_map, svm.model
+            vectors = np.asarray(feature_map.components_, dtype=np.float64)
+            arrays.update({
+                'svm_kind': np.str_('nystroem'),
+                'svm_gamma': np.float64(feature_map.gamma),
+                'svm_vectors': vectors,
+                'svm_coef': np.asarray(model.coef_, dtype=np.float64),
+                'svm_weights': np.asarray(feature_map.normalization_, dtype=np.float64),
+                'svm_offset': np.float64(np.ravel(model.offset_)[0])
+            })
+        arrays['svm_vector_norms'] = np.einsum('ij,ij->i', vectors, vectors)
+        return cls(arrays)
+
+    def with_if_offset(self, offset: float) -> 'InferenceKernel':
+        """Copy sharing every array but the IF threshold (sensitivity recalibration)."""
+        return InferenceKernel({**self.arrays, 'if_offset': np.float64(offset)})
+
+    # --- Scoring ---
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        """StandardScaler.transform of raw feature values (1-D reading or 2-D block)."""
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+    def if_decision(self, X: np.ndarray) -> np.ndarray:
+        """IsolationForest.decision_function of scaled rows (n, features); bit-identical."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.mean))
+        # Trees compare float32 inputs against float64 thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        if len(X) == 1:
+            depths = self._depth_one(X[0])[None]
+        else:
+            depths = np.empty(len(X))
+            for start in range(0, len(X), BATCH_CHUNK_ROWS):
+                chunk = X[start:start + BATCH_CHUNK_ROWS]
+                rows = np.arange(len(chunk))[:, None]
+                nodes = np.broadcast_to(self.roots, (len(chunk), len(self.roots)))
+                for _ in range(self.depth):
+                    go_right = chunk[rows, self.feature[nodes]] > self.threshold[nodes]
+                    nodes = self.children[nodes, go_right.view(np.int8)]
+                depths[start:start + len(chunk)] = _sequential_sum(self.leaf_depth[nodes])
+        scores = 2 ** (-np.divide(depths, self.if_denominator, out=np.ones_like(depths),
+                                  where=self.if_denominator != 0))
+        return -scores - self.if_offset
+
+    def _depth_one(self, x: np.ndarray) -> float:
+        """Summed leaf depths of one reading: all trees advance one level per step."""
+        nodes = self.roots
+        for _ in range(self.depth):
+            nodes = self._children_flat[2 * nodes + (x[self.feature[nodes]] > self.threshold[nodes])]
+        return _sequential_sum(self.leaf_depth[nodes])
+
+    def svm_decision(self, X: np.ndarray) -> np.ndarray:
+        """One-Class SVM decision_function of scaled rows (n, features)."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.mean))
+        if self.svm_kind == 'rbf':
+            # libsvm: sum_i coef_i * exp(-gamma * |x - sv_i|^2) - rho. Its BLAS/libm rounding
+            # differs from NumPy's in the last bits (~1e-15), far below any decision margin
+            if len(X) == 1:
+                diff = self.svm_vectors - X[0]
+                squared = np.einsum('ij,ij->i', diff, diff)[None, :]
+            else:
+                squared = np.zeros((len(X), len(self.svm_vectors)))
+                for column in range(X.shape[1]):
+                    diff = X[:, column, None] - self.svm_vectors[None, :, column]
+                    squared += diff * diff
+            return np.exp(-self.svm_gamma * squared) @ self.svm_coef - self.svm_offset
+
+        # Nystroem rbf kernel (as sklearn's euclidean_distances computes it), then the linear SVM
+        distances = -2 * (X @ self.svm_vectors.T)
+        distances += np.einsum('ij,ij->i', X, X)[:, None]
+        distances += self.svm_vector_norms[None, :]
+        np.maximum(distances, 0, out=distances)
+        distances *= -self.svm_gamma
+        embedded = np.exp(distances) @ self.svm_weights.T
+        return (embedded @ self.svm_coef.T - self.svm_offset).ravel()
+
+    def if_votes(self, X: np.ndarray) -> np.ndarray:
+        """True where IsolationForest.predict would return -1."""
+        return self.if_decision(X) < 0
+
+    def svm_votes(self, X: np.ndarray) -> np.ndarray:
+        """True where the One-Class SVM's predict would return -1."""
+        decision = self.svm_decision(X)
+        # libsvm labels a one-class point an inlier only when the decision is > 0;
+        # SGDOneClassSVM already does so at >= 0
+        return decision <= 0 if self.svm_kind == 'rbf' else decision < 0
+
+    def score(self, values: np.ndarray):
+        """(IF vote, SVM vote) for one raw reading in FEATURE_COLUMNS order."""
+        X = self.transform(values)[None, :]
+        return bool(self.if_votes(X)[0]), bool(self.svm_votes(X)[0])
+
+    # --- Persistence ---
+
+    def save(self, path: Path):
+        """Write the arrays to an .npz file (loading needs only NumPy)."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, **self.arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> 'InferenceKernel':
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        if int(arrays['format']) != KERNEL_FORMAT:
+            raise ValueError(f"Unsupported inference kernel format: {int(arrays['format'])}")
+        return cls(arrays)
@@ -0,0 +1,295 @@
+import cProfile
+import io
+import json
+import math
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+from src.config import (
+    INSTRUMENTATION_ENABLED, PERFORMANCE_METRICS_FILENAME, PROFILE_FILENAME, METRICS_PORT
+)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with O(1) inserts and bounded memory.
+
+    Buckets grow by 10% from 100ns, so percentiles are reported as the
+    upper bound of their bucket (within 10% of the true value).
+    """
+
+    MIN_NS = 100
+    GROWTH = 1.1
+    NUM_BUCKETS = 250  # 100ns .. ~2.4 hours
+
+    def __init__(self):
+        self.buckets = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int):
+        index = 0
+        if ns > self.MIN_NS:
+            index = min(int(math.log(ns / self.MIN_NS, self.GROWTH)) + 1, self.NUM_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile (0-100) in seconds."""
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(self.count * q / 100.0)
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= max(rank, 1):
+                upper_ns = self.MIN_NS * self.GROWTH ** index
+                return min(upper_ns, self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean_ms': (self.total_ns / self.count / 1e6) if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1e3,
+            'p95_ms': self.percentile(95) * 1e3,
+            'p99_ms': self.percentile(99) * 1e3,
+            'max_ms': self.max_ns / 1e6,
+            'total_s': self.total_ns / 1e9
+        }
+
+
+class _NullTimer:
+    """Shared no-op context manager handed out while instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('_instrumentation', '_name', '_start')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._instrumentation.record_ns(self._name, time.perf_counter_ns() - self._start)
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported).
+
+    ru_maxrss is KiB on Linux, bytes on macOS.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def reset_peak_rss() -> bool:
+    """Restart the peak RSS count from the current RSS (Linux only); returns whether it worked."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Instrumentation:
+    """Per-stage latency histograms and throughput counters.
+
+    While disabled, `stage()` returns a shared no-op context manager and
+    `count()` returns immediately, so instrumented code pays next to nothing.
+    """
+
+    def __init__(self, enabled: bool = INSTRUMENTATION_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms: Dict[str, LatencyHistogram] = {}
+            self.counters: Dict[str, int] = {}
+            self.started = time.time()
+
+    def stage(self, name: str):
+        """Context manager timing one execution of stage `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record_ns(self, name: str, ns: int):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(ns)
+
+    def record(self, name: str, seconds: float):
+        """Record an externally measured duration (e.g. a model retrain)."""
+        if self.enabled:
+            self.record_ns(name, int(seconds * 1e9))
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            uptime = max(time.time() - self.started, 1e-9)
+            return {
+                'uptime_s': uptime,
+                'stages': {name: h.summary() for name, h in sorted(self.histograms.items())},
+                'counters': {
+                    name: {'total': value, 'rate_per_s': value / uptime}
+                    for name, value in sorted(self.counters.items())
+                }
+            }
+
+    def export_json(self, filename: Path = PERFORMANCE_METRICS_FILENAME):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        print(f"Performance metrics saved to {filename}")
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP wave_stage_latency_seconds Per-stage latency.',
+            '# TYPE wave_stage_latency_seconds summary'
+        ]
+        with self._lock:
+            histograms = dict(self.histograms)
+        for name, histogram in sorted(histograms.items()):
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'wave_stage_latency_seconds{{stage="{name}",quantile="{q}"}} '
+                             f'{histogram.percentile(q * 100):.9f}')
+            lines.append(f'wave_stage_latency_seconds_sum{{stage="{name}"}} {histogram.total_ns / 1e9:.9f}')
+            lines.append(f'wave_stage_latency_seconds_count{{stage="{name}"}} {histogram.count}')
+        lines += ['# HELP wave_events_total Event counters.', '# TYPE wave_events_total counter']
+        for name, counter in snapshot['counters'].items():
+            lines.append(f'wave_events_total{{name="{name}"}} {counter["total"]}')
+        lines.append(f'wave_uptime_seconds {snapshot["uptime_s"]:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = METRICS_PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve `/metrics` on a local daemon thread; call `.shutdown()` to stop."""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = instrumentation.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='wave-metrics', daemon=True).start()
+        print(f"Metrics endpoint: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+# Process-wide instance used by the pipeline components
+metrics = Instrumentation()
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler: samples one thread's stack periodically."""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{code.co_name}:{frame.f_lineno}"] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='wave-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, top: int = 20) -> str:
+        total = sum(self.samples.values()) or 1
+        lines = [f"{count / total:6.1%}  {location}" for location, count in self.samples.most_common(top)]
+        return '\n'.join(lines)
+
+
+def profile_run(fn: Callable, *args, mode: str = 'cprofile', output: Path = PROFILE_FILENAME,
+                top: int = 20, **kwargs):
+    """Run `fn` under cProfile (stats dumped to `output`) or the sampling profiler."""
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args, **kwargs)
+        profiler.dump_stats(str(output))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+        print(stream.getvalue())
+        print(f"Profile saved to {output}")
+        return result
+    if mode == 'sampling':
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+        report = sampler.report(top)
+        with open(output, 'w') as f:
+            f.write(report + '\n')
+        print(report)
+        return result
+    raise ValueError(f"Unknown profile mode: {mode!r} (expected 'cprofile' or 'sampling')")
@@ -1,105 +1,232 @@
 import pandas as pd
 import json
-from src.config import ALERTS_LOG_FILENAME, LEARNING_METRICS_FILENAME
+from typing import Dict, Any, Tuple
+from src.config import (
+    ensure_directories, ALERTS_LOG_FILENAME, INCIDENTS_LOG_FILENAME, LEARNING_METRICS_FILENAME, DASHBOARD_UPDATE_INTERVAL,
+    CONTINUAL_TRAINING, FEEDBACK_LOG_FILENAME, FEEDBACK_SHADOW_EVERY, RANDOM_SEED
+)
 from src.simulator import SensorSimulator
-from src.pipeline import DataValidator, DataStorage
-from src.ml_engine import AnomalyDetector, AdaptiveLearning
+from src.pipeline import DataValidator, DataStorage, ColumnarStorage, spike_columns
+from src.ml_engine import AnomalyDetector, AdaptiveLearning, MAJORITY
 from src.explainer import AlertExplainer
-from src.dashboard import DashboardGenerator, FeedbackInterface
+from src.incidents import IncidentAggregator, Incident, LOG_TIME_FIELD
+from src.alert_log import AlertLog
+from src.dashboard import DashboardRenderer, FeedbackInterface
+from src.model_store import ModelStore
+from src.instrumentation import metrics
+from src.records import Reading, build_alert, to_block, iter_readings
+from src.training_store import ContinualTraining
+from src.feedback import FeedbackLedger
+
 
 class WAVESystem:
-    def __init__(self):
-        self.simulator = SensorSimulator()
+    def __init__(self, warm_start: bool = False, instrument: bool = False,
+                 dashboard: bool = True, feedback: bool = True, continual_training: bool = CONTINUAL_TRAINING,
+                 seed: int = RANDOM_SEED):
+        ensure_directories()
+        self.simulator = SensorSimulator(seed=seed)
         self.validator = DataValidator()
         self.detector = AnomalyDetector()
-        self.learner = AdaptiveLearning(self.detector)
+        self.feedback_ledger = FeedbackLedger(FEEDBACK_LOG_FILENAME)
+        replayed = self.feedback_ledger.load()
+        if self.feedback_ledger.seq:
+            print(f"Feedback ledger: {self.feedback_ledger.seq} records ({replayed} replayed after checkpoint)")
+        self.learner = AdaptiveLearning(self.detector, self.feedback_ledger)
+        self.trainer = ContinualTraining(self.detector) if continual_training else None
         self.explainer = AlertExplainer()
-        self.dashboard = DashboardGenerator()
+        self.incidents = IncidentAggregator()
+        self.alert_log = AlertLog(ALERTS_LOG_FILENAME)
+        self.incident_log = AlertLog(INCIDENTS_LOG_FILENAME, time_field=LOG_TIME_FIELD)
+        self.dashboard = DashboardRenderer() if dashboard else None
         self.storage = DataStorage()
+        self.columnar_storage = ColumnarStorage()
         self.feedback_interface = FeedbackInterface()
+        self.model_store = ModelStore()
+        self.warm_start = warm_start
+        self.feedback_enabled = feedback
+        if instrument:
+            metrics.enable()
+
+    def run(self, num_readings: int = 1000, training_cutoff: int = 800):
+        """Simulate, train, then monitor the remaining readings.
 
-    def run(self, num_readings: int = 1000):
+        Flagged readings are merged into incidents, and incidents are what
+        is announced, sent for feedback and reported. Each flagged reading
+        is still written to the alert log as the detail record: incidents
+        (first/last alert id) and feedback (alert id) refer to it.
+        """
         print(f"Starting WAVE System... generating {num_readings} readings.")
         
         # 1. Generate Dataset
         full_data = self.simulator.generate_dataset(num_readings)
         
-        # 2. Training Phase (First 800)
-        training_cutoff = 800
-        training_data = full_data.iloc[:training_cutoff]
+        # Validate the whole block up front (range + sensor-health checks)
+        with metrics.stage('validate'):
+            valid_mask, reasons = self.validator.validate_frame(full_data)
+        
+        # Spiking rows are still scored; they are only kept out of training
+        trainable = self.validator.training_mask(valid_mask, reasons)
+        
+        # 2. Training Phase (First 800 by default, bad rows filtered out)
+        training_data = full_data.iloc[:training_cutoff][trainable[:training_cutoff]]
         clean_training_data = self.validator.preprocess_for_ml(training_data)
         
-        print("Training models on initial 800 readings...")
-        self.detector.train_models(clean_training_data)
+        if self.warm_start and self.model_store.latest():
+            print("Warm start: loading saved models...")
+            self.model_store.load_into(self.detector, self.learner)
+            if self.trainer is not None:
+                self.trainer.seed_from_detector()
+        else:
+            print(f"Training models on initial {training_cutoff} readings...")
+            self.detector.train_models(clean_training_data)
+            if self.trainer is not None:
+                self.trainer.seed(training_data)
         
         # 3. Monitoring Phase
-        alerts = []
+        alert_count = 0
+        # Alert and incident ids continue from the (persistent) logs
+        last_alert = self.alert_log.last()
+        first_alert_id = last_alert['id'] + 1 if last_alert is not None else 1
+        last_incident = self.incident_log.last()
+        if last_incident is not None:
+            self.incidents.next_id = max(self.incidents.next_id, last_incident['id'] + 1)
+        suppressed_count = 0
+        drawn = 0  # Readings already handed to the dashboard
         
         print("Starting monitoring loop...")
-        for i in range(training_cutoff, len(full_data)):
-            reading_row = full_data.iloc[i]
+        readings = iter_readings(to_block(full_data.iloc[training_cutoff:]))
+        for i, reading in enumerate(readings, start=training_cutoff):
+            metrics.count('readings')
             
-            # Simulate real-time validation
-            if not self.validator.validate_reading(reading_row):
-                print(f"Skipping invalid reading at index {i}")
+            if not valid_mask[i]:
+                metrics.count('readings_invalid')
+                print(f"Skipping invalid reading at index {i} (reason codes: {reasons.iloc[i].tolist()})")
                 continue
                 
-            # History for rolling stats (last N readings)
-            history = full_data.iloc[max(0, i-100):i]
-            
-            # Detect
-            result = self.detector.detect_anomaly(reading_row, history)
+            # Detect (rolling stats use the detector's streaming window)
+            with metrics.stage('detect'):
+                result, required = self._detect(reading)
+            if self.trainer is not None:
+                self.trainer.observe(reading, result['is_anomaly'], trainable[i])
             
             if result['is_anomaly']:
+                metrics.count('alerts')
                 # Explain
-                explanation = self.explainer.generate_explanation(
-                    reading_row, result['models_triggered']
-                )
+                with metrics.stage('explain'):
+                    explanation = self.explainer.generate_explanation(
+                        reading, result['models_triggered'], spikes=spike_columns(reasons.iloc[[i]])[0]
+                    )
                 
-                # Convert reading to dict and fix timestamp for JSON
-                reading_dict = reading_row.to_dict()
-                reading_dict['timestamp'] = str(reading_dict['timestamp'])
-
-                alert = {
-                    'id': len(alerts) + 1,
-                    'timestamp': str(reading_row['timestamp']),
-                    'reading': reading_dict,
-                    'explanation': explanation,
-                    'severity': 'CRITICAL' if explanation['confidence'] == 'HIGH' else 'WARNING'
-                }
-                alerts.append(alert)
-                
-                print(f"\n[ALERT] {alert['timestamp']} - {explanation['likely_cause']}")
-                print(f"Confidence: {explanation['confidence']} | Models: {result['models_triggered']}")
+                # Causes operators mostly reject here need every model to agree
+                if result['votes'].count(True) < required:
+                    metrics.count('alerts_suppressed')
+                    suppressed_count += 1
+                    # Shadow alert: a sample of suppressed alerts still goes for feedback,
+                    # so a cause operators stop rejecting earns its alerts back
+                    if self.feedback_enabled and suppressed_count % FEEDBACK_SHADOW_EVERY == 0:
+                        metrics.count('alerts_shadowed')
+                        with metrics.stage('feedback'):
+                            feedback = self.feedback_interface.simulate_feedback(
+                                build_alert(None, reading, explanation))
+                            self.learner.record_feedback(None, feedback, reading.timestamp, reading.station_id,
+                                                         explanation['likely_cause'], suppressed=True)
+                        if feedback == 'FALSE_POSITIVE' and self.trainer is not None and trainable[i]:
+                            self.trainer.confirm_normal(reading)
+                else:
+                    alert = build_alert(first_alert_id + alert_count, reading, explanation)
+                    alert_count += 1
+                    self.alert_log.write(alert)  # Per-reading detail; incidents are the reported events
+                    if self.dashboard is not None:
+                        self.dashboard.add_alert(alert)
                 
-                # Feedback loop
-                feedback = self.feedback_interface.simulate_feedback(alert)
-                self.learner.record_feedback(alert['id'], feedback, reading_row['timestamp'])
+                    # Merge into an incident; only new incidents are announced and sent for feedback
+                    incident, is_new, closed = self.incidents.add(alert)
+                    for item in closed:
+                        self._close_incident(item)
+                    if is_new:
+                        metrics.count('incidents')
+                        print(f"\n[INCIDENT #{incident.id}] {alert['timestamp']} - {explanation['likely_cause']}")
+                        print(f"Confidence: {explanation['confidence']} | Models: {result['models_triggered']}")
+                    
+                        # Feedback loop
+                        if self.feedback_enabled:
+                            with metrics.stage('feedback'):
+                                feedback = self.feedback_interface.simulate_feedback(alert)
+                                self.learner.record_feedback(alert.id, feedback, reading.timestamp,
+                                                             reading.station_id, explanation['likely_cause'],
+                                                             incident_id=incident.id)
+                            if feedback == 'FALSE_POSITIVE' and self.trainer is not None and trainable[i]:
+                                self.trainer.confirm_normal(reading)
+            elif self.incidents.open:
+                for item in self.incidents.advance(reading.timestamp):
+                    self._close_incident(item)
             
-            # Periodic Dashboard (every 100 readings)
-            if i % 100 == 0:
-                self.dashboard.create_dashboard(full_data.iloc[:i+1], alerts)
+            # Periodic Dashboard: append new readings, render off the detection thread
+            if self.dashboard is not None and i % DASHBOARD_UPDATE_INTERVAL == 0:
+                with metrics.stage('dashboard'):
+                    self.dashboard.append(full_data.iloc[drawn:i+1])
+                    self.dashboard.render()
+                drawn = i + 1
                 
         # 4. Final Save
-        self.storage.save_dataset(full_data)
+        for item in self.incidents.flush():
+            self._close_incident(item)
+        if self.dashboard is not None:
+            self.dashboard.append(full_data.iloc[drawn:])
+            self.dashboard.close()
+        self.detector.wait_for_retrain()
+        self.columnar_storage.append_frame(full_data)
+        self.columnar_storage.flush()
+        self.storage.save_dataset(full_data)  # CSV export
+        self.model_store.save(self.detector, self.learner)
         
-        # Save Logs
-        with open(ALERTS_LOG_FILENAME, 'w') as f:
-            json.dump(alerts, f, indent=2)
+        # Close Logs
+        self.alert_log.close()
+        self.incident_log.close()
+        self.feedback_ledger.close()
             
         # Save Metrics
-        metrics = {
+        learning_metrics = {
              'final_sensitivity': self.detector.contamination_rate,
-             'total_alerts': len(alerts),
-             'feedback_history_count': len(self.learner.feedback_history)
+             'total_alerts': alert_count,
+             'total_incidents': self.incidents.incident_count,
+             'alerts_suppressed': suppressed_count,
+             'feedback_history_count': len(self.learner.feedback_history),
+             'model_version': self.detector.models.version,
+             'retrains': list(self.detector.retrain_metrics),
+             'drift_refits': self.trainer.refits if self.trainer is not None else [],
+             'feedback_windows': self.feedback_ledger.summary()
         }
         with open(LEARNING_METRICS_FILENAME, 'w') as f:
-            json.dump(metrics, f, indent=2)
+            json.dump(learning_metrics, f, indent=2)
+        if metrics.enabled:
+            metrics.export_json()
             
         print("\nSystem run complete.")
         print(f"Dataset saved.")
-        print(f"Alerts logged: {len(alerts)}")
-        print(f"Dashboard generated.")
+        print(f"Incidents logged: {self.incidents.closed_count} "
+              f"(from {alert_count} flagged readings, kept in the alert log for detail)")
+        if suppressed_count:
+            print(f"Alerts suppressed (cause mostly rejected by operators): {suppressed_count}")
+        if self.dashboard is not None:
+            print(f"Dashboard generated.")
+
+    def _detect(self, reading: Reading) -> Tuple[Dict[str, Any], int]:
+        """Score one reading; returns the result and the model votes an alert on it needs.
+
+        The cause is known from the reading alone, so when it needs more
+        than a majority the cascade is told to collect every vote (a vote
+        it skipped would otherwise count against the alert).
+        """
+        required = self.learner.required_votes(reading.station_id, self.explainer.likely_cause(reading))
+        result = self.detector.detect_anomaly(reading, full_votes=True if required > MAJORITY else None)
+        return result, required
+
+    def _close_incident(self, incident: Incident):
+        summary = incident.to_dict()
+        self.incident_log.write(summary)
+        print(f"[INCIDENT #{incident.id} CLOSED] {incident.likely_cause}: {incident.alert_count} alerts "
+              f"from {summary['start']} to {summary['end']} ({incident.severity})")
 
 if __name__ == "__main__":
     print("DEBUG: Starting main execution block")
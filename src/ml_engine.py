@@ -1,38 +1,677 @@
+import copy
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.svm import OneClassSVM
-from sklearn.preprocessing import StandardScaler
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
-from src.config import NU_PARAMETER, ANOMALY_CONTAMINATION_RATE_INIT, ROLLING_WINDOW_SIZE
+from typing import Dict, Any, Callable, Iterable, List, Tuple, Optional, Union, TYPE_CHECKING
+from numpy.lib.stride_tricks import sliding_window_view
+from src.instrumentation import metrics, peak_rss_mb
+from src.records import Reading, feature_matrix
+from src.config import (
+    NU_PARAMETER, ANOMALY_CONTAMINATION_RATE_INIT, ROLLING_WINDOW_SIZE,
+    ZSCORE_THRESHOLD, FEATURE_COLUMNS, BACKGROUND_RETRAIN, IF_THRESHOLD_RECALIBRATION,
+    SVM_BACKEND, SGD_SVM_COMPONENTS, RANDOM_SEED, DETECTION_CASCADE, DETECTION_FULL_VOTES, DETECTION_CASCADE_ORDER,
+    INFERENCE_KERNEL,
+    TRAINING_SAMPLE_SIZE, FEEDBACK_FP_HIGH, FEEDBACK_FP_LOW, FEEDBACK_CAUSE_MIN_FEEDBACK
+)
+from src.feedback import FeedbackLedger
+
+if TYPE_CHECKING:  # scikit-learn is imported on first fit, keeping scoring-only imports light
+    from sklearn.ensemble import IsolationForest
+    from sklearn.svm import OneClassSVM
+    from sklearn.linear_model import SGDOneClassSVM
+    from sklearn.kernel_approximation import Nystroem
+    from sklearn.preprocessing import StandardScaler
+    from src.inference import InferenceKernel
+
+MODEL_NAMES = ['Rolling Stats', 'Isolation Forest', 'One-Class SVM']
+MAJORITY = 2  # Votes needed (of 3) to flag a reading
+MODEL_STAGES = {'Isolation Forest': 'detect.isolation_forest', 'One-Class SVM': 'detect.one_class_svm'}
+SVM_BACKENDS = ('exact', 'sgd')
+
+
+def rolling_zscore_votes(values: np.ndarray, num_scored: int,
+                         window: int = ROLLING_WINDOW_SIZE,
+                         threshold: float = ZSCORE_THRESHOLD) -> np.ndarray:
+    """Vectorized z-score votes for the last `num_scored` rows of `values`.
+
+    Each row is compared against the `window` rows preceding it. Mean and
+    std are computed the same way pandas does (two-pass, ddof=1) so the votes
+    match `rolling_statistics_detection` exactly.
+    """
+    n = len(values)
+    votes = np.zeros(num_scored, dtype=bool)
+    first = max(n - num_scored, window)  # first row with a full window behind it
+    if first >= n:
+        return votes
+
+    # (rows, columns, window) - window k holds the rows preceding row first + k
+    windows = np.ascontiguousarray(
+        sliding_window_view(values[first - window:n - 1], window, axis=0)
+    )
+    mean = windows.sum(axis=-1, dtype=np.float64) / window
+    std = np.sqrt(((mean[..., None] - windows) ** 2).sum(axis=-1, dtype=np.float64) / (window - 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.abs(values[first:] - mean) / std
+    column_votes = (std != 0) & (z_scores > threshold)
+    votes[first - (n - num_scored):] = column_votes.any(axis=1)
+    return votes
+
+
+class RollingZScoreDetector:
+    """Streaming z-score detector with O(1) state updates per reading.
+
+    Keeps the last `window` readings of every sensor column in a NumPy ring
+    buffer together with sliding-window Welford sums (mean / M2), so scoring
+    a reading never needs a history DataFrame. Readings whose z-score is
+    within rounding of the threshold (or whose window is nearly constant)
+    are re-scored from the buffer with `rolling_zscore_votes`, so votes
+    are the same as `detect_batch` gives for the same stream.
+    """
+
+    # Recompute the sums from the buffer now and then to cancel float drift
+    REFRESH_INTERVAL = 1000
+    # Relative distance from the threshold (and std floor) under which the batch arithmetic decides
+    TIE_TOLERANCE = 1e-6
+
+    def __init__(self, window: int = ROLLING_WINDOW_SIZE, threshold: float = ZSCORE_THRESHOLD,
+                 num_features: int = len(FEATURE_COLUMNS)):
+        self.window = window
+        self.threshold = threshold
+        self.num_features = num_features
+        self.reset()
+
+    def reset(self):
+        self.buffer = np.zeros((self.window, self.num_features))
+        self.count = 0
+        self.pos = 0
+        self._mean = np.zeros(self.num_features)
+        self._m2 = np.zeros(self.num_features)
+        self._updates_since_refresh = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.count >= self.window
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean.copy()
+
+    @property
+    def std(self) -> np.ndarray:
+        """Sample standard deviation (ddof=1) of the current window."""
+        if self.count < 2:
+            return np.zeros(self.num_features)
+        return np.sqrt(np.maximum(self._m2, 0.0) / (self.count - 1))
+
+    def window_values(self) -> np.ndarray:
+        """Buffered readings in arrival order (oldest first)."""
+        if self.count < self.window:
+            return self.buffer[:self.count].copy()
+        return np.roll(self.buffer, -self.pos, axis=0)
+
+    def score(self, values: np.ndarray) -> bool:
+        """Vote on a reading against the current window without storing it."""
+        if not self.is_ready:
+            return False
+        std = self.std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = np.abs(values - self._mean) / std
+        ambiguous = (np.abs(z_scores - self.threshold) <= self.TIE_TOLERANCE * self.threshold) \
+            | (std <= self.TIE_TOLERANCE * (np.abs(self._mean) + 1.0))
+        if ambiguous.any():
+            context = np.vstack([self.window_values(), np.asarray(values, dtype=np.float64)])
+            return bool(rolling_zscore_votes(context, 1, self.window, self.threshold)[0])
+        return bool((z_scores > self.threshold).any())
+
+    def push(self, values: np.ndarray):
+        """Add a reading to the window in O(1)."""
+        values = np.asarray(values, dtype=np.float64)
+        if self.count < self.window:
+            self.count += 1
+            delta = values - self._mean
+            self._mean += delta / self.count
+            self._m2 += delta * (values - self._mean)
+        else:
+            old = self.buffer[self.pos]
+            new_mean = self._mean + (values - old) / self.window
+            self._m2 += (values - old) * (values - new_mean + old - self._mean)
+            self._mean = new_mean
+        self.buffer[self.pos] = values
+        self.pos = (self.pos + 1) % self.window
+
+        self._updates_since_refresh += 1
+        if self._updates_since_refresh >= self.REFRESH_INTERVAL:
+            self._refresh()
+
+    def update(self, values: np.ndarray) -> bool:
+        """Score a reading, then add it to the window."""
+        values = np.asarray(values, dtype=np.float64)
+        vote = self.score(values)
+        self.push(values)
+        return vote
+
+    def extend(self, block: np.ndarray):
+        """Add several readings (oldest first) without scoring them."""
+        block = np.asarray(block, dtype=np.float64).reshape(-1, self.num_features)
+        if len(block) >= self.window:
+            # Only the tail survives, so rebuild the state directly
+            self.buffer = block[-self.window:].copy()
+            self.count = self.window
+            self.pos = 0
+            self._refresh()
+            return
+        for values in block:
+            self.push(values)
+
+    def _refresh(self):
+        window = self.window_values()
+        self._mean = window.mean(axis=0) if len(window) else np.zeros(self.num_features)
+        self._m2 = ((window - self._mean) ** 2).sum(axis=0)
+        self._updates_since_refresh = 0
+
+
+def sorted_percentile(sorted_values: np.ndarray, rate: float) -> float:
+    """`np.percentile(values, 100 * rate)` on pre-sorted values in O(1).
+
+    Uses NumPy's linear interpolation step for step so the result is
+    identical to the value IsolationForest.fit stores in `offset_`.
+    """
+    q = np.true_divide(100.0 * rate, 100)
+    n = len(sorted_values)
+    virtual_index = (n - 1) * q
+    if virtual_index >= n - 1:
+        return sorted_values[-1]
+    if virtual_index < 0:
+        return sorted_values[0]
+
+    previous = int(np.floor(virtual_index))
+    gamma = virtual_index - previous
+    low, high = sorted_values[previous], sorted_values[previous + 1]
+    diff = high - low
+    if gamma >= 0.5:
+        return high - diff * (1 - gamma)
+    return low + diff * gamma
+
+
+class ApproxOneClassSVM:
+    """Linear-time stand-in for the RBF One-Class SVM.
+
+    Maps inputs through a Nystroem approximation of the RBF kernel and fits
+    a linear `SGDOneClassSVM` on the mapped features. Training is linear in
+    the number of rows, prediction cost is fixed by `n_components`, and
+    `partial_fit` allows training on data streamed in chunks.
+    """
+
+    def __init__(self, nu: float = NU_PARAMETER, gamma='scale', n_components: int = SGD_SVM_COMPONENTS,
+                 random_state: int = RANDOM_SEED):
+        self.nu = nu
+        self.gamma = gamma
+        self.n_components = n_components
+        self.random_state = random_state
+        self.feature_map: Optional['Nystroem'] = None
+        self.model: Optional['SGDOneClassSVM'] = None
+
+    def _init_feature_map(self, X: np.ndarray):
+        from sklearn.kernel_approximation import Nystroem
+        from sklearn.linear_model import SGDOneClassSVM
+        # Same 'scale' heuristic as OneClassSVM; landmarks come from this batch
+        gamma = 1.0 / (X.shape[1] * X.var()) if self.gamma == 'scale' else self.gamma
+        self.gamma_ = gamma
+        self.feature_map = Nystroem(
+            gamma=gamma, n_components=min(self.n_components, len(X)), random_state=self.random_state
+        ).fit(X)
+        self.model = SGDOneClassSVM(nu=self.nu, random_state=self.random_state)
+
+    def fit(self, X: np.ndarray) -> 'ApproxOneClassSVM':
+        X = np.asarray(X, dtype=np.float64)
+        self._init_feature_map(X)
+        self.model.fit(self.feature_map.transform(X))
+        return self
+
+    def partial_fit(self, X: np.ndarray) -> 'ApproxOneClassSVM':
+        X = np.asarray(X, dtype=np.float64)
+        if self.feature_map is None:
+            self._init_feature_map(X)
+        self.model.partial_fit(self.feature_map.transform(X))
+        return self
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        return self.model.decision_function(self.feature_map.transform(X))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(self.feature_map.transform(X))
+
+
+def make_one_class_svm(backend: str = SVM_BACKEND):
+    """Build the SVM member of the ensemble for the configured backend."""
+    if backend == 'exact':
+        from sklearn.svm import OneClassSVM
+        return OneClassSVM(kernel='rbf', nu=NU_PARAMETER)
+    if backend == 'sgd':
+        return ApproxOneClassSVM()
+    raise ValueError(f"Unknown SVM backend: {backend!r} (expected one of {SVM_BACKENDS})")
+
+
+class ModelSet:
+    """Immutable snapshot of the fitted ensemble (scaler + IF + SVM).
+
+    `if_scores` optionally caches the sorted IF `score_samples` of the
+    training data, so sensitivity changes only have to move the threshold.
+    `kernel` is the same ensemble exported for NumPy-only scoring; it is
+    built on first use unless passed in.
+    """
+
+    def __init__(self, scaler: 'StandardScaler', isolation_forest: 'IsolationForest', one_class_svm: 'OneClassSVM',
+                 if_scores: Optional[np.ndarray] = None, kernel: Optional['InferenceKernel'] = None):
+        self.scaler = scaler
+        self.isolation_forest = isolation_forest
+        self.one_class_svm = one_class_svm
+        self.if_scores = if_scores
+        self._kernel = kernel
+
+    @property
+    def kernel(self) -> 'InferenceKernel':
+        if self._kernel is None:
+            from src.inference import InferenceKernel
+            self._kernel = InferenceKernel.from_models(self)
+        return self._kernel
+
+    def replace(self, **models) -> 'ModelSet':
+        """Copy of this snapshot with some of the models swapped out.
+
+        The exported kernel is not carried over (it would describe the old
+        models) unless a matching one is passed as `kernel=`.
+        """
+        fields = {
+            'scaler': self.scaler,
+            'isolation_forest': self.isolation_forest,
+            'one_class_svm': self.one_class_svm,
+            'if_scores': self.if_scores
+        }
+        fields.update(models)
+        return ModelSet(**fields)
+
+
+class ModelHandle:
+    """Versioned reference to the active ModelSet, swapped atomically."""
+
+    def __init__(self, models: ModelSet):
+        self._lock = threading.Lock()
+        self._models = models
+        self._version = 0
+
+    @property
+    def current(self) -> ModelSet:
+        return self._models
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self) -> Tuple[int, ModelSet]:
+        with self._lock:
+            return self._version, self._models
+
+    def swap(self, models: ModelSet) -> int:
+        with self._lock:
+            self._models = models
+            self._version += 1
+            return self._version
+
+
+def _vote_decided(yes, no, full_votes: bool):
+    """Whether the remaining models can no longer change the result (works on arrays too)."""
+    if full_votes:
+        return no >= MAJORITY
+    return (no >= MAJORITY) | (yes >= MAJORITY)
+
 
 class AnomalyDetector:
-    def __init__(self):
-        self.scaler = StandardScaler()
+    """2-of-3 ensemble of rolling z-scores, Isolation Forest and One-Class SVM.
+
+    With `use_kernel`, single readings are scored by the ensemble's exported
+    `InferenceKernel` (same votes, no pandas/scikit-learn overhead); blocks
+    keep using scikit-learn, whose compiled tree traversal is faster per row.
+
+    With `cascade`, the rolling vote (which has to see every reading anyway)
+    comes first, then IF and SVM in the configured `cascade_order`
+    (cheapest first; `measure_model_costs` times them), and evaluation
+    stops once the majority is decided. The order is fixed so that every
+    detector skips the same models. Skipped models are reported as not
+    evaluated: None in `votes` (and in the batch vote columns, which then
+    hold objects), never a False vote; `models_run` says which ones ran.
+    With `full_votes` flagged readings still get every vote, so
+    explanation confidence is the same as without the cascade.
+    """
+
+    def __init__(self, background_retrain: bool = BACKGROUND_RETRAIN,
+                 recalibrate_threshold: bool = IF_THRESHOLD_RECALIBRATION,
+                 svm_backend: str = SVM_BACKEND, cascade: bool = DETECTION_CASCADE,
+                 full_votes: bool = DETECTION_FULL_VOTES, use_kernel: bool = INFERENCE_KERNEL,
+                 cascade_order: List[str] = DETECTION_CASCADE_ORDER):
+        if svm_backend not in SVM_BACKENDS:
+            raise ValueError(f"Unknown SVM backend: {svm_backend!r} (expected one of {SVM_BACKENDS})")
+        if sorted(cascade_order) != sorted(MODEL_NAMES[1:]):
+            raise ValueError(f"Cascade order must list {MODEL_NAMES[1:]} once each, got {cascade_order}")
         self.contamination_rate = ANOMALY_CONTAMINATION_RATE_INIT
+        self.svm_backend = svm_backend
+        self.cascade = cascade
+        self.full_votes = full_votes
+        self.use_kernel = use_kernel
+        self.cascade_order = list(cascade_order)
+        self.model_calls = dict.fromkeys(MODEL_NAMES, 0)  # Readings each model has scored
         
-        # Initialize models
-        self.isolation_forest = IsolationForest(contamination=self.contamination_rate, random_state=42)
-        self.one_class_svm = OneClassSVM(kernel='rbf', nu=NU_PARAMETER)
+        # Models are fitted (and scikit-learn imported) by train_models or loaded from a ModelStore
+        self.models = ModelHandle(ModelSet(None, None, None))
+        self.rolling_detector = RollingZScoreDetector()
+
+        # Sensitivity update / background retraining state
+        self.recalibrate_threshold = recalibrate_threshold
+        self.background_retrain = background_retrain
+        self.retrain_metrics = deque(maxlen=100)
+        self._retrain_executor: Optional[ThreadPoolExecutor] = None
+        self._retrain_future: Optional[Future] = None
+        self._retrain_generation = 0  # Sensitivity changes
+        self._refit_generation = 0  # Full refits; a sensitivity change never cancels one
+        self._swap_lock = threading.Lock()
         
         self.is_trained = False
 
+    @property
+    def scaler(self) -> 'StandardScaler':
+        return self.models.current.scaler
+
+    @property
+    def isolation_forest(self) -> 'IsolationForest':
+        return self.models.current.isolation_forest
+
+    @property
+    def one_class_svm(self) -> 'OneClassSVM':
+        return self.models.current.one_class_svm
+
     def train_models(self, normal_data: pd.DataFrame):
         """Train models on initial clean data."""
-        self.training_data = self.scaler.fit_transform(normal_data) # Store for retraining
-        self.isolation_forest.fit(self.training_data)
-        self.one_class_svm.fit(self.training_data)
-        self.is_trained = True
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler()
+        training_data = scaler.fit_transform(normal_data[FEATURE_COLUMNS])
+
+        # Seed the streaming window with the tail of the training data
+        self.install_models(
+            self._fit_models(scaler, training_data), training_data,
+            np.asarray(normal_data[FEATURE_COLUMNS], dtype=np.float64)
+        )
         print("ML Models trained successfully.")
 
-    def update_contamination_rate(self, new_rate: float):
-        """Update contamination rate and re-initialize IF model."""
+    def train_models_streaming(self, chunks: Iterable[Union[pd.DataFrame, np.ndarray]],
+                               sample_size: int = TRAINING_SAMPLE_SIZE) -> Dict[str, Any]:
+        """Train on clean historical data delivered in chunks, in memory bounded by the chunk size.
+
+        The scaler is fitted incrementally over every row (`partial_fit`);
+        IF and SVM are fitted on a uniform `sample_size`-row sample of the
+        history drawn while streaming. With no more rows than `sample_size`
+        the models are fitted on all of them, as `train_models` would.
+        Returns row counts, timings and the process peak RSS.
+        """
+        from sklearn.preprocessing import StandardScaler
+        from src.training_store import StreamingSample
+        started = time.perf_counter()
+        scaler = StandardScaler()
+        sample = StreamingSample(sample_size, seed=RANDOM_SEED)
+        tail = np.empty((0, len(FEATURE_COLUMNS)))
+        rows = chunk_count = 0
+        for chunk in chunks:
+            values = feature_matrix(chunk)
+            if not len(values):
+                continue
+            scaler.partial_fit(values)
+            sample.add(values)
+            tail = np.concatenate([tail, values[-ROLLING_WINDOW_SIZE:]])[-ROLLING_WINDOW_SIZE:]
+            rows += len(values)
+            chunk_count += 1
+        if rows == 0:
+            raise ValueError("No training rows in the given chunks.")
+        streamed = time.perf_counter()
+
+        training_data = scaler.transform(sample.sample())
+        self.install_models(self._fit_models(scaler, training_data), training_data, tail)
+        fitted = time.perf_counter()
+        stats = {
+            'rows': rows,
+            'chunks': chunk_count,
+            'sample_rows': len(training_data),
+            'stream_seconds': streamed - started,
+            'fit_seconds': fitted - streamed,
+            'peak_rss_mb': peak_rss_mb()
+        }
+        peak = f", peak RSS {stats['peak_rss_mb']:.0f} MB" if stats['peak_rss_mb'] is not None else ""
+        print(f"ML Models trained on a {len(training_data)}-row sample of {rows} readings "
+              f"({chunk_count} chunks){peak}.")
+        return stats
+
+    def _fit_models(self, scaler: 'StandardScaler', training_data: np.ndarray) -> ModelSet:
+        """Fit IF and SVM on scaled training data."""
+        from sklearn.ensemble import IsolationForest
+        isolation_forest = IsolationForest(contamination=self.contamination_rate, random_state=42)
+        isolation_forest.fit(training_data)
+        one_class_svm = make_one_class_svm(self.svm_backend)
+        one_class_svm.fit(training_data)
+        return ModelSet(scaler, isolation_forest, one_class_svm, self._training_scores(isolation_forest, training_data))
+
+    def install_models(self, models: ModelSet, training_data: np.ndarray, rolling_window: np.ndarray):
+        """Activate a fitted ensemble (freshly trained or loaded from disk)."""
+        self._prepare_kernel(models)
+        with self._swap_lock:
+            self._retrain_generation += 1  # Pending retrains and refits used the old data
+            self._refit_generation += 1
+            self.training_data = training_data # Store for retraining
+            self.models.swap(models)
+
+        self.rolling_detector.reset()
+        self.rolling_detector.extend(rolling_window)
+        self.is_trained = True
+
+    def measure_model_costs(self, models: ModelSet, sample: np.ndarray, repeats: int = 2) -> Dict[str, float]:
+        """Seconds per single-reading IF and SVM vote on one scaled `sample` row (for tuning `cascade_order`)."""
+        costs = {}
+        for name in MODEL_NAMES[1:]:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                self._vote(models, name, sample)
+                timings.append(time.perf_counter() - start)
+            costs[name] = min(timings)
+        return costs
+
+    @staticmethod
+    def _model(models: ModelSet, name: str):
+        return models.isolation_forest if name == 'Isolation Forest' else models.one_class_svm
+
+    def _vote(self, models: ModelSet, name: str, X: np.ndarray) -> bool:
+        """IF or SVM vote on one scaled reading (X of shape (1, features))."""
+        if self.use_kernel:
+            kernel = models.kernel
+            votes = kernel.if_votes(X) if name == 'Isolation Forest' else kernel.svm_votes(X)
+        else:
+            votes = self._model(models, name).predict(X) == -1
+        return bool(votes[0])
+
+    def _prepare_kernel(self, models: ModelSet) -> ModelSet:
+        """Export the inference kernel now, off the scoring path, if it will be used.
+
+        Models the kernel cannot read (e.g. a scikit-learn release without an
+        attribute it relies on) are scored with scikit-learn instead.
+        """
+        if self.use_kernel:
+            try:
+                models.kernel
+            except AttributeError as e:
+                print(f"Inference kernel unavailable ({e}); scoring with scikit-learn.")
+                self.use_kernel = False
+        return models
+
+    def export_kernel(self) -> 'InferenceKernel':
+        """NumPy inference kernel of the active ensemble (see `InferenceKernel.save`)."""
+        if not self.is_trained:
+            raise ValueError("Cannot export an untrained detector.")
+        return self.models.current.kernel
+
+    def _training_scores(self, forest: 'IsolationForest', training_data: np.ndarray) -> Optional[np.ndarray]:
+        if not self.recalibrate_threshold:
+            return None
+        return np.sort(forest.score_samples(training_data))
+
+    def update_contamination_rate(self, new_rate: float, background: Optional[bool] = None):
+        """Update contamination rate and retrain the IF model.
+
+        Contamination only moves the IF decision offset, so with cached
+        training scores the threshold is recalibrated in place of a refit
+        (same trees, same `offset_` as a refit with the same random_state).
+        Otherwise, in background mode the new forest is fitted on a worker
+        thread and swapped in when ready; scoring keeps using the current
+        models until then.
+        """
         self.contamination_rate = new_rate
-        self.isolation_forest = IsolationForest(contamination=self.contamination_rate, random_state=42)
-        if hasattr(self, 'training_data'):
-            self.isolation_forest.fit(self.training_data)
-            print("Model retrained with new contamination rate.")
+        if not hasattr(self, 'training_data'):
+            return
+
+        with self._swap_lock:
+            self._retrain_generation += 1
+            generation = self._retrain_generation
+
+        if self.recalibrate_threshold and self.models.current.if_scores is not None:
+            self._recalibrate_isolation_forest(new_rate, generation, time.perf_counter())
+            return
+
+        self._run_retrain(self._retrain_isolation_forest, new_rate, generation, background=background)
+
+    def refit_models(self, normal_data: Union[pd.DataFrame, np.ndarray], background: Optional[bool] = None):
+        """Refit scaler, IF and SVM on new normal readings (e.g. a drift-refreshed training sample).
+
+        Like a sensitivity refit, in background mode the new ensemble is
+        fitted on a worker thread and swapped in when ready. The streaming
+        window is left alone; `training_data` becomes the new scaled sample.
+        Only a newer refit or install supersedes it: a sensitivity change
+        made meanwhile is applied to the refitted models.
+        """
+        if isinstance(normal_data, np.ndarray) and normal_data.dtype.names is None:
+            values = np.asarray(normal_data, dtype=np.float64)
+        else:
+            values = feature_matrix(normal_data)
+        with self._swap_lock:
+            self._refit_generation += 1
+            generation = self._refit_generation
+        self._run_retrain(self._refit_models, values, generation, background=background)
+
+    def _run_retrain(self, fn, *args, background: Optional[bool] = None):
+        background = self.background_retrain if background is None else background
+        if background:
+            if self._retrain_executor is None:
+                self._retrain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wave-retrain')
+            self._retrain_future = self._retrain_executor.submit(fn, *args, time.perf_counter())
+        else:
+            fn(*args, time.perf_counter())
+
+    def _recalibrate_isolation_forest(self, rate: float, generation: int, requested_at: float):
+        with self._swap_lock:
+            if generation != self._retrain_generation:
+                return
+            current = self.models.current
+            forest = copy.copy(current.isolation_forest)  # Shares the fitted trees
+            forest.contamination = rate
+            forest.offset_ = sorted_percentile(current.if_scores, rate)
+            kernel = current._kernel.with_if_offset(forest.offset_) if current._kernel is not None else None
+            recalibrated = time.perf_counter()
+            version = self.models.swap(current.replace(isolation_forest=forest, kernel=kernel))
+        swapped = time.perf_counter()
+
+        metrics.record('model.recalibrate', recalibrated - requested_at)
+        metrics.record('model.swap', swapped - recalibrated)
+        self.retrain_metrics.append({
+            'model_version': version,
+            'contamination_rate': rate,
+            'mode': 'recalibrate',
+            'queue_seconds': 0.0,
+            'retrain_seconds': recalibrated - requested_at,
+            'swap_seconds': swapped - recalibrated
+        })
+        print("IF threshold recalibrated for new contamination rate.")
+
+    def _retrain_isolation_forest(self, rate: float, generation: int, requested_at: float):
+        if generation != self._retrain_generation:
+            return  # Superseded by a newer request
+
+        from sklearn.ensemble import IsolationForest
+        started = time.perf_counter()
+        forest = IsolationForest(contamination=rate, random_state=42)
+        forest.fit(self.training_data)
+        if_scores = self._training_scores(forest, self.training_data)
+        # Only the forest changes (an install would bump the generation), so the kernel can be built here
+        refitted = self._prepare_kernel(self.models.current.replace(isolation_forest=forest, if_scores=if_scores))
+        fitted = time.perf_counter()
+
+        with self._swap_lock:
+            if generation != self._retrain_generation:
+                return
+            version = self.models.swap(refitted)
+        swapped = time.perf_counter()
+
+        metrics.record('model.retrain', fitted - started)
+        metrics.record('model.swap', swapped - fitted)
+        self.retrain_metrics.append({
+            'model_version': version,
+            'contamination_rate': rate,
+            'mode': 'refit',
+            'queue_seconds': started - requested_at,
+            'retrain_seconds': fitted - started,
+            'swap_seconds': swapped - fitted
+        })
+        print("Model retrained with new contamination rate.")
+
+    def _refit_models(self, values: np.ndarray, generation: int, requested_at: float):
+        if generation != self._refit_generation:
+            return
+
+        from sklearn.preprocessing import StandardScaler
+        started = time.perf_counter()
+        scaler = StandardScaler()
+        training_data = scaler.fit_transform(values)
+        refitted = self._prepare_kernel(self._fit_models(scaler, training_data))
+        fitted = time.perf_counter()
+
+        with self._swap_lock:
+            if generation != self._refit_generation:
+                return
+            self._retrain_generation += 1  # Pending sensitivity retrains started from the old models
+            self.training_data = training_data
+            version = self.models.swap(refitted)
+            rate_changed = refitted.isolation_forest.contamination != self.contamination_rate
+        swapped = time.perf_counter()
+
+        metrics.record('model.retrain', fitted - started)
+        metrics.record('model.swap', swapped - fitted)
+        self.retrain_metrics.append({
+            'model_version': version,
+            'contamination_rate': self.contamination_rate,
+            'mode': 'full',
+            'training_rows': len(training_data),
+            'queue_seconds': started - requested_at,
+            'retrain_seconds': fitted - started,
+            'swap_seconds': swapped - fitted
+        })
+        print(f"Models refitted on {len(training_data)} readings.")
+        if rate_changed:
+            # The sensitivity changed while fitting: apply it on top of the new models
+            self.update_contamination_rate(self.contamination_rate, background=False)
+
+    def wait_for_retrain(self, timeout: Optional[float] = None):
+        """Block until the pending background retrain (if any) has been swapped in."""
+        if self._retrain_future is not None:
+            self._retrain_future.result(timeout=timeout)
 
     def rolling_statistics_detection(self, reading: pd.Series, history: pd.DataFrame) -> bool:
         """Z-score based detection."""
@@ -42,7 +681,7 @@ class AnomalyDetector:
         # Check last window
         window = history.tail(ROLLING_WINDOW_SIZE)
         
-        for col in ['pH', 'turbidity_ntu', 'tds_mgl', 'temp_celsius']:
+        for col in FEATURE_COLUMNS:
             mean = window[col].mean()
             std = window[col].std()
             
@@ -51,81 +690,227 @@ class AnomalyDetector:
                 continue
                 
             z_score = abs(reading[col] - mean) / std
-            if z_score > 3.0:
+            if z_score > ZSCORE_THRESHOLD:
                 return True
         return False
 
-    def detect_anomaly(self, reading: pd.Series, history: pd.DataFrame) -> Dict[str, Any]:
-        """Ensemble detection using 3 algorithms."""
+    def detect_anomaly(self, reading: Union[Reading, pd.Series, Dict[str, Any]],
+                       history: Optional[pd.DataFrame] = None, full_votes: Optional[bool] = None) -> Dict[str, Any]:
+        """Ensemble detection using 3 algorithms.
+
+        Without `history` the rolling vote comes from the streaming window,
+        which is advanced with this reading. `full_votes` overrides the
+        detector's setting for this call.
+        """
         if not self.is_trained:
             return {'is_anomaly': False, 'votes': [], 'models': []}
 
-        # Prepare input
-        input_data = pd.DataFrame([reading])[['pH', 'turbidity_ntu', 'tds_mgl', 'temp_celsius']]
-        X = self.scaler.transform(input_data)
+        # One snapshot per call so a concurrent swap can't mix model versions
+        version, models = self.models.snapshot()
+        full_votes = self.full_votes if full_votes is None else full_votes
+
+        # Prepare input: the same arithmetic as StandardScaler.transform (and the
+        # kernel), minus building a one-row DataFrame and sklearn's input validation
+        with metrics.stage('detect.scaler'):
+            values = reading.values if isinstance(reading, Reading) else Reading.from_mapping(reading).values
+            X = ((values - models.scaler.mean_) / models.scaler.scale_)[None, :]
         
         # 1. Rolling Stats
-        vote_stats = self.rolling_statistics_detection(reading, history)
+        with metrics.stage('detect.rolling_stats'):
+            if history is None:
+                vote_stats = self.rolling_detector.update(values)
+            else:
+                vote_stats = self.rolling_statistics_detection(reading, history)
+        self.model_calls['Rolling Stats'] += 1
         
-        # 2. Isolation Forest (-1 is anomaly, map to True)
-        pred_if = self.isolation_forest.predict(X)[0]
-        vote_if = True if pred_if == -1 else False
-        
-        # 3. One-Class SVM
-        pred_svm = self.one_class_svm.predict(X)[0]
-        vote_svm = True if pred_svm == -1 else False
-        
-        votes = [vote_stats, vote_if, vote_svm]
-        is_anomaly = sum(votes) >= 2
+        # 2./3. Isolation Forest and One-Class SVM (-1 is anomaly), cheapest first
+        votes = {'Rolling Stats': vote_stats}
+        yes, no = int(vote_stats), int(not vote_stats)
+        for name in self.cascade_order:
+            if self.cascade and _vote_decided(yes, no, full_votes):
+                break
+            with metrics.stage(MODEL_STAGES[name]):
+                vote = self._vote(models, name, X)
+            self.model_calls[name] += 1
+            votes[name] = vote
+            yes, no = yes + vote, no + (not vote)
         
         return {
-            'is_anomaly': is_anomaly,
-            'votes': votes,
-            'models_triggered': [
-                'Rolling Stats' if vote_stats else None,
-                'Isolation Forest' if vote_if else None,
-                'One-Class SVM' if vote_svm else None
-            ]
+            'is_anomaly': yes >= MAJORITY,
+            'votes': [votes.get(name) for name in MODEL_NAMES],  # None: skipped by the cascade
+            'models_triggered': [name if votes.get(name) else None for name in MODEL_NAMES],
+            'models_run': [name for name in MODEL_NAMES if name in votes],
+            'model_version': version
         }
 
+    def detect_batch(self, data: Union[pd.DataFrame, np.ndarray], history: Optional[pd.DataFrame] = None,
+                     full_votes: Optional[bool] = None) -> pd.DataFrame:
+        """Score a block of readings (DataFrame or READING_DTYPE array) with one scaler/IF/SVM call each.
+
+        `history` holds the readings that precede `data` (as passed to
+        `detect_anomaly`); rows of `data` also serve as history for the rows
+        after them. Without `history` the streaming window is used as context
+        and advanced with the block. Returns one row per reading with the
+        per-model votes, `is_anomaly`, `models_triggered` and `models_run`,
+        matching `detect_anomaly`; in cascade mode each model only scores the
+        rows still undecided when its turn comes.
+        """
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        if not self.is_trained:
+            return pd.DataFrame({
+                'vote_stats': False, 'vote_if': False, 'vote_svm': False,
+                'is_anomaly': False, 'models_triggered': [[]] * len(data), 'models_run': [[]] * len(data)
+            }, index=index)
+        full_votes = self.full_votes if full_votes is None else full_votes
+
+        models = self.models.current
+        block = feature_matrix(data)
+        X = (block - models.scaler.mean_) / models.scaler.scale_  # StandardScaler.transform
+
+        # 1. Rolling Stats over history + block
+        if history is None:
+            context = np.concatenate([self.rolling_detector.window_values(), block])
+            self.rolling_detector.extend(block)
+        else:
+            context = np.concatenate([history[FEATURE_COLUMNS].to_numpy(dtype=np.float64), block])
+        vote_stats = rolling_zscore_votes(context, len(data))
+        self.model_calls['Rolling Stats'] += len(data)
+
+        # 2./3. Isolation Forest and One-Class SVM, cheapest first, on the undecided rows
+        votes = {'Rolling Stats': vote_stats}
+        ran = {'Rolling Stats': np.ones(len(data), dtype=bool)}
+        yes, no = vote_stats.astype(np.int64), (~vote_stats).astype(np.int64)
+        for name in self.cascade_order:
+            pending = ~_vote_decided(yes, no, full_votes) if self.cascade else np.ones(len(data), dtype=bool)
+            vote = np.zeros(len(data), dtype=bool)
+            if pending.any():
+                vote[pending] = self._model(models, name).predict(X[pending]) == -1
+            self.model_calls[name] += int(pending.sum())
+            votes[name], ran[name] = vote, pending
+            yes, no = yes + vote, no + (pending & ~vote)
+
+        columns = [votes[name] for name in MODEL_NAMES]
+        run_columns = [ran[name] for name in MODEL_NAMES]
+        # Rows a model skipped get None rather than a False vote
+        reported = {name: votes[name] if ran[name].all() else np.where(ran[name], votes[name], None)
+                    for name in MODEL_NAMES}
+        models_triggered = [
+            [name if vote else None for name, vote in zip(MODEL_NAMES, row)]
+            for row in np.column_stack(columns).tolist()
+        ]
+        models_run = [
+            [name for name, was_run in zip(MODEL_NAMES, row) if was_run]
+            for row in np.column_stack(run_columns).tolist()
+        ]
+
+        return pd.DataFrame({
+            'vote_stats': reported['Rolling Stats'],
+            'vote_if': reported['Isolation Forest'],
+            'vote_svm': reported['One-Class SVM'],
+            'is_anomaly': yes >= MAJORITY,
+            'models_triggered': models_triggered,
+            'models_run': models_run
+        }, index=index)
+
+def _adjusted_rate(rate: float, fp_rate: float) -> Tuple[Optional[float], str]:
+    """Contamination rate after a feedback window with this FP rate (None: leave it)."""
+    if fp_rate > FEEDBACK_FP_HIGH:
+        adjustment, reason = -0.01, f"High FP rate ({fp_rate:.1%})"
+    elif fp_rate < FEEDBACK_FP_LOW:
+        adjustment, reason = 0.01, f"Low FP rate ({fp_rate:.1%})"
+    else:
+        return None, ""
+    return max(0.01, min(0.10, rate + adjustment)), reason
+
+
 class AdaptiveLearning:
-    def __init__(self, detector: AnomalyDetector):
+    """Tunes sensitivity from operator feedback kept in a `FeedbackLedger`.
+
+    Once a window of feedback has arrived since the last adjustment, its FP
+    rate moves the detector's contamination rate. Feedback tagged with a
+    station does the same for that station's rate in `station_rates`, which
+    is handed to `on_station_rate` (e.g.
+    `MultiStationEngine.update_contamination_rate`, where every station
+    has its own detector) and kept in the ledger for the next run. Alerts
+    of a cause operators mostly reject need every model's vote
+    (`required_votes`). All of these read the ledger's O(1) window
+    counters; nothing rescans history.
+    """
+
+    def __init__(self, detector: AnomalyDetector, ledger: Optional[FeedbackLedger] = None,
+                 on_station_rate: Optional[Callable[[Dict[str, float]], Any]] = None):
         self.detector = detector
-        self.feedback_history = []
+        self.ledger = FeedbackLedger(path=None) if ledger is None else ledger
+        self.on_station_rate = on_station_rate
         self.current_contamination_rate = ANOMALY_CONTAMINATION_RATE_INIT
+        self.station_rates: Dict[str, float] = self.ledger.station_rates()
+        self._feedback_history = deque(maxlen=self.ledger.window)
+
+    @property
+    def feedback_history(self) -> List[Dict[str, Any]]:
+        """Feedback received since the last global adjustment (at most one window)."""
+        return list(self._feedback_history)
+
+    @feedback_history.setter
+    def feedback_history(self, entries: List[Dict[str, Any]]):
+        self._feedback_history = deque(entries, maxlen=self.ledger.window)
 
-    def record_feedback(self, alert_id: int, feedback: str, timestamp: datetime):
-        print(f"Feedback received for Alert #{alert_id}: {feedback}")
-        self.feedback_history.append({
+    def record_feedback(self, alert_id: Optional[int], feedback: str, timestamp: datetime,
+                        station_id: Optional[str] = None, likely_cause: Optional[str] = None,
+                        suppressed: bool = False, incident_id: Optional[int] = None):
+        if suppressed:
+            print(f"Feedback received for suppressed alert at {timestamp}: {feedback}")
+        else:
+            print(f"Feedback received for Alert #{alert_id}: {feedback}")
+        self.ledger.record(alert_id, feedback, timestamp, station_id, likely_cause, suppressed, incident_id)
+        self._feedback_history.append({
             'alert_id': alert_id,
+            'incident_id': incident_id,
             'feedback': feedback,
-            'timestamp': timestamp
+            'timestamp': timestamp,
+            'suppressed': suppressed
         })
-        
-        if len(self.feedback_history) >= 20:
+
+        if self.ledger.stats().pending >= self.ledger.window:
             self.evaluate_and_adjust()
+        if station_id is not None and self.ledger.stats(station_id).pending >= self.ledger.window:
+            self.adjust_station(station_id)
 
     def evaluate_and_adjust(self):
-        recent = self.feedback_history[-20:]
-        fp_count = sum(1 for f in recent if f['feedback'] == 'FALSE_POSITIVE')
-        fp_rate = fp_count / 20
-        
-        adjustment = 0.0
-        reason = ""
-        
-        if fp_rate > 0.6:
-            adjustment = -0.01
-            reason = f"High FP rate ({fp_rate:.1%})"
-        elif fp_rate < 0.2:
-            adjustment = 0.01
-            reason = f"Low FP rate ({fp_rate:.1%})"
-            
-        if adjustment != 0:
-            new_rate = max(0.01, min(0.10, self.current_contamination_rate + adjustment))
-            print(f"Adapting Sensitivity: {self.current_contamination_rate:.3f} -> {new_rate:.3f} | Reason: {reason}")
-            self.current_contamination_rate = new_rate
-            self.detector.update_contamination_rate(new_rate)
-            # Reset history or keep sliding window? For POC, simple reset or just continue
-            # If we reset, we wait for another 20. If we don't, we adjust every step.
-            # Let's clear history to avoid continuous oscillation on same data
-            self.feedback_history = [] 
+        new_rate, reason = _adjusted_rate(self.current_contamination_rate, self.ledger.fp_rate())
+        if new_rate is None:
+            return  # Re-evaluated on the sliding window at the next feedback
+        print(f"Adapting Sensitivity: {self.current_contamination_rate:.3f} -> {new_rate:.3f} | Reason: {reason}")
+        self.current_contamination_rate = new_rate
+        self.detector.update_contamination_rate(new_rate)
+        # Wait for a fresh window before adjusting again, so the same feedback is not acted on twice
+        self.ledger.record_adjustment(new_rate)
+        self._feedback_history.clear()
+
+    def adjust_station(self, station_id: str):
+        """Move one station's rate from its own feedback window."""
+        rate = self.station_rates.get(station_id, self.current_contamination_rate)
+        new_rate, reason = _adjusted_rate(rate, self.ledger.fp_rate(station_id))
+        if new_rate is None:
+            return
+        print(f"Adapting Sensitivity for {station_id}: {rate:.3f} -> {new_rate:.3f} | Reason: {reason}")
+        self.station_rates[station_id] = new_rate
+        if self.on_station_rate is not None:
+            self.on_station_rate({station_id: new_rate})
+        self.ledger.record_adjustment(new_rate, station_id=station_id)
+
+    def required_votes(self, station_id: Optional[str] = None, likely_cause: Optional[str] = None) -> int:
+        """Model votes an alert of this cause at this station needs.
+
+        Unanimity once the cause's recent feedback (at the station, else
+        anywhere) is mostly FALSE_POSITIVE; a majority otherwise. Callers
+        keep sending a sample of the alerts this suppresses for feedback
+        (shadow alerts), or a suppressed cause could never recover.
+        """
+        if likely_cause is None:
+            return MAJORITY
+        for key in ((station_id, likely_cause), (None, likely_cause)):
+            counter = self.ledger.stats(*key)
+            if counter.total >= FEEDBACK_CAUSE_MIN_FEEDBACK:
+                return len(MODEL_NAMES) if counter.fp_rate > FEEDBACK_FP_HIGH else MAJORITY
+        return MAJORITY
@@ -0,0 +1,181 @@
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from src.config import MODELS_DIR, MODEL_ARTIFACT_FORMAT, MODEL_VERSIONS_KEPT, FEATURE_COLUMNS
+from src.ml_engine import AnomalyDetector, AdaptiveLearning, ModelSet, ApproxOneClassSVM
+
+LATEST_POINTER = "LATEST"
+
+
+class ModelStore:
+    """Versioned on-disk artifacts for the fitted ensemble and adaptive state.
+
+    Each version is a directory (v0001, v0002, ...) holding:
+      manifest.json        - metadata and file list
+      ensemble.joblib      - scaler, IsolationForest and One-Class SVM (uncompressed)
+      training_data.npy    - scaled training set used for retraining
+      if_scores.npy        - cached IF training scores (threshold recalibration)
+      rolling_window.npy   - streaming z-score window
+      adaptive_state.json  - contamination rate and pending feedback window
+      kernel.npz           - the ensemble as NumPy inference arrays (see src.inference),
+                             when the models can be exported
+
+    Arrays are stored uncompressed so `load_into(..., mmap_mode='r')` maps
+    them read-only and worker processes share the pages instead of copying.
+    Artifacts are pickles: only load directories you wrote yourself.
+    """
+
+    def __init__(self, root: Path = MODELS_DIR, keep: int = MODEL_VERSIONS_KEPT):
+        self.root = Path(root)
+        self.keep = keep
+
+    def versions(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and p.name.startswith('v'))
+
+    def latest(self) -> Optional[str]:
+        pointer = self.root / LATEST_POINTER
+        if pointer.exists():
+            version = pointer.read_text().strip()
+            if (self.root / version).is_dir():
+                return version
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def save(self, detector: AnomalyDetector, learner: Optional[AdaptiveLearning] = None) -> Path:
+        """Write the active ensemble (and learner state) as a new version.
+
+        A failed save leaves no partial version behind.
+        """
+        if not detector.is_trained:
+            raise ValueError("Cannot save an untrained detector.")
+
+        versions = self.versions()
+        number = int(versions[-1][1:]) + 1 if versions else 1
+        version = f"v{number:04d}"
+        tmp_dir = self.root / f".{version}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        try:
+            self._write_version(tmp_dir, version, detector, learner)
+            # Publish atomically: rename the finished directory, then move the pointer
+            final_dir = self.root / version
+            tmp_dir.rename(final_dir)
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir)
+        pointer_tmp = self.root / f".{LATEST_POINTER}.tmp"
+        pointer_tmp.write_text(version)
+        pointer_tmp.replace(self.root / LATEST_POINTER)
+
+        self._prune()
+        print(f"Models saved to {final_dir}")
+        return final_dir
+
+    def _write_version(self, tmp_dir: Path, version: str, detector: AnomalyDetector,
+                       learner: Optional[AdaptiveLearning]):
+        import joblib
+        import sklearn
+        model_version, models = detector.models.snapshot()
+        joblib.dump({
+            'scaler': models.scaler,
+            'isolation_forest': models.isolation_forest,
+            'one_class_svm': models.one_class_svm
+        }, tmp_dir / 'ensemble.joblib')
+        np.save(tmp_dir / 'training_data.npy', np.asarray(detector.training_data))
+        np.save(tmp_dir / 'rolling_window.npy', detector.rolling_detector.window_values())
+        files = ['ensemble.joblib', 'training_data.npy', 'rolling_window.npy', 'adaptive_state.json']
+        if models.if_scores is not None:
+            np.save(tmp_dir / 'if_scores.npy', models.if_scores)
+            files.append('if_scores.npy')
+        try:
+            kernel = models.kernel
+        except AttributeError as e:  # As in AnomalyDetector._prepare_kernel: models the kernel can't read
+            print(f"Inference kernel unavailable ({e}); saving without kernel.npz.")
+        else:
+            kernel.save(tmp_dir / 'kernel.npz')
+            files.append('kernel.npz')
+
+        adaptive_state = {'contamination_rate': detector.contamination_rate}
+        if learner is not None:
+            adaptive_state.update({
+                'current_contamination_rate': learner.current_contamination_rate,
+                'feedback_history': [
+                    {**entry, 'timestamp': str(entry['timestamp'])} for entry in learner.feedback_history
+                ]
+            })
+        with open(tmp_dir / 'adaptive_state.json', 'w') as f:
+            json.dump(adaptive_state, f, indent=2)
+
+        manifest = {
+            'format': MODEL_ARTIFACT_FORMAT,
+            'version': version,
+            'model_version': model_version,
+            'created_at': datetime.now().isoformat(),
+            'feature_columns': FEATURE_COLUMNS,
+            'sklearn_version': sklearn.__version__,
+            'svm_backend': detector.svm_backend,
+            'training_rows': int(len(detector.training_data)),
+            'files': files
+        }
+        with open(tmp_dir / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def load_into(self, detector: AnomalyDetector, learner: Optional[AdaptiveLearning] = None,
+                  version: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> str:
+        """Warm-start `detector` (and `learner`) from a saved version.
+
+        The detector takes the stored SVM backend, so later refits fit the
+        same kind of model. With `mmap_mode='r'` the large arrays are
+        memory-mapped read-only.
+        """
+        import joblib
+        version = version or self.latest()
+        if version is None:
+            raise FileNotFoundError(f"No saved models in {self.root}")
+        directory = self.root / version
+
+        with open(directory / 'manifest.json') as f:
+            manifest = json.load(f)
+        if manifest['format'] != MODEL_ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format: {manifest['format']}")
+        if manifest['feature_columns'] != FEATURE_COLUMNS:
+            raise ValueError(f"Artifact features {manifest['feature_columns']} do not match {FEATURE_COLUMNS}")
+
+        ensemble = joblib.load(directory / 'ensemble.joblib', mmap_mode=mmap_mode)
+        if_scores = None
+        if 'if_scores.npy' in manifest['files']:
+            if_scores = np.load(directory / 'if_scores.npy', mmap_mode=mmap_mode)
+        kernel = None
+        if 'kernel.npz' in manifest['files']:
+            from src.inference import InferenceKernel
+            kernel = InferenceKernel.load(directory / 'kernel.npz')
+
+        with open(directory / 'adaptive_state.json') as f:
+            adaptive_state = json.load(f)
+
+        detector.contamination_rate = adaptive_state['contamination_rate']
+        # Versions saved before the backend was recorded: tell it from the model itself
+        detector.svm_backend = manifest.get(
+            'svm_backend', 'sgd' if isinstance(ensemble['one_class_svm'], ApproxOneClassSVM) else 'exact')
+        detector.install_models(
+            ModelSet(ensemble['scaler'], ensemble['isolation_forest'], ensemble['one_class_svm'], if_scores,
+                     kernel),
+            np.load(directory / 'training_data.npy', mmap_mode=mmap_mode),
+            np.load(directory / 'rolling_window.npy')
+        )
+        if learner is not None and 'current_contamination_rate' in adaptive_state:
+            learner.current_contamination_rate = adaptive_state['current_contamination_rate']
+            learner.feedback_history = adaptive_state['feedback_history']
+
+        print(f"Models loaded from {directory}")
+        return version
+
+    def _prune(self):
+        for version in self.versions()[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(self.root / version, ignore_errors=True)
@@ -1,13 +1,90 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Union
+from pathlib import Path
 import os
+import time
+import uuid
 from src.config import (
     VALID_RANGE_PH, VALID_RANGE_TURBIDITY, VALID_RANGE_TDS, VALID_RANGE_TEMP,
-    DATASET_FILENAME
+    DATASET_FILENAME, COLUMNAR_DATA_DIR, STORAGE_FLUSH_SIZE, STORAGE_FLUSH_INTERVAL_S,
+    FEATURE_COLUMNS, STUCK_READINGS_THRESHOLD, SPIKE_THRESHOLDS
 )
+from src.records import Reading, feature_matrix, to_block, block_frame
+
+# Per-column reason codes returned by DataValidator.validate_frame
+REASON_OK = 0
+REASON_MISSING = 1
+REASON_BELOW_RANGE = 2
+REASON_ABOVE_RANGE = 3
+REASON_STUCK = 4
+REASON_SPIKE = 5  # A flag, not a failure: sudden changes are what contamination onsets look like
+
+VALID_RANGES = {
+    'pH': VALID_RANGE_PH,
+    'turbidity_ntu': VALID_RANGE_TURBIDITY,
+    'tds_mgl': VALID_RANGE_TDS,
+    'temp_celsius': VALID_RANGE_TEMP
+}
+
+
+class SensorHealthMonitor:
+    """Streaming stuck-sensor (flatline) and spike detection over blocks.
+
+    Uses run-length encoding of unchanged values per column. The last value
+    and current run length carry over between blocks, so a flatline that
+    spans two blocks is still caught.
+    """
+
+    def __init__(self, stuck_threshold: int = STUCK_READINGS_THRESHOLD,
+                 spike_thresholds: Dict[str, float] = SPIKE_THRESHOLDS):
+        self.stuck_threshold = stuck_threshold
+        self.spike_limits = np.array([spike_thresholds[col] for col in FEATURE_COLUMNS])
+        self.reset()
+
+    def reset(self):
+        self.last_values = np.full(len(FEATURE_COLUMNS), np.nan)
+        self.run_lengths = np.zeros(len(FEATURE_COLUMNS), dtype=np.int64)
+
+    def check(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (stuck, spike) boolean arrays shaped like `values` (rows x sensors)."""
+        n = len(values)
+        if n == 0:
+            empty = np.zeros(values.shape, dtype=bool)
+            return empty, empty
+
+        previous = np.vstack([self.last_values, values[:-1]])
+        continues_run = values == previous
+
+        # Run length at each row: rows since the last value change (RLE)
+        rows = np.arange(n)[:, None]
+        last_change = np.maximum.accumulate(np.where(continues_run, -1, rows), axis=0)
+        run_lengths = np.where(last_change >= 0, rows - last_change + 1, rows + 1 + self.run_lengths)
+
+        stuck = run_lengths > self.stuck_threshold
+        with np.errstate(invalid='ignore'):
+            spike = np.abs(values - previous) > self.spike_limits
+
+        self.last_values = values[-1].copy()
+        self.run_lengths = run_lengths[-1].copy()
+        return stuck, spike
+
+
+def usable(reasons: np.ndarray) -> np.ndarray:
+    """Rows whose reason codes allow detection: every sensor OK or merely spiking."""
+    return ((reasons == REASON_OK) | (reasons == REASON_SPIKE)).all(axis=1)
+
+
+def spike_columns(reasons: pd.DataFrame) -> List[List[str]]:
+    """Per row of a `validate_frame` reason frame, the sensors flagged REASON_SPIKE."""
+    spiking = reasons.to_numpy() == REASON_SPIKE
+    return [[col for col, flag in zip(reasons.columns, row) if flag] for row in spiking]
+
 
 class DataValidator:
+    def __init__(self):
+        self.health_monitor = SensorHealthMonitor()
+
     def validate_reading(self, reading: pd.Series) -> bool:
         """Check if reading values are within valid physical ranges."""
         try:
@@ -23,6 +100,60 @@ class DataValidator:
         except KeyError:
             return False
 
+    def validate_frame(self, data: Union[pd.DataFrame, np.ndarray],
+                       check_health: bool = True) -> Tuple[np.ndarray, pd.DataFrame]:
+        """Vectorized validation of a block of readings (DataFrame or READING_DTYPE array).
+
+        Returns a boolean mask of the rows usable for detection and a
+        per-column frame of REASON_* codes. Range checks match
+        `validate_reading`; with `check_health` the streaming monitor also
+        flags stuck and spiking sensors (state carries over between calls).
+        Stuck sensors fail the mask. Spikes do not: a sudden jump may be
+        the contamination onset WAVE exists to alert on, so spiking rows
+        are still scored and explained, and only `training_mask` leaves
+        them out.
+        """
+        reasons = self.validate_values(feature_matrix(data), self.health_monitor if check_health else None)
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        return usable(reasons), pd.DataFrame(reasons, index=index, columns=FEATURE_COLUMNS)
+
+    @staticmethod
+    def validate_values(values: np.ndarray, monitor: Optional[SensorHealthMonitor] = None) -> np.ndarray:
+        """REASON_* codes for a (rows x sensors) value matrix, with `monitor`'s health checks if given."""
+        low = np.array([VALID_RANGES[col][0] for col in FEATURE_COLUMNS])
+        high = np.array([VALID_RANGES[col][1] for col in FEATURE_COLUMNS])
+
+        reasons = np.zeros(values.shape, dtype=np.int8)
+        with np.errstate(invalid='ignore'):
+            reasons[values > high] = REASON_ABOVE_RANGE
+            reasons[values < low] = REASON_BELOW_RANGE
+        reasons[np.isnan(values)] = REASON_MISSING
+
+        if monitor is not None:
+            # Out-of-range values are masked so they neither extend a flatline
+            # nor make the next good reading look like a spike
+            in_range = np.where(reasons == REASON_OK, values, np.nan)
+            stuck, spike = monitor.check(in_range)
+            reasons[spike] = REASON_SPIKE
+            reasons[stuck] = REASON_STUCK
+        return reasons
+
+    @staticmethod
+    def training_mask(mask: np.ndarray, reasons: pd.DataFrame) -> np.ndarray:
+        """Rows of a `validate_frame` result fit to train on: valid and not spiking."""
+        return mask & ~(reasons.to_numpy() == REASON_SPIKE).any(axis=1)
+
+    def filter_valid(self, data: pd.DataFrame, training: bool = False) -> pd.DataFrame:
+        """Drop rows that fail range or sensor-health checks (and, for `training`, spiking rows)."""
+        mask, reasons = self.validate_frame(data)
+        return data[self.training_mask(mask, reasons) if training else mask]
+
+    def detect_sensor_issues(self, recent_data: pd.DataFrame) -> pd.DataFrame:
+        """Flag stuck (unchanged for > STUCK_READINGS_THRESHOLD readings) and spiking sensors."""
+        stuck, spike = SensorHealthMonitor().check(recent_data[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+        issues = np.where(stuck, REASON_STUCK, np.where(spike, REASON_SPIKE, REASON_OK)).astype(np.int8)
+        return pd.DataFrame(issues, index=recent_data.index, columns=FEATURE_COLUMNS)
+
     def handle_missing_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """Forward fill missing values up to limit."""
         return data.ffill(limit=3)
@@ -38,6 +169,7 @@ class DataStorage:
 
     def save_dataset(self, df: pd.DataFrame):
         """Save full dataset to CSV."""
+        Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
         df.to_csv(self.filename, index=False)
         print(f"Data saved to {self.filename}")
 
@@ -48,3 +180,148 @@ class DataStorage:
             df.to_csv(self.filename, index=False)
         else:
             df.to_csv(self.filename, mode='a', header=False, index=False)
+
+
+class ColumnarStorage:
+    """Buffered, time-partitioned columnar store for sensor readings.
+
+    Readings are buffered in memory and flushed in batches as NumPy `.npz`
+    chunks under `<root>/date=YYYY-MM-DD/`. Chunk file names carry their
+    first/last timestamp, so time-range reads only open the partitions and
+    chunks that overlap the range. CSV remains available via `export_csv`.
+    """
+
+    def __init__(self, root: Path = COLUMNAR_DATA_DIR, flush_size: int = STORAGE_FLUSH_SIZE,
+                 flush_interval: float = STORAGE_FLUSH_INTERVAL_S):
+        self.root = Path(root)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._frames: List[pd.DataFrame] = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def append_reading(self, reading: Union[Reading, Dict[str, Any]]):
+        """Buffer a single reading; flushes on size or age."""
+        self._rows.append(reading)
+        self._buffered += 1
+        self._maybe_flush()
+
+    def append_frame(self, df: Union[pd.DataFrame, np.ndarray]):
+        """Buffer a block of readings (DataFrame or READING_DTYPE array)."""
+        self._stage_rows()
+        if isinstance(df, np.ndarray):
+            df = block_frame(df)
+        self._frames.append(df)
+        self._buffered += len(df)
+        self._maybe_flush()
+
+    def _stage_rows(self):
+        if self._rows:
+            if all(isinstance(row, Reading) for row in self._rows):
+                self._frames.append(block_frame(to_block(self._rows)))
+            else:
+                self._frames.append(pd.DataFrame([row.to_dict() if isinstance(row, Reading) else row
+                                                  for row in self._rows]))
+            self._rows = []
+
+    def _maybe_flush(self):
+        if (self._buffered >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered readings as one chunk per daily partition."""
+        self._stage_rows()
+        self._last_flush = time.monotonic()
+        if not self._frames:
+            return
+        data = pd.concat(self._frames, ignore_index=True)
+        self._frames = []
+        self._buffered = 0
+
+        timestamps = pd.to_datetime(data['timestamp']).to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(timestamps, kind='stable')
+        data, timestamps = data.iloc[order], timestamps[order]
+        days = timestamps.astype('datetime64[D]')
+
+        for day in np.unique(days):
+            mask = days == day
+            self._write_chunk(str(day), data[mask], timestamps[mask])
+
+    def _write_chunk(self, day: str, data: pd.DataFrame, timestamps: np.ndarray):
+        partition = self.root / f"date={day}"
+        partition.mkdir(parents=True, exist_ok=True)
+
+        arrays = {'timestamp': timestamps.view(np.int64)}
+        for col in data.columns:
+            if col == 'timestamp':
+                continue
+            values = data[col].to_numpy()
+            if values.dtype.kind in 'biuf':
+                arrays[col] = values
+            else:
+                arrays[col] = values.astype(str)
+
+        first, last = arrays['timestamp'][0], arrays['timestamp'][-1]
+        path = partition / f"chunk_{first}_{last}_{uuid.uuid4().hex[:8]}.npz"
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def _chunk_paths(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> List[Path]:
+        if not self.root.exists():
+            return []
+        start_ns = start.astype('datetime64[ns]').astype(np.int64) if start is not None else None
+        end_ns = end.astype('datetime64[ns]').astype(np.int64) if end is not None else None
+        paths = []
+        for partition in sorted(self.root.glob('date=*')):
+            day = np.datetime64(partition.name[len('date='):])
+            if start is not None and day < start.astype('datetime64[D]'):
+                continue
+            if end is not None and day > end.astype('datetime64[D]'):
+                continue
+            for chunk in sorted(partition.glob('chunk_*.npz')):
+                _, first, last, _ = chunk.stem.split('_')
+                if start_ns is not None and int(last) < start_ns:
+                    continue
+                if end_ns is not None and int(first) > end_ns:
+                    continue
+                paths.append(chunk)
+        return paths
+
+    def iter_chunks(self, start=None, end=None) -> Iterator[pd.DataFrame]:
+        """Yield stored readings chunk by chunk, restricted to [start, end]."""
+        self.flush()
+        start = np.datetime64(pd.Timestamp(start), 'ns') if start is not None else None
+        end = np.datetime64(pd.Timestamp(end), 'ns') if end is not None else None
+
+        for path in self._chunk_paths(start, end):
+            with np.load(path, allow_pickle=False) as chunk:
+                columns = {name: chunk[name] for name in chunk.files}
+            timestamps = columns.pop('timestamp').view('datetime64[ns]')
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+            if not mask.any():
+                continue
+            frame = pd.DataFrame({'timestamp': timestamps[mask]})
+            for name, values in columns.items():
+                frame[name] = values[mask] if values.dtype.kind != 'U' else values[mask].astype(object)
+            yield frame
+
+    def read_range(self, start=None, end=None) -> pd.DataFrame:
+        """Readings with start <= timestamp <= end, in time order."""
+        frames = list(self.iter_chunks(start, end))
+        if not frames:
+            return pd.DataFrame(columns=['timestamp'])
+        data = pd.concat(frames, ignore_index=True)
+        return data.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    def export_csv(self, filename: Path = DATASET_FILENAME, start=None, end=None):
+        """Export (a time range of) the store to CSV."""
+        self.read_range(start, end).to_csv(filename, index=False)
+        print(f"Data exported to {filename}")
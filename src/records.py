@@ -0,0 +1,215 @@
+from typing import Dict, Any, Iterable, Iterator, Mapping, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from numpy.lib.recfunctions import structured_to_unstructured
+from src.config import FEATURE_COLUMNS
+
+_LABEL_WIDTHS = {'station_id': 16, 'dataset_type': 8}  # Minimum label field widths (characters)
+
+
+def reading_dtype(station_width: int = _LABEL_WIDTHS['station_id'],
+                  type_width: int = _LABEL_WIDTHS['dataset_type']) -> np.dtype:
+    """One row of a reading block: 8-byte timestamp, fixed-width labels, float64 sensors."""
+    return np.dtype(
+        [('timestamp', 'datetime64[ns]'), ('station_id', f'U{station_width}'), ('dataset_type', f'U{type_width}')]
+        + [(col, np.float64) for col in FEATURE_COLUMNS]
+    )
+
+
+# Blocks use this layout unless a label is longer; `to_block` then widens
+# that field to the block's longest label (NumPy would silently truncate it)
+READING_DTYPE = reading_dtype()
+
+_FEATURE_INDEX = {col: i for i, col in enumerate(FEATURE_COLUMNS)}
+
+
+def is_block(data) -> bool:
+    """Whether `data` is a reading block (of any label widths)."""
+    return isinstance(data, np.ndarray) and data.dtype.names == READING_DTYPE.names
+
+
+def _label_values(values: Sequence[str]) -> np.ndarray:
+    return np.asarray(values, dtype=str)  # Sized to the longest label
+
+
+def _block(n: int, labels: Dict[str, np.ndarray]) -> np.ndarray:
+    """Empty block with label fields wide enough for `labels`."""
+    char = np.dtype('U1').itemsize
+    widths = {label: max(width, labels[label].dtype.itemsize // char) if label in labels else width
+              for label, width in _LABEL_WIDTHS.items()}
+    return np.zeros(n, dtype=reading_dtype(widths['station_id'], widths['dataset_type']))
+
+
+class Reading:
+    """One sensor reading: timestamp, optional station / ground-truth label, feature values.
+
+    Features live in a float64 array in FEATURE_COLUMNS order (ready for the
+    detector). Mapping-style access (`reading['pH']`, `reading.get(...)`)
+    keeps code written for dict and Series rows working unchanged.
+    """
+
+    __slots__ = ('timestamp', 'station_id', 'dataset_type', 'values')
+
+    def __init__(self, timestamp, values: np.ndarray, station_id: Optional[str] = None,
+                 dataset_type: Optional[str] = None):
+        self.timestamp = timestamp
+        self.values = values
+        self.station_id = station_id
+        self.dataset_type = dataset_type
+
+    @classmethod
+    def from_mapping(cls, reading: Mapping[str, Any]) -> 'Reading':
+        """Build from a dict or Series row (missing sensors become NaN)."""
+        if isinstance(reading, Reading):
+            return reading
+        values = np.array([reading.get(col, np.nan) for col in FEATURE_COLUMNS], dtype=np.float64)
+        return cls(reading.get('timestamp'), values, reading.get('station_id'), reading.get('dataset_type'))
+
+    def __getitem__(self, key: str):
+        index = _FEATURE_INDEX.get(key)
+        if index is not None:
+            return float(self.values[index])
+        if key in ('timestamp', 'station_id', 'dataset_type'):
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the original row layout (unset labels omitted)."""
+        record = {'timestamp': self.timestamp}
+        if self.station_id is not None:
+            record['station_id'] = self.station_id
+        record.update(zip(FEATURE_COLUMNS, self.values.tolist()))
+        if self.dataset_type is not None:
+            record['dataset_type'] = self.dataset_type
+        return record
+
+    def __repr__(self) -> str:
+        return f"Reading({self.to_dict()!r})"
+
+
+class Alert:
+    """A flagged reading with its explanation.
+
+    Holds the `Reading` itself rather than a copy; `to_dict` gives the
+    JSON record written to the alert log. Mapping-style access mirrors
+    that record's top-level keys.
+    """
+
+    __slots__ = ('id', 'reading', 'explanation', 'severity')
+
+    def __init__(self, alert_id: int, reading: Reading, explanation: Dict[str, Any], severity: str):
+        self.id = alert_id
+        self.reading = reading
+        self.explanation = explanation
+        self.severity = severity
+
+    @property
+    def timestamp(self):
+        return self.reading.timestamp
+
+    def __getitem__(self, key: str):
+        if key in self.__slots__ or key == 'timestamp':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready record (timestamps as strings)."""
+        reading = self.reading.to_dict()
+        reading['timestamp'] = str(reading['timestamp'])
+        return {
+            'id': self.id,
+            'timestamp': reading['timestamp'],
+            'reading': reading,
+            'explanation': self.explanation,
+            'severity': self.severity
+        }
+
+
+def build_alert(alert_id: Optional[int], reading: Union[Reading, Mapping[str, Any]], explanation: Dict[str, Any]) -> Alert:
+    """Alert for a flagged reading; severity follows the explanation's confidence."""
+    return Alert(alert_id, Reading.from_mapping(reading), explanation,
+                 'CRITICAL' if explanation['confidence'] == 'HIGH' else 'WARNING')
+
+
+def to_block(data: Union[pd.DataFrame, Sequence[Reading], Iterable[Mapping[str, Any]]]) -> np.ndarray:
+    """Structured READING_DTYPE array from a DataFrame or a sequence of readings.
+
+    Label fields are widened when a station id or dataset type is longer
+    than READING_DTYPE's.
+    """
+    if is_block(data):
+        return data
+    if not isinstance(data, pd.DataFrame):
+        readings = [Reading.from_mapping(r) for r in data]
+        labels = {
+            'station_id': _label_values([r.station_id or '' for r in readings]),
+            'dataset_type': _label_values([r.dataset_type or '' for r in readings])
+        }
+        block = _block(len(readings), labels)
+        if readings:
+            block['timestamp'] = pd.to_datetime([r.timestamp for r in readings]).to_numpy(dtype='datetime64[ns]')
+            for label, values in labels.items():
+                block[label] = values
+            values = np.vstack([r.values for r in readings])
+            for i, col in enumerate(FEATURE_COLUMNS):
+                block[col] = values[:, i]
+        return block
+
+    labels = {label: _label_values(data[label].fillna('').astype(str).to_numpy())
+              for label in _LABEL_WIDTHS if label in data.columns}
+    block = _block(len(data), labels)
+    if 'timestamp' in data.columns:
+        block['timestamp'] = pd.to_datetime(data['timestamp']).to_numpy(dtype='datetime64[ns]')
+    for label, values in labels.items():
+        block[label] = values
+    for col in FEATURE_COLUMNS:
+        block[col] = data[col].to_numpy(dtype=np.float64) if col in data.columns else np.nan
+    return block
+
+
+def feature_matrix(data: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+    """(n, len(FEATURE_COLUMNS)) float64 values of a DataFrame or reading block (missing columns NaN)."""
+    if isinstance(data, np.ndarray):
+        return structured_to_unstructured(data[FEATURE_COLUMNS], dtype=np.float64)
+    if not len(data):
+        return np.empty((0, len(FEATURE_COLUMNS)))
+    return np.column_stack([
+        data[col].to_numpy(dtype=np.float64) if col in data.columns else np.full(len(data), np.nan)
+        for col in FEATURE_COLUMNS
+    ])
+
+
+def iter_readings(block: np.ndarray) -> Iterator[Reading]:
+    """`Reading`s for the rows of a block (empty labels become None)."""
+    values = feature_matrix(block)
+    timestamps = pd.DatetimeIndex(block['timestamp'])
+    stations = block['station_id'].tolist()
+    labels = block['dataset_type'].tolist()
+    for i, timestamp in enumerate(timestamps):
+        yield Reading(timestamp, values[i].copy(), stations[i] or None, labels[i] or None)
+
+
+def block_frame(block: np.ndarray) -> pd.DataFrame:
+    """DataFrame view of a block (label columns that are empty throughout are dropped)."""
+    frame = pd.DataFrame(block)
+    for label in ('station_id', 'dataset_type'):
+        if not (block[label] != '').any():
+            frame = frame.drop(columns=label)
+    return frame
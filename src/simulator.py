@@ -1,17 +1,29 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Sequence
 import random
 from src.config import (
     BASELINE_PH, BASELINE_TURBIDITY, BASELINE_TDS, BASELINE_TEMP,
     RANDOM_SEED
 )
 
+ANOMALY_TYPES = ('chemical_spill', 'sewage_discharge', 'industrial_waste')
+
 class SensorSimulator:
-    def __init__(self, seed: int = RANDOM_SEED):
-        np.random.seed(seed)
-        random.seed(seed)
+    def __init__(self, seed: int = RANDOM_SEED, rng: Optional[np.random.Generator] = None):
+        """Seed the simulator.
+
+        With `rng`, vectorized generation draws from that generator and the
+        global `np.random` / `random` state used by the per-reading methods
+        is left alone.
+        """
+        self.seed = seed
+        if rng is None:
+            np.random.seed(seed)
+            random.seed(seed)
+            rng = np.random.default_rng(seed)
+        self.rng = rng
         self.current_time = datetime.now()
 
     def generate_normal_reading(self, hour_of_day: int) -> Dict[str, float]:
@@ -93,3 +105,109 @@ class SensorSimulator:
             data.append(entry)
             
         return pd.DataFrame(data)
+
+    def iter_dataset_chunks(self, num_readings: int, chunk_size: int = 100_000,
+                            anomaly_count: int = 2,
+                            anomaly_types: Sequence[str] = ('chemical_spill', 'sewage_discharge'),
+                            anomaly_start: int = 800,
+                            start_time: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+        """Vectorized dataset generation, yielded in chunks of `chunk_size` rows.
+
+        All noise is drawn as arrays from `self.rng`; diurnal effects are
+        applied as array operations and anomalies are injected through index
+        masks. `anomaly_count` anomalies are placed in [anomaly_start,
+        num_readings) (none if that range is too small), cycling through
+        `anomaly_types`.
+        """
+        unknown = set(anomaly_types) - set(ANOMALY_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown anomaly types: {sorted(unknown)}")
+        if start_time is None:
+            start_time = datetime.now() - timedelta(minutes=num_readings)
+        start_time = pd.Timestamp(start_time)
+
+        # Anomaly positions for the whole dataset; each chunk takes its slice
+        available = num_readings - anomaly_start
+        if anomaly_count > 0 and anomaly_types and available >= anomaly_count:
+            positions = np.sort(self.rng.choice(available, size=anomaly_count, replace=False)) + anomaly_start
+        else:
+            positions = np.array([], dtype=np.int64)
+        type_codes = np.arange(len(positions)) % max(len(anomaly_types), 1)
+
+        for offset in range(0, num_readings, chunk_size):
+            n = min(chunk_size, num_readings - offset)
+            in_chunk = (positions >= offset) & (positions < offset + n)
+            yield self._generate_block(
+                offset, n, start_time, positions[in_chunk] - offset,
+                [anomaly_types[c] for c in type_codes[in_chunk]]
+            )
+
+    def generate_dataset_vectorized(self, num_readings: int = 1000, **kwargs) -> pd.DataFrame:
+        """Array-based equivalent of `generate_dataset` for large corpora."""
+        chunks = list(self.iter_dataset_chunks(num_readings, chunk_size=max(num_readings, 1), **kwargs))
+        if not chunks:
+            return pd.DataFrame(columns=['timestamp', 'pH', 'turbidity_ntu', 'tds_mgl', 'temp_celsius', 'dataset_type'])
+        return chunks[0]
+
+    def _generate_block(self, offset: int, n: int, start_time: pd.Timestamp,
+                        anomaly_rows: np.ndarray, anomaly_kinds: List[str]) -> pd.DataFrame:
+        rng = self.rng
+        timestamps = start_time + pd.to_timedelta(np.arange(offset, offset + n), unit='min')
+        hours = timestamps.hour.to_numpy()
+
+        is_anomaly = np.zeros(n, dtype=bool)
+        is_anomaly[anomaly_rows] = True
+        hours = np.where(is_anomaly, 12, hours)  # Anomalies use a midday base reading
+
+        # Same distributions as generate_normal_reading, drawn for the whole block
+        ph_variation = np.where((hours >= 10) & (hours <= 16), 0.1, 0.0)
+        ph = rng.uniform(BASELINE_PH[0], BASELINE_PH[1], n) + ph_variation + rng.normal(0, 0.05, n)
+        turb = rng.uniform(BASELINE_TURBIDITY[0], BASELINE_TURBIDITY[1], n) + rng.normal(0, 0.1, n)
+        tds = rng.uniform(BASELINE_TDS[0], BASELINE_TDS[1], n) + rng.normal(0, 5.0, n)
+        temp_variation = np.where((hours >= 6) & (hours <= 18), 2.0 * np.sin((hours - 6) * np.pi / 12), 0.0)
+        temp = rng.uniform(BASELINE_TEMP[0], BASELINE_TEMP[1], n) + temp_variation + rng.normal(0, 0.2, n)
+
+        ph = np.round(ph, 2)
+        turb = np.round(np.maximum(0, turb), 2)
+        tds = np.round(np.maximum(0, tds), 1)
+        temp = np.round(temp, 1)
+
+        # Inject anomalies by index masks (same shifts as inject_anomaly)
+        kinds = np.array(anomaly_kinds, dtype=object)
+        for kind in ANOMALY_TYPES:
+            rows = anomaly_rows[kinds == kind] if len(kinds) else anomaly_rows[:0]
+            if len(rows) == 0:
+                continue
+            if kind == 'chemical_spill':
+                ph[rows] += rng.uniform(2.0, 4.0, len(rows))
+            elif kind == 'sewage_discharge':
+                turb[rows] += rng.uniform(10.0, 50.0, len(rows))
+                tds[rows] += rng.uniform(200.0, 500.0, len(rows))
+            elif kind == 'industrial_waste':
+                ph[rows] -= rng.uniform(2.0, 3.0, len(rows))
+                temp[rows] += rng.uniform(5.0, 10.0, len(rows))
+
+        return pd.DataFrame({
+            'timestamp': timestamps,
+            'pH': ph,
+            'turbidity_ntu': turb,
+            'tds_mgl': tds,
+            'temp_celsius': temp,
+            'dataset_type': np.where(is_anomaly, 'anomaly', 'normal')
+        }, index=pd.RangeIndex(offset, offset + n))
+
+    def generate_station_streams(self, num_stations: int, num_readings: int = 1000) -> Dict[str, pd.DataFrame]:
+        """Generate independent datasets for N stations.
+
+        Each station draws from its own generator spawned from this
+        simulator's seed, so streams do not overlap across stations or
+        nearby seeds, and the caller's random state is untouched.
+        """
+        streams = {}
+        for k, child in enumerate(np.random.SeedSequence(self.seed).spawn(num_stations)):
+            station_id = f"station_{k:03d}"
+            station_sim = SensorSimulator(seed=self.seed, rng=np.random.default_rng(child))
+            df = station_sim.generate_dataset_vectorized(num_readings)
+            df.insert(0, 'station_id', station_id)
+            streams[station_id] = df
+        return streams
@@ -0,0 +1,132 @@
+import os
+import zlib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from src.config import FEATURE_COLUMNS, STATION_WORKERS
+from src.ml_engine import AnomalyDetector
+
+# Per-process registry of station detectors. Each worker process owns the
+# detectors of the stations sharded to it, so state never crosses processes.
+_station_detectors: Dict[str, AnomalyDetector] = {}
+
+
+def _train_stations(station_data: Dict[str, pd.DataFrame],
+                    registry: Optional[Dict[str, AnomalyDetector]] = None) -> Dict[str, int]:
+    """(Re)train one detector per station on its clean data."""
+    registry = _station_detectors if registry is None else registry
+    for station_id, data in station_data.items():
+        detector = AnomalyDetector()
+        detector.train_models(data[FEATURE_COLUMNS])
+        registry[station_id] = detector
+    return {station_id: len(data) for station_id, data in station_data.items()}
+
+
+def _load_stations(station_models: Dict[str, Tuple[Path, Optional[str]]],
+                   registry: Optional[Dict[str, AnomalyDetector]] = None) -> Dict[str, str]:
+    """Give each station its own detector over a saved model version (read once per call)."""
+    from src.model_store import ModelStore
+    registry = _station_detectors if registry is None else registry
+    loaded: Dict[Tuple[Path, Optional[str]], AnomalyDetector] = {}
+    versions = {}
+    for station_id, (models_dir, version) in station_models.items():
+        source = loaded.get((models_dir, version))
+        detector = AnomalyDetector(background_retrain=False)
+        if source is None:
+            ModelStore(models_dir).load_into(detector, version=version)
+            loaded[(models_dir, version)] = detector
+        else:
+            # Same (immutable) models and window, separate rolling state
+            detector.contamination_rate = source.contamination_rate
+            detector.install_models(source.models.current, source.training_data,
+                                    source.rolling_detector.window_values())
+        registry[station_id] = detector
+        versions[station_id] = version
+    return versions
+
+
+def _score_stations(station_batches: Dict[str, pd.DataFrame],
+                    registry: Optional[Dict[str, AnomalyDetector]] = None) -> Dict[str, pd.DataFrame]:
+    """Score a block of readings per station, advancing each rolling window."""
+    registry = _station_detectors if registry is None else registry
+    return {
+        station_id: registry[station_id].detect_batch(batch)
+        for station_id, batch in station_batches.items()
+    }
+
+
+def _update_contamination(station_rates: Dict[str, float],
+                          registry: Optional[Dict[str, AnomalyDetector]] = None) -> Dict[str, float]:
+    registry = _station_detectors if registry is None else registry
+    for station_id, rate in station_rates.items():
+        registry[station_id].update_contamination_rate(rate)
+    return {station_id: registry[station_id].contamination_rate for station_id in station_rates}
+
+
+class MultiStationEngine:
+    """Station-keyed detection engine sharded across worker processes.
+
+    Every shard is a single-process executor, so a station is always scored
+    by the process that holds its scaler, models and rolling window, while
+    different shards run on different cores.
+    """
+
+    def __init__(self, num_workers: Optional[int] = STATION_WORKERS):
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.num_workers = num_workers
+        self._executors = [ProcessPoolExecutor(max_workers=1) for _ in range(num_workers)]
+        self._local_detectors: Dict[str, AnomalyDetector] = {}  # used when num_workers == 0
+        self.stations: List[str] = []
+
+    def shard_for(self, station_id: str) -> int:
+        """Stable station -> shard assignment."""
+        return zlib.crc32(station_id.encode()) % max(self.num_workers, 1)
+
+    def _dispatch(self, fn: Callable, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run `fn` on the per-shard slices of a station-keyed payload."""
+        if self.num_workers == 0:
+            return fn(payload, self._local_detectors)
+
+        shards: Dict[int, Dict[str, Any]] = {}
+        for station_id, item in payload.items():
+            shards.setdefault(self.shard_for(station_id), {})[station_id] = item
+
+        futures = [self._executors[shard].submit(fn, items) for shard, items in shards.items()]
+        merged = {}
+        for future in futures:
+            merged.update(future.result())
+        return merged
+
+    def train(self, station_data: Dict[str, pd.DataFrame]):
+        """Train (or retrain) the detectors for the given stations in parallel."""
+        trained = self._dispatch(_train_stations, station_data)
+        self.stations = sorted(set(self.stations) | set(trained))
+
+    def load(self, station_ids: List[str], models_dir: Path, version: Optional[str] = None):
+        """Serve the given stations from a saved model version instead of training them."""
+        self._dispatch(_load_stations, {station_id: (Path(models_dir), version) for station_id in station_ids})
+        self.stations = sorted(set(self.stations) | set(station_ids))
+
+    def score(self, station_batches: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Score one block of readings per station; returns `detect_batch` frames."""
+        unknown = set(station_batches) - set(self.stations)
+        if unknown:
+            raise KeyError(f"Stations not trained: {sorted(unknown)}")
+        return self._dispatch(_score_stations, station_batches)
+
+    def update_contamination_rate(self, station_rates: Dict[str, float]) -> Dict[str, float]:
+        """Apply per-station sensitivity changes (IF retrains run on the shards)."""
+        return self._dispatch(_update_contamination, station_rates)
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        self._executors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
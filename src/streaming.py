@@ -0,0 +1,323 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator
+import pandas as pd
+import numpy as np
+from src.config import FEATURE_COLUMNS, STREAM_QUEUE_SIZE, STREAM_DETECT_BATCH
+from src.simulator import SensorSimulator
+from src.pipeline import DataValidator, ColumnarStorage, SensorHealthMonitor, usable, REASON_SPIKE
+from src.ml_engine import AnomalyDetector
+from src.explainer import AlertExplainer
+from src.records import Reading, Alert, build_alert, to_block
+from src.training_store import ContinualTraining
+
+_END = object()  # End-of-stream marker passed between stages
+
+
+# --- Sources ---
+
+def parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parse one line-protocol record: a JSON object or `timestamp,pH,turbidity,tds,temp`."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        return json.loads(line)
+    fields = line.split(',')
+    if len(fields) != len(FEATURE_COLUMNS) + 1 or fields[0] == 'timestamp':
+        return None  # Header or malformed row
+    reading = {'timestamp': fields[0]}
+    for col, value in zip(FEATURE_COLUMNS, fields[1:]):
+        reading[col] = float(value)
+    return reading
+
+
+async def simulator_source(simulator: SensorSimulator, num_readings: int,
+                           interval: float = 0.0) -> AsyncIterator[Dict[str, Any]]:
+    """Simulated readings, one every `interval` seconds (0 = as fast as possible)."""
+    for i in range(num_readings):
+        timestamp = pd.Timestamp.now()
+        reading = simulator.generate_normal_reading(timestamp.hour)
+        yield {'timestamp': timestamp, **reading}
+        await asyncio.sleep(interval)
+
+
+async def socket_source(host: str = '127.0.0.1', port: int = 8765,
+                        queue_size: int = STREAM_QUEUE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Readings sent as line-protocol records over TCP.
+
+    Connection handlers block on a bounded queue, so when the pipeline falls
+    behind they stop reading and TCP flow control pushes back on senders.
+    """
+    received: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            async for raw in reader:
+                reading = parse_line(raw.decode())
+                if reading is not None:
+                    await received.put(reading)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    try:
+        while True:
+            yield await received.get()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+async def file_tail_source(path: Path, poll_interval: float = 0.5, from_start: bool = True,
+                           follow: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """Readings appended to a CSV/JSON-lines file (like `tail -f`)."""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, 2)
+        partial = ''
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            if not line.endswith('\n'):
+                partial += line  # Writer is mid-line
+                continue
+            reading = parse_line(partial + line)
+            partial = ''
+            if reading is not None:
+                yield reading
+
+
+async def replay_source(path: Path, speed: float = 0.0,
+                        chunk_size: int = 10_000) -> AsyncIterator[Dict[str, Any]]:
+    """Readings from a recorded CSV, paced by their timestamps.
+
+    `speed` is the rate relative to real time (1.0 = real time, 60 = one
+    recorded minute per second); 0 replays as fast as the pipeline accepts.
+    The file is read in chunks, so it never has to fit in memory.
+    """
+    first_timestamp = None
+    started = time.monotonic()
+    for chunk in pd.read_csv(path, chunksize=chunk_size, parse_dates=['timestamp']):
+        for reading in chunk.to_dict('records'):
+            if speed > 0:
+                if first_timestamp is None:
+                    first_timestamp = reading['timestamp']
+                due = (reading['timestamp'] - first_timestamp).total_seconds() / speed
+                delay = due - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield reading
+
+
+# --- Pipeline ---
+
+def _parse_reading(reading: Dict[str, Any]) -> Optional[Reading]:
+    """`Reading` with a parsed timestamp, or None if the record is malformed."""
+    try:
+        reading = Reading.from_mapping(reading)
+        timestamp = pd.Timestamp(reading.timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if pd.isna(timestamp):
+        return None
+    reading.timestamp = timestamp
+    return reading
+
+
+class StageStats:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name: str, queue: Optional[asyncio.Queue]):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.dropped = 0
+        self.malformed = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            'stage': self.name,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'queue_capacity': self.queue.maxsize if self.queue is not None else 0,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'malformed': self.malformed,
+            'throughput_per_s': self.processed / elapsed if elapsed > 0 else 0.0,
+            'utilization': self.busy_seconds / elapsed if elapsed > 0 else 0.0
+        }
+
+
+class StreamingPipeline:
+    """Validation -> detection -> explanation -> storage over bounded queues.
+
+    Every stage reads from a bounded `asyncio.Queue`; when a stage falls
+    behind its input queue fills up, the upstream `put` waits and the
+    source stops being consumed (backpressure). The source and the stages
+    run as tasks supervised together: if any of them fails, the rest are
+    cancelled and `run` re-raises the error instead of waiting forever
+    on a full queue. Readings that cannot be parsed are counted as
+    `malformed` by the validate stage and dropped; the stage also runs
+    each station's own stuck/spike checks, as batch validation does
+    (stuck sensors are dropped, spikes flagged for the explainer and
+    kept out of the trainer's reservoir). Detection drains up to
+    `detect_batch` queued readings per call and scores them with
+    `detect_batch` on a worker thread so the event loop keeps serving I/O.
+    With a `trainer`, every scored batch also feeds its reservoir and drift
+    monitor on that thread.
+    """
+
+    def __init__(self, detector: AnomalyDetector, validator: Optional[DataValidator] = None,
+                 explainer: Optional[AlertExplainer] = None, storage: Optional[ColumnarStorage] = None,
+                 on_alert: Optional[Callable[[Alert], None]] = None,
+                 queue_size: int = STREAM_QUEUE_SIZE, detect_batch: int = STREAM_DETECT_BATCH,
+                 trainer: Optional[ContinualTraining] = None):
+        self.detector = detector
+        self.trainer = trainer
+        self.validator = validator or DataValidator()
+        self.explainer = explainer or AlertExplainer()
+        self.storage = storage
+        self.on_alert = on_alert
+        self.queue_size = queue_size
+        self.detect_batch = detect_batch
+        self.alert_count = 0
+        self.health_monitors: Dict[Optional[str], SensorHealthMonitor] = {}  # Per station; state spans runs
+        self._stats: List[StageStats] = []
+        self._started = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-stage queue depth and throughput since `run` started."""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return [stage.as_dict(elapsed) for stage in self._stats]
+
+    async def run(self, source: AsyncIterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Consume `source` until it ends; returns the final stage stats."""
+        validate_q = asyncio.Queue(maxsize=self.queue_size)
+        detect_q = asyncio.Queue(maxsize=self.queue_size)
+        explain_q = asyncio.Queue(maxsize=self.queue_size)
+        store_q = asyncio.Queue(maxsize=self.queue_size)
+
+        ingest = StageStats('ingest', None)
+        self._stats = [
+            ingest,
+            StageStats('validate', validate_q),
+            StageStats('detect', detect_q),
+            StageStats('explain', explain_q),
+            StageStats('store', store_q)
+        ]
+        _, validate, detect, explain, store = self._stats
+        self._started = time.perf_counter()
+
+        tasks = [
+            asyncio.create_task(self._ingest(ingest, source, validate_q)),
+            asyncio.create_task(self._validate_stage(validate, validate_q, detect_q)),
+            asyncio.create_task(self._detect_stage(detect, detect_q, explain_q)),
+            asyncio.create_task(self._explain_stage(explain, explain_q, store_q)),
+            asyncio.create_task(self._store_stage(store, store_q))
+        ]
+        try:
+            # Returns once every task is done, or as soon as one fails
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self.stats()
+
+    async def _ingest(self, stats: StageStats, source: AsyncIterator[Dict[str, Any]], outbox: asyncio.Queue):
+        async for reading in source:
+            await outbox.put(reading)  # Blocks while downstream is saturated
+            stats.processed += 1
+        await outbox.put(_END)
+
+    async def _validate_stage(self, stats: StageStats, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        while True:
+            reading = await inbox.get()
+            if reading is _END:
+                await outbox.put(_END)
+                return
+            start = time.perf_counter()
+            reading = _parse_reading(reading)
+            if reading is None:
+                stats.busy_seconds += time.perf_counter() - start
+                stats.malformed += 1
+                continue
+            monitor = self.health_monitors.get(reading.station_id)
+            if monitor is None:
+                monitor = self.health_monitors[reading.station_id] = SensorHealthMonitor()
+            reasons = self.validator.validate_values(reading.values[None, :], monitor)
+            stats.busy_seconds += time.perf_counter() - start
+            if not usable(reasons)[0]:
+                stats.dropped += 1
+                continue
+            stats.processed += 1
+            spikes = [col for col, reason in zip(FEATURE_COLUMNS, reasons[0]) if reason == REASON_SPIKE]
+            await outbox.put((reading, spikes))
+
+    async def _detect_stage(self, stats: StageStats, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        done = False
+        while not done:
+            batch = [await inbox.get()]
+            while len(batch) < self.detect_batch and not inbox.empty():
+                batch.append(inbox.get_nowait())
+            if batch[-1] is _END:
+                batch.pop()
+                done = True
+            if batch:
+                start = time.perf_counter()
+                trainable = np.array([not spikes for _, spikes in batch])
+                results = await asyncio.to_thread(self._detect, to_block([reading for reading, _ in batch]), trainable)
+                stats.busy_seconds += time.perf_counter() - start
+                stats.processed += len(batch)
+                for (reading, spikes), result in zip(batch, results.to_dict('records')):
+                    await outbox.put((reading, spikes, result))
+        await outbox.put(_END)
+
+    def _detect(self, block, trainable: np.ndarray) -> pd.DataFrame:
+        results = self.detector.detect_batch(block)
+        if self.trainer is not None:
+            self.trainer.observe_block(block, results['is_anomaly'].to_numpy(), trainable)
+        return results
+
+    async def _explain_stage(self, stats: StageStats, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                await outbox.put(_END)
+                return
+            reading, spikes, result = item
+            alert = None
+            if result['is_anomaly']:
+                start = time.perf_counter()
+                explanation = self.explainer.generate_explanation(reading, result['models_triggered'], spikes=spikes)
+                stats.busy_seconds += time.perf_counter() - start
+                self.alert_count += 1
+                alert = build_alert(self.alert_count, reading, explanation)
+            stats.processed += 1
+            await outbox.put((reading, alert))
+
+    async def _store_stage(self, stats: StageStats, inbox: asyncio.Queue):
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                if self.storage is not None:
+                    self.storage.flush()
+                return
+            reading, alert = item
+            start = time.perf_counter()
+            if self.storage is not None:
+                self.storage.append_reading(reading)
+            if alert is not None and self.on_alert is not None:
+                self.on_alert(alert)
+            stats.busy_seconds += time.perf_counter() - start
+            stats.processed += 1
@@ -0,0 +1,294 @@
+from typing import Any, Dict, List, Optional, Union, TYPE_CHECKING
+import numpy as np
+import pandas as pd
+from src.config import (
+    FEATURE_COLUMNS, RANDOM_SEED, TRAINING_RESERVOIR_SIZE, TRAINING_STRATUM_S, TRAINING_STRATA,
+    DRIFT_HALF_LIFE_READINGS, DRIFT_MEAN_THRESHOLD, DRIFT_SCALE_THRESHOLD, DRIFT_CLIP
+)
+from src.records import Reading, to_block, feature_matrix
+
+if TYPE_CHECKING:
+    from src.ml_engine import AnomalyDetector
+
+
+class StreamingSample:
+    """Uniform fixed-size sample of a stream of rows (Algorithm R, vectorized per block).
+
+    Every row offered so far is held with equal probability; until `size`
+    rows have been seen all of them are kept, in arrival order.
+    """
+
+    def __init__(self, size: int, features: int = len(FEATURE_COLUMNS), seed: int = RANDOM_SEED):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty((size, features))
+        self.filled = 0
+        self.seen = 0
+
+    def __len__(self) -> int:
+        return self.filled
+
+    def sample(self) -> np.ndarray:
+        return self.values[:self.filled].copy()
+
+    def add(self, values: np.ndarray):
+        """Offer a (n, features) block of rows."""
+        take = min(self.size - self.filled, len(values))
+        self.values[self.filled:self.filled + take] = values[:take]
+        self.filled += take
+        self.seen += take
+        rest = values[take:]
+        if not len(rest):
+            return
+        # Row i (0-based over the whole stream) replaces a random slot with probability size / (i + 1)
+        slots = self.rng.integers(0, self.seen + np.arange(1, len(rest) + 1))
+        self.seen += len(rest)
+        kept = np.flatnonzero(slots < self.size)
+        if len(kept):
+            # When a slot is hit twice in one block the later row wins, as it would row by row
+            last, first_in_reverse = np.unique(slots[kept][::-1], return_index=True)
+            self.values[last] = rest[kept[::-1][first_in_reverse]]
+
+
+class TrainingReservoir:
+    """Bounded, time-stratified sample of readings confirmed normal.
+
+    Readings are bucketed by timestamp into strata `stratum_seconds` wide;
+    the `max_strata` most recent strata share the capacity equally and
+    each keeps a uniform reservoir sample (Algorithm R) of its readings.
+    Memory is fixed at `capacity` rows however long the detector runs, and
+    old seasons age out as new strata open. Each stratum keeps the list of
+    rows it holds, so offering a reading is O(1); only dropping a stratum
+    touches every row.
+    """
+
+    def __init__(self, capacity: int = TRAINING_RESERVOIR_SIZE, stratum_seconds: float = TRAINING_STRATUM_S,
+                 max_strata: int = TRAINING_STRATA, seed: int = RANDOM_SEED):
+        self.capacity = capacity
+        self.stratum_ns = int(stratum_seconds * 1e9)
+        self.max_strata = max_strata
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty((capacity, len(FEATURE_COLUMNS)))
+        self.strata = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self.seen: Dict[int, int] = {}    # Readings offered per retained stratum
+        self.counts: Dict[int, int] = {}  # Rows held per retained stratum
+        self._rows: Dict[int, List[int]] = {}  # Row indices held per retained stratum (any order)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def sample(self) -> np.ndarray:
+        """Copy of the held readings, (rows, len(FEATURE_COLUMNS))."""
+        return self.values[:self.size].copy()
+
+    def add(self, values: np.ndarray, timestamp=None) -> bool:
+        """Offer one reading; returns whether it was stored.
+
+        Readings without a timestamp go to the newest stratum.
+        """
+        stratum = self._stratum(timestamp)
+        if stratum not in self.seen:
+            if len(self.seen) >= self.max_strata and stratum < min(self.seen):
+                return False  # Older than everything retained
+            self.seen[stratum] = self.counts[stratum] = 0
+            self._rows[stratum] = []
+            if len(self.seen) > self.max_strata:
+                self._drop(min(self.seen))
+        self.seen[stratum] += 1
+
+        if self.counts[stratum] < self.capacity // len(self.seen):
+            if self.size < self.capacity:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = self._evict()
+            self.counts[stratum] += 1
+            self._rows[stratum].append(slot)
+        else:
+            j = int(self.rng.integers(self.seen[stratum]))
+            if j >= self.counts[stratum]:
+                return False
+            slot = self._rows[stratum][j]
+        self.values[slot] = values
+        self.strata[slot] = stratum
+        return True
+
+    def add_block(self, values: np.ndarray, timestamps=None) -> int:
+        """Offer rows of a (n, features) array; returns how many were stored."""
+        timestamps = [None] * len(values) if timestamps is None else timestamps
+        return sum(self.add(row, timestamp) for row, timestamp in zip(values, timestamps))
+
+    def _stratum(self, timestamp) -> int:
+        if timestamp is None:
+            return max(self.seen) if self.seen else 0
+        return pd.Timestamp(timestamp).value // self.stratum_ns
+
+    def _evict(self) -> int:
+        """Free a random row of the largest stratum (a new stratum needs its share)."""
+        largest = max(self.counts, key=self.counts.get)
+        rows = self._rows[largest]
+        k = int(self.rng.integers(len(rows)))
+        slot = rows[k]
+        rows[k] = rows[-1]  # Swap-remove: the order within a stratum doesn't matter
+        rows.pop()
+        self.counts[largest] -= 1
+        return slot
+
+    def _drop(self, stratum: int):
+        keep = self.strata[:self.size] != stratum
+        kept = int(keep.sum())
+        self.values[:kept] = self.values[:self.size][keep]
+        self.strata[:kept] = self.strata[:self.size][keep]
+        self.size = kept
+        del self.seen[stratum], self.counts[stratum], self._rows[stratum]
+        # Rows moved: rebuild the other strata's lists (once per stratum, not per reading)
+        for other, rows in self._rows.items():
+            rows[:] = np.flatnonzero(self.strata[:kept] == other).tolist()
+
+
+class DriftMonitor:
+    """Streaming per-sensor drift statistic against a reference (training) sample.
+
+    Each reading is standardized with the reference mean and std, clipped
+    to +-`clip`, and folded into an exponentially weighted mean and mean
+    square. Drift is reported once at least `min_readings` have been seen
+    since the last reset and some sensor's EWMA mean has moved more than
+    `mean_threshold` reference std devs, or its EWMA std has changed by
+    more than a factor of `scale_threshold`. O(features) per reading.
+    """
+
+    def __init__(self, half_life: float = DRIFT_HALF_LIFE_READINGS, mean_threshold: float = DRIFT_MEAN_THRESHOLD,
+                 scale_threshold: float = DRIFT_SCALE_THRESHOLD, clip: float = DRIFT_CLIP,
+                 min_readings: Optional[int] = None):
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.mean_threshold = mean_threshold
+        self.scale_threshold = scale_threshold
+        self.clip = clip
+        self.min_readings = int(half_life) if min_readings is None else min_readings
+        self.reference_mean = np.zeros(len(FEATURE_COLUMNS))
+        self.reference_scale = np.ones(len(FEATURE_COLUMNS))
+        self.reset()
+
+    def reset(self, reference: Optional[np.ndarray] = None):
+        """Start over against `reference` readings (default: keep the current reference)."""
+        if reference is not None and len(reference):
+            self.reference_mean = reference.mean(axis=0)
+            scale = reference.std(axis=0)
+            self.reference_scale = np.where(scale > 0, scale, 1.0)
+        self.mean = np.zeros(len(FEATURE_COLUMNS))
+        self.mean_square = np.ones(len(FEATURE_COLUMNS))
+        self.readings = 0
+
+    def update(self, values: np.ndarray):
+        """Fold in one reading or a (n, features) block, oldest first."""
+        z = np.clip((np.atleast_2d(values) - self.reference_mean) / self.reference_scale, -self.clip, self.clip)
+        n = len(z)
+        if n == 0:
+            return
+        # EWMA over the block in closed form: older rows carry higher powers of the decay
+        weights = (1 - self.decay) * self.decay ** np.arange(n - 1, -1, -1)
+        carry = self.decay ** n
+        self.mean = carry * self.mean + weights @ z
+        self.mean_square = carry * self.mean_square + weights @ (z * z)
+        self.readings += n
+
+    def shift(self) -> np.ndarray:
+        """EWMA mean per sensor, in reference std devs."""
+        return self.mean
+
+    def scale(self) -> np.ndarray:
+        """EWMA std per sensor relative to the reference std."""
+        return np.sqrt(np.maximum(self.mean_square - self.mean ** 2, 0.0))
+
+    def columns(self) -> List[str]:
+        """Sensors currently past a threshold."""
+        scale = self.scale()
+        past = (np.abs(self.mean) > self.mean_threshold) | (scale > self.scale_threshold) \
+            | (scale * self.scale_threshold < 1)
+        return [col for col, flag in zip(FEATURE_COLUMNS, past) if flag]
+
+    def drifted(self) -> bool:
+        return self.readings >= self.min_readings and bool(self.columns())
+
+
+class ContinualTraining:
+    """Keeps a detector's training set bounded and refits it when the data drifts.
+
+    Every scored reading updates the drift monitor; readings that did not
+    alert (and alerts later marked FALSE_POSITIVE) go to the reservoir.
+    When the monitor reports drift, the detector is refitted on the
+    reservoir sample (in the background if the detector is configured
+    so) and the monitor restarts against that sample.
+    """
+
+    def __init__(self, detector: 'AnomalyDetector', reservoir: Optional[TrainingReservoir] = None,
+                 monitor: Optional[DriftMonitor] = None):
+        self.detector = detector
+        self.reservoir = TrainingReservoir() if reservoir is None else reservoir
+        self.monitor = DriftMonitor() if monitor is None else monitor
+        self.refits: List[Dict[str, Any]] = []
+
+    def seed(self, normal_data: Union[pd.DataFrame, np.ndarray], timestamp=None):
+        """Fill the reservoir with the initial training readings (DataFrame, block or raw array).
+
+        Readings without timestamps (raw arrays, frames without the column)
+        are dated `timestamp`, by default now.
+        """
+        if isinstance(normal_data, np.ndarray) and normal_data.dtype.names is None:
+            values, timestamps = np.asarray(normal_data, dtype=np.float64), None
+        else:
+            block = to_block(normal_data)
+            values = feature_matrix(block)
+            dated = isinstance(normal_data, np.ndarray) or 'timestamp' in normal_data.columns
+            timestamps = block['timestamp'] if dated else None
+        if timestamps is None:
+            timestamps = [pd.Timestamp.now() if timestamp is None else timestamp] * len(values)
+        self.reservoir.add_block(values, timestamps)
+        self.monitor.reset(self.reservoir.sample())
+
+    def seed_from_detector(self, timestamp=None):
+        """Seed from the detector's (scaled) training data, e.g. after a warm start, dated `timestamp` (now)."""
+        self.seed(self.detector.scaler.inverse_transform(np.asarray(self.detector.training_data)), timestamp)
+
+    def observe(self, reading: Reading, is_anomaly: bool, trainable: bool = True) -> bool:
+        """Account for one scored reading; returns whether a refit was started.
+
+        Readings that are not `trainable` (e.g. spiking) update the drift
+        monitor but never enter the reservoir.
+        """
+        self.monitor.update(reading.values)
+        if not is_anomaly and trainable:
+            self.reservoir.add(reading.values, reading.timestamp)
+        return self._check()
+
+    def observe_block(self, block: np.ndarray, is_anomaly: np.ndarray,
+                      trainable: Optional[np.ndarray] = None) -> bool:
+        """`observe` for a scored READING_DTYPE block, its `is_anomaly` column and optional `trainable` mask."""
+        values = feature_matrix(block)
+        self.monitor.update(values)
+        normal = ~np.asarray(is_anomaly, dtype=bool)
+        if trainable is not None:
+            normal &= np.asarray(trainable, dtype=bool)
+        self.reservoir.add_block(values[normal], block['timestamp'][normal])
+        return self._check()
+
+    def confirm_normal(self, reading: Reading):
+        """A flagged reading was marked FALSE_POSITIVE: train on it from now on."""
+        self.reservoir.add(reading.values, reading.timestamp)
+
+    def _check(self) -> bool:
+        if not self.monitor.drifted():
+            return False
+        sample = self.reservoir.sample()
+        columns = self.monitor.columns()
+        self.refits.append({
+            'readings_since_refit': self.monitor.readings,
+            'columns': columns,
+            'shift': dict(zip(FEATURE_COLUMNS, np.round(self.monitor.shift(), 3).tolist())),
+            'training_rows': len(sample)
+        })
+        print(f"Drift detected in {', '.join(columns)}: refitting on {len(sample)} readings.")
+        self.detector.refit_models(sample)
+        self.monitor.reset(sample)
+        return True
@@ -2,11 +2,61 @@ import unittest
 import pandas as pd
 import numpy as np
 import os
+import json
+import asyncio
+import tempfile
+import time
+import urllib.request
+import subprocess
+import sys
+import copy
+import threading
+from pathlib import Path
+from unittest import mock
+from sklearn.ensemble import IsolationForest
+from sklearn.svm import OneClassSVM
 from src.simulator import SensorSimulator
-from src.pipeline import DataValidator, DataStorage
-from src.ml_engine import AnomalyDetector, AdaptiveLearning
+from src.pipeline import DataValidator, DataStorage, ColumnarStorage
+from src.ml_engine import AnomalyDetector, AdaptiveLearning, RollingZScoreDetector, ApproxOneClassSVM, MODEL_NAMES
 from src.explainer import AlertExplainer
-from src.config import DATASET_FILENAME, BASELINE_PH
+from src.station_engine import MultiStationEngine
+from src.model_store import ModelStore
+from src.instrumentation import Instrumentation, profile_run
+from src.dashboard import DashboardRenderer, minmax_decimate
+from src.incidents import IncidentAggregator, LOG_TIME_FIELD as INCIDENT_LOG_TIME_FIELD
+from src.alert_log import AlertLog, AlertLogReader
+from src.records import READING_DTYPE, Reading, block_frame, build_alert, to_block, iter_readings
+from src.inference import InferenceKernel
+from src.training_store import TrainingReservoir, DriftMonitor, ContinualTraining, StreamingSample
+from src.feedback import FeedbackLedger
+from src.cli import main as cli_main
+from src.main import WAVESystem
+from src.streaming import StreamingPipeline, simulator_source, file_tail_source, parse_line
+from src.config import (
+    DATASET_FILENAME, BASELINE_PH, FEATURE_COLUMNS, ROLLING_WINDOW_SIZE, ZSCORE_THRESHOLD, DETECTION_CASCADE_ORDER,
+    STUCK_READINGS_THRESHOLD
+)
+
+
+def use_temporary_data_dir(test: unittest.TestCase) -> Path:
+    """Point the data directories (which CLI runs create) at a temporary directory for one test."""
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    root = Path(tmp.name)
+    paths = {
+        'DATA_DIR': root, 'RAW_DATA_DIR': root / 'raw', 'LOGS_DIR': root / 'logs',
+        'MODELS_DIR': root / 'models', 'COLUMNAR_DATA_DIR': root / 'columnar',
+        'ALERTS_LOG_FILENAME': root / 'logs' / 'alerts_log.ndjson',
+        'INCIDENTS_LOG_FILENAME': root / 'logs' / 'incidents_log.ndjson',
+        'FEEDBACK_LOG_FILENAME': root / 'logs' / 'feedback_ledger.ndjson'
+    }
+    for module in ('src.config', 'src.cli', 'src.main'):
+        for name, path in paths.items():
+            if hasattr(sys.modules[module], name):
+                patcher = mock.patch(f'{module}.{name}', path)
+                patcher.start()
+                test.addCleanup(patcher.stop)
+    return root
 
 class TestAdvancedCoverage(unittest.TestCase):
 
@@ -51,6 +101,49 @@ class TestAdvancedCoverage(unittest.TestCase):
         df_large = self.simulator.generate_dataset(num_readings=805)
         self.assertEqual(len(df_large[df_large['dataset_type'] == 'anomaly']), 2)
 
+    def test_simulator_vectorized_generation(self):
+        """Array-based generator honours anomaly counts/types and chunking."""
+        df = self.simulator.generate_dataset_vectorized(5000)
+        self.assertEqual(len(df), 5000)
+        self.assertEqual(list(df.columns), ['timestamp'] + FEATURE_COLUMNS + ['dataset_type'])
+        anomalies = df.index[df['dataset_type'] == 'anomaly']
+        self.assertEqual(len(anomalies), 2)
+        self.assertTrue((anomalies >= 800).all())
+        normal = df[df['dataset_type'] == 'normal']
+        self.assertTrue(7.0 <= normal['pH'].mean() <= 7.4)
+        self.assertTrue((normal['tds_mgl'] >= 0).all())
+
+        waste = self.simulator.generate_dataset_vectorized(
+            500, anomaly_count=10, anomaly_types=['industrial_waste'], anomaly_start=0
+        )
+        injected = waste[waste['dataset_type'] == 'anomaly']
+        self.assertEqual(len(injected), 10)
+        self.assertTrue((injected['pH'] < 6.0).all())
+        self.assertTrue((injected['temp_celsius'] > 24.0).all())
+
+        chunks = list(self.simulator.iter_dataset_chunks(2500, chunk_size=1000, anomaly_count=6, anomaly_start=0))
+        self.assertEqual([len(c) for c in chunks], [1000, 1000, 500])
+        self.assertEqual(sum(int((c['dataset_type'] == 'anomaly').sum()) for c in chunks), 6)
+        self.assertEqual(chunks[1].index[0], 1000)
+        with self.assertRaises(ValueError):
+            self.simulator.generate_dataset_vectorized(10, anomaly_types=['meteor'])
+
+    def test_station_streams_are_independent(self):
+        """Per-station generators are reproducible, distinct and leave the global RNG alone."""
+        simulator = SensorSimulator(seed=10)
+        np.random.seed(99)
+        expected = np.random.random()
+        np.random.seed(99)
+        streams = simulator.generate_station_streams(3, num_readings=50)
+        self.assertEqual(np.random.random(), expected)
+
+        again = SensorSimulator(seed=10).generate_station_streams(3, num_readings=50)
+        for sid, df in streams.items():
+            pd.testing.assert_frame_equal(df.drop(columns='timestamp'), again[sid].drop(columns='timestamp'))
+        neighbour = SensorSimulator(seed=11).generate_station_streams(3, num_readings=50)
+        self.assertFalse(np.array_equal(streams['station_001']['pH'].to_numpy(),
+                                        neighbour['station_000']['pH'].to_numpy()))
+
     # --- Pipeline Tests ---
     def test_pipeline_edges(self):
         """Test edge cases in validation and storage."""
@@ -73,6 +166,106 @@ class TestAdvancedCoverage(unittest.TestCase):
         self.assertTrue(os.path.exists(self.test_file))
         self.storage.append_reading({'test': 2}) # Append mode
         
+    def test_columnar_storage(self):
+        """Batched columnar writes round-trip and prune by time range."""
+        df = self.simulator.generate_dataset(num_readings=3000)  # Spans several days
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = ColumnarStorage(root=tmp, flush_size=500, flush_interval=3600)
+            for reading in df.iloc[:100].to_dict('records'):
+                storage.append_reading(reading)
+            self.assertEqual(os.listdir(tmp), [])  # Still buffered
+            storage.append_frame(df.iloc[100:])
+
+            stored = storage.read_range()
+            self.assertEqual(len(stored), len(df))
+            np.testing.assert_array_equal(stored['pH'].to_numpy(), df['pH'].to_numpy())
+            self.assertEqual(list(stored['dataset_type']), list(df['dataset_type']))
+
+            start, end = df['timestamp'].iloc[1000], df['timestamp'].iloc[1099]
+            self.assertLess(len(storage._chunk_paths(np.datetime64(start, 'ns'), np.datetime64(end, 'ns'))),
+                            len(storage._chunk_paths(None, None)))
+            subset = storage.read_range(start, end)
+            np.testing.assert_array_equal(subset['tds_mgl'].to_numpy(), df['tds_mgl'].iloc[1000:1100].to_numpy())
+
+            csv_path = os.path.join(tmp, 'export.csv')
+            storage.export_csv(csv_path, start, end)
+            self.assertEqual(len(pd.read_csv(csv_path)), 100)
+
+    def test_streaming_pipeline(self):
+        """Readings flow through bounded stages into storage and the alert sink."""
+        alerts = []
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = ColumnarStorage(root=tmp)
+            pipeline = StreamingPipeline(self.detector, storage=storage, on_alert=alerts.append,
+                                         queue_size=8, detect_batch=16)
+            stats = {s['stage']: s for s in asyncio.run(pipeline.run(simulator_source(self.simulator, 200)))}
+            self.assertEqual(stats['ingest']['processed'], 200)
+            self.assertEqual(stats['store']['processed'], 200)
+            self.assertEqual(stats['detect']['queue_capacity'], 8)
+            self.assertEqual(len(alerts), pipeline.alert_count)
+            self.assertEqual(len(storage.read_range()), 200)
+
+            # File tail source: CSV rows plus an invalid JSON-lines record
+            path = os.path.join(tmp, 'feed.csv')
+            self.simulator.generate_dataset(50)[['timestamp'] + FEATURE_COLUMNS].to_csv(path, index=False)
+            with open(path, 'a') as f:
+                f.write('{"timestamp": "2024-01-01 00:00", "pH": 20.0, "turbidity_ntu": 1, "tds_mgl": 1, "temp_celsius": 1}\n')
+            stats = {s['stage']: s for s in asyncio.run(StreamingPipeline(self.detector).run(
+                file_tail_source(path, follow=False)))}
+            self.assertEqual(stats['validate']['processed'], 50)
+            self.assertEqual(stats['validate']['dropped'], 1)
+
+        self.assertIsNone(parse_line('timestamp,pH,turbidity_ntu,tds_mgl,temp_celsius'))
+        self.assertEqual(parse_line('2024-01-01,7.1,1.5,200,22')['tds_mgl'], 200.0)
+
+    def test_streaming_sensor_health(self):
+        """Streamed readings get the batch path's per-station stuck-sensor and spike checks."""
+        async def readings(records):
+            for record in records:
+                yield record
+
+        start = pd.Timestamp('2024-01-01')
+        flat = {'pH': 7.1, 'turbidity_ntu': 1.5, 'tds_mgl': 200.0, 'temp_celsius': 22.0}
+        records = []
+        for i in range(20):
+            records.append({'timestamp': start + pd.Timedelta(minutes=i), 'station_id': 'stuck', **flat})
+            records.append({'timestamp': start + pd.Timedelta(minutes=i), 'station_id': 'live',
+                            **self.simulator.generate_normal_reading(12)})
+        records[-1] = dict(records[-1], turbidity_ntu=350.0)  # Contamination onset at the live station
+
+        alerts = []
+        pipeline = StreamingPipeline(self.detector, on_alert=alerts.append)
+        stats = {s['stage']: s for s in asyncio.run(pipeline.run(readings(records)))}
+        # The flat station's 11th and later readings exceed the stuck threshold; interleaving doesn't reset it
+        self.assertEqual(stats['validate']['dropped'], 20 - STUCK_READINGS_THRESHOLD)
+        self.assertEqual(stats['store']['processed'], 20 + STUCK_READINGS_THRESHOLD)
+        onset = [alert for alert in alerts if alert['reading']['turbidity_ntu'] == 350.0]
+        self.assertEqual(len(onset), 1)
+        self.assertEqual(onset[0]['explanation']['sudden_changes'], ['turbidity jumped'])
+
+    def test_streaming_pipeline_failures(self):
+        """Malformed readings are dropped and counted; a failing stage ends the run instead of hanging it."""
+        async def readings(records):
+            for record in records:
+                yield record
+
+        good = [{'timestamp': pd.Timestamp('2024-01-01') + pd.Timedelta(minutes=i),
+                 **self.simulator.generate_normal_reading(12)} for i in range(40)]
+        malformed = [dict(good[0], pH='abc'), dict(good[1], timestamp='not a time'), None]
+        pipeline = StreamingPipeline(self.detector, queue_size=2, detect_batch=4)
+        stats = {s['stage']: s for s in asyncio.run(asyncio.wait_for(
+            pipeline.run(readings(good[:20] + malformed + good[20:])), timeout=30))}
+        self.assertEqual(stats['ingest']['processed'], 43)
+        self.assertEqual(stats['validate']['malformed'], 3)
+        self.assertEqual(stats['store']['processed'], 40)
+
+        def fail(alert):
+            raise RuntimeError('alert sink down')
+        anomalous = [dict(reading, pH=13.5, turbidity_ntu=400.0) for reading in good]
+        failing = StreamingPipeline(self.detector, on_alert=fail, queue_size=2, detect_batch=4)
+        with self.assertRaisesRegex(RuntimeError, 'alert sink down'):
+            asyncio.run(asyncio.wait_for(failing.run(readings(good[:20] + anomalous * 5)), timeout=30))
+
     # --- ML Engine Tests ---
     def test_anomaly_detection_logic(self):
         """Test detection branches."""
@@ -87,6 +280,183 @@ class TestAdvancedCoverage(unittest.TestCase):
         self.assertIn('is_anomaly', result)
         self.assertIn('votes', result)
         
+    def test_detect_batch_matches_per_row(self):
+        """Batch scoring must reproduce the per-row ensemble exactly."""
+        df = self.simulator.generate_dataset(num_readings=150)
+        df.loc[100, 'pH'] = 11.0  # Force a rolling-stats vote
+        block = df.iloc[60:]
+
+        batch = self.detector.detect_batch(block, history=df.iloc[:60])
+        self.assertEqual(len(batch), len(block))
+        for i in range(60, len(df)):
+            expected = self.detector.detect_anomaly(df.iloc[i], df.iloc[max(0, i - 100):i])
+            row = batch.loc[i]
+            self.assertEqual(expected['votes'], [row['vote_stats'], row['vote_if'], row['vote_svm']])
+            self.assertEqual(expected['is_anomaly'], row['is_anomaly'])
+            self.assertEqual(expected['models_triggered'], row['models_triggered'])
+        self.assertTrue(batch.loc[100, 'vote_stats'])
+
+    def test_streaming_rolling_detector(self):
+        """Ring-buffer z-score votes must agree with the history-based check."""
+        df = self.simulator.generate_dataset(num_readings=200)
+        df.loc[150, 'tds_mgl'] = 900.0
+        values = df[FEATURE_COLUMNS].to_numpy()
+
+        rolling = RollingZScoreDetector()
+        for i in range(len(df)):
+            expected = self.detector.rolling_statistics_detection(df.iloc[i], df.iloc[max(0, i - 100):i])
+            self.assertEqual(rolling.update(values[i]), expected)
+
+        window = df[FEATURE_COLUMNS].tail(ROLLING_WINDOW_SIZE)
+        np.testing.assert_allclose(rolling.mean, window.mean().to_numpy())
+        np.testing.assert_allclose(rolling.std, window.std().to_numpy())
+        np.testing.assert_array_equal(rolling.window_values(), window.to_numpy())
+
+    def test_streaming_and_batch_votes_agree(self):
+        """detect_anomaly's streaming window and detect_batch vote alike, also at the threshold."""
+        df = self.simulator.generate_dataset(num_readings=400)
+        values = df[FEATURE_COLUMNS].to_numpy(copy=True)
+        # Readings whose z-score lands on the threshold, and a flatlined sensor
+        for i in range(150, 400, 25):
+            window = values[i - ROLLING_WINDOW_SIZE:i, 2]
+            mean = window.sum() / ROLLING_WINDOW_SIZE
+            std = np.sqrt(((mean - window) ** 2).sum() / (ROLLING_WINDOW_SIZE - 1))
+            values[i, 2] = mean + ZSCORE_THRESHOLD * std
+        values[300:330, 3] = 22.1
+        values[330, 3] = 22.1 + 1e-12
+        df[FEATURE_COLUMNS] = values
+
+        streaming = AnomalyDetector(background_retrain=False, cascade=False)
+        batch = AnomalyDetector(background_retrain=False, cascade=False)
+        for target in (streaming, batch):
+            target.install_models(self.detector.models.current, self.detector.training_data, values[:100])
+        expected = batch.detect_batch(df.iloc[100:])['vote_stats'].tolist()
+        votes = [streaming.detect_anomaly(df.iloc[i])['votes'][0] for i in range(100, len(df))]
+        self.assertEqual(votes, expected)
+
+    def test_multi_station_engine(self):
+        """Sharded per-station scoring matches a standalone detector per station."""
+        streams = self.simulator.generate_station_streams(3, num_readings=150)
+        self.assertEqual(len(set(float(df['pH'].iloc[0]) for df in streams.values())), 3)
+        training = {sid: df.iloc[:100] for sid, df in streams.items()}
+        monitoring = {sid: df.iloc[100:] for sid, df in streams.items()}
+
+        with MultiStationEngine(num_workers=2) as engine:
+            engine.train(training)
+            results = engine.score(monitoring)
+            with self.assertRaises(KeyError):
+                engine.score({'unknown': monitoring['station_000']})
+
+        for sid, df in streams.items():
+            detector = AnomalyDetector()
+            detector.train_models(training[sid][FEATURE_COLUMNS])
+            expected = detector.detect_batch(monitoring[sid])
+            pd.testing.assert_frame_equal(results[sid], expected)
+
+    def test_background_retrain_swaps_models(self):
+        """Retrains run off the scoring path and swap in a new model version."""
+        detector = AnomalyDetector(recalibrate_threshold=False)
+        detector.train_models(pd.DataFrame([self.simulator.generate_normal_reading(12) for _ in range(100)]))
+        old_version = detector.models.version
+        old_svm = detector.one_class_svm
+
+        detector.update_contamination_rate(0.08)
+        detector.update_contamination_rate(0.02)  # Supersedes the first request
+        result = detector.detect_anomaly(pd.Series(self.simulator.generate_normal_reading(12)))
+        self.assertIn('model_version', result)
+        detector.wait_for_retrain()
+
+        self.assertGreater(detector.models.version, old_version)
+        self.assertEqual(detector.isolation_forest.contamination, 0.02)
+        self.assertIs(detector.one_class_svm, old_svm)
+        metrics = detector.retrain_metrics[-1]
+        self.assertEqual(metrics['contamination_rate'], 0.02)
+        self.assertEqual(metrics['mode'], 'refit')
+        self.assertGreaterEqual(metrics['retrain_seconds'], 0.0)
+        self.assertGreaterEqual(metrics['swap_seconds'], 0.0)
+
+        # Synchronous mode swaps before returning
+        detector.update_contamination_rate(0.03, background=False)
+        self.assertEqual(detector.isolation_forest.contamination, 0.03)
+
+    def test_threshold_recalibration_matches_refit(self):
+        """Recalibrating the IF offset is equivalent to a full refit."""
+        old_trees = self.detector.isolation_forest.estimators_
+        for rate in [0.01, 0.03, 0.07, 0.10]:
+            self.detector.update_contamination_rate(rate)
+            forest = self.detector.isolation_forest
+            self.assertIs(forest.estimators_, old_trees)
+            self.assertEqual(self.detector.retrain_metrics[-1]['mode'], 'recalibrate')
+
+            refit = IsolationForest(contamination=rate, random_state=42).fit(self.detector.training_data)
+            self.assertEqual(forest.offset_, refit.offset_)
+            np.testing.assert_array_equal(
+                forest.predict(self.detector.training_data), refit.predict(self.detector.training_data)
+            )
+
+    def test_sgd_svm_backend(self):
+        """The kernel-approximation backend trains in chunks and tracks the exact SVM."""
+        normal = pd.DataFrame([self.simulator.generate_normal_reading(h % 24) for h in range(600)])
+        detector = AnomalyDetector(svm_backend='sgd')
+        detector.train_models(normal)
+        self.assertIsInstance(detector.one_class_svm, ApproxOneClassSVM)
+
+        X = detector.training_data
+        exact = OneClassSVM(kernel='rbf', nu=0.05).fit(X)
+        agreement = np.mean(detector.one_class_svm.predict(X) == exact.predict(X))
+        self.assertGreater(agreement, 0.9)
+
+        streamed = ApproxOneClassSVM()
+        for chunk in np.array_split(X, 3):
+            streamed.partial_fit(chunk)
+        self.assertEqual(streamed.predict(X).shape, (len(X),))
+        with self.assertRaises(ValueError):
+            AnomalyDetector(svm_backend='bogus')
+
+        # A loaded detector keeps the stored backend, so refits don't switch models
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ModelStore(root=tmp)
+            directory = store.save(detector)
+            restored = AnomalyDetector(background_retrain=False)
+            store.load_into(restored)
+            self.assertEqual(restored.svm_backend, 'sgd')
+            restored.refit_models(normal)
+            self.assertIsInstance(restored.one_class_svm, ApproxOneClassSVM)
+
+            manifest_path = directory / 'manifest.json'
+            manifest = json.loads(manifest_path.read_text())
+            del manifest['svm_backend']  # Saved before the backend was recorded
+            manifest_path.write_text(json.dumps(manifest))
+            legacy = AnomalyDetector(background_retrain=False)
+            store.load_into(legacy)
+            self.assertEqual(legacy.svm_backend, 'sgd')
+            del restored, legacy
+
+    def test_model_store_round_trip(self):
+        """Saved ensembles warm-start a fresh detector with identical results."""
+        learner = AdaptiveLearning(self.detector)
+        learner.record_feedback(1, 'FALSE_POSITIVE', pd.Timestamp('2024-01-01 10:00'))
+        self.detector.update_contamination_rate(0.04)
+        block = self.simulator.generate_dataset(num_readings=60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ModelStore(root=tmp, keep=2)
+            for _ in range(3):
+                store.save(self.detector, learner)
+            self.assertEqual(store.versions(), ['v0002', 'v0003'])
+            self.assertEqual(store.latest(), 'v0003')
+
+            restored = AnomalyDetector()
+            restored_learner = AdaptiveLearning(restored)
+            store.load_into(restored, restored_learner)
+            self.assertIsInstance(restored.training_data, np.memmap)
+            self.assertEqual(restored.contamination_rate, 0.04)
+            self.assertEqual(restored_learner.feedback_history[0]['feedback'], 'FALSE_POSITIVE')
+
+            expected = self.detector.detect_batch(block)
+            pd.testing.assert_frame_equal(restored.detect_batch(block), expected)
+            del restored
+
     def test_adaptive_learning(self):
         """Test feedback loop and contamination rate adjustment."""
         learner = AdaptiveLearning(self.detector)
@@ -107,7 +477,336 @@ class TestAdvancedCoverage(unittest.TestCase):
         # current is < 0.05. New batch has 0 FP. Rate 0.0. < 0.2. Adjustment +0.01.
         updated_rate = learner.current_contamination_rate
         # It's hard to predict exact value without tracking, but we can verify it changed or check logic
+
+    def test_feedback_ledger(self):
+        """Windowed FP counters per station/cause survive a restart, with or without a checkpoint."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'feedback.ndjson')
+            ledger = FeedbackLedger(path, window=20, checkpoint_every=25, fsync=False)
+            with self.assertRaises(ValueError):
+                ledger.record(0, 'MAYBE')
+            for i in range(60):
+                station = f"station_{i % 2}"
+                cause = 'Sensor Drift' if i % 3 else 'Chemical Spill'
+                # station_0 drift alerts are always rejected, everything else always confirmed
+                feedback = 'FALSE_POSITIVE' if station == 'station_0' and cause == 'Sensor Drift' else 'TRUE_POSITIVE'
+                ledger.record(i, feedback, '2024-01-01', station, cause)
+            ledger.record_adjustment(0.04, station_id='station_0')
+
+            # Windows hold the last 20 feedbacks of each key
+            self.assertEqual(ledger.stats().total, 20)
+            self.assertEqual(ledger.stats('station_0', 'Sensor Drift').total, 20)
+            self.assertEqual(ledger.fp_rate('station_0', 'Sensor Drift'), 1.0)
+            self.assertEqual(ledger.fp_rate('station_1', 'Sensor Drift'), 0.0)
+            self.assertAlmostEqual(ledger.fp_rate(likely_cause='Sensor Drift'), 0.5)
+            self.assertEqual(ledger.stats('station_0').pending, 0)
+            self.assertEqual(ledger.stats().pending, 60)
+            self.assertIsNone(ledger.fp_rate('station_9'))
+            expected = ledger.summary()
+            ledger.close()
+
+            # Reload from the checkpoint (written on close) and by full replay
+            restored = FeedbackLedger(path, window=20, fsync=False)
+            self.assertEqual(restored.load(), 0)
+            self.assertEqual(restored.summary(), expected)
+            os.remove(restored.checkpoint_path)
+            self.assertEqual(restored.load(), 61)
+            self.assertEqual(restored.summary(), expected)
+            self.assertEqual(restored.rates[('station_0', '*')], 0.04)
+
+            # Records written after the checkpoint are replayed on top of it
+            restored.checkpoint()
+            restored.record(60, 'FALSE_POSITIVE', '2024-01-02', 'station_1', 'Sensor Drift')
+            restored.log.close()
+            again = FeedbackLedger(path, window=20, fsync=False)
+            self.assertEqual(again.load(), 1)
+            self.assertEqual(again.stats('station_1', 'Sensor Drift').false_positives, 1)
+            self.assertEqual(again.seq, 62)
+
+            # The learner asks for unanimity where a cause is mostly rejected
+            learner = AdaptiveLearning(self.detector, again)
+            self.assertEqual(learner.station_rates, {'station_0': 0.04})
+            self.assertEqual(learner.required_votes('station_0', 'Sensor Drift'), 3)
+            self.assertEqual(learner.required_votes('station_1', 'Chemical Spill'), 2)
+            self.assertEqual(learner.required_votes('station_1', 'Unknown Cause'), 2)
+            self.assertEqual(learner.required_votes(), 2)
+
+            # Feedback on shadow alerts (suppressed, so no alert id) lets the cause recover
+            for _ in range(20):
+                record = again.record(None, 'TRUE_POSITIVE', '2024-01-03', 'station_0', 'Sensor Drift', suppressed=True)
+            self.assertTrue(record['suppressed'])
+            self.assertEqual(learner.required_votes('station_0', 'Sensor Drift'), 2)
+            again.log.close()
+
+        # A station's feedback window moves its rate and hands it to the station's detector
+        applied = []
+        tuned = AdaptiveLearning(self.detector, FeedbackLedger(None, window=20), on_station_rate=applied.append)
+        for i in range(20):
+            tuned.record_feedback(i, 'FALSE_POSITIVE', '2024-01-03', 'station_2', 'Sensor Drift')
+        self.assertEqual(applied, [{'station_2': tuned.station_rates['station_2']}])
+
+        # Alert and incident ids are kept apart
+        tuned.record_feedback(41, 'TRUE_POSITIVE', '2024-01-03', 'station_2', 'Sensor Drift', incident_id=7)
+        self.assertEqual({k: tuned.feedback_history[-1][k] for k in ('alert_id', 'incident_id')},
+                         {'alert_id': 41, 'incident_id': 7})
+        self.assertEqual(tuned.ledger.record(42, 'TRUE_POSITIVE', incident_id=7)['incident_id'], 7)
         
+    # --- Instrumentation Tests ---
+    def test_instrumentation(self):
+        """Stage timings feed histograms, JSON and Prometheus exports."""
+        instrumentation = Instrumentation(enabled=False)
+        with instrumentation.stage('detect'):
+            pass
+        instrumentation.count('readings')
+        self.assertEqual(instrumentation.snapshot()['stages'], {})
+
+        instrumentation.enable()
+        for _ in range(50):
+            with instrumentation.stage('detect'):
+                pass
+        instrumentation.record('model.retrain', 0.25)
+        instrumentation.count('readings', 50)
+
+        snapshot = instrumentation.snapshot()
+        detect = snapshot['stages']['detect']
+        self.assertEqual(detect['count'], 50)
+        self.assertLessEqual(detect['p50_ms'], detect['p99_ms'])
+        self.assertAlmostEqual(snapshot['stages']['model.retrain']['p50_ms'], 250.0, delta=25.0)
+        self.assertEqual(snapshot['counters']['readings']['total'], 50)
+
+        text = instrumentation.prometheus_text()
+        self.assertIn('wave_stage_latency_seconds_count{stage="detect"} 50', text)
+        self.assertIn('wave_events_total{name="readings"} 50', text)
+
+        server = instrumentation.serve(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                self.assertIn('quantile="0.99"', response.read().decode())
+        finally:
+            server.shutdown()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'perf.json')
+            instrumentation.export_json(path)
+            with open(path) as f:
+                self.assertIn('detect', json.load(f)['stages'])
+            for mode in ['cprofile', 'sampling']:
+                result = profile_run(sum, range(1000), mode=mode, output=os.path.join(tmp, f'{mode}.out'))
+                self.assertEqual(result, sum(range(1000)))
+                self.assertTrue(os.path.exists(os.path.join(tmp, f'{mode}.out')))
+
+    # --- Incident Tests ---
+    def test_incident_aggregation(self):
+        """Nearby alerts with the same cause merge; gaps, other causes and stations split."""
+        start = pd.Timestamp('2024-01-01 00:00')
+
+        def alert(alert_id, minute, cause='Sewage/Sediment', station=None, turbidity=5.0, severity='WARNING'):
+            return {
+                'id': alert_id,
+                'timestamp': str(start + pd.Timedelta(minutes=minute)),
+                'reading': {'station_id': station, 'pH': 7.2, 'turbidity_ntu': turbidity,
+                            'tds_mgl': 200.0, 'temp_celsius': 22.0},
+                'explanation': {'likely_cause': cause, 'recommended_action': 'Inspect.',
+                                'models_triggered': ['Statistical', 'Isolation Forest']},
+                'severity': severity
+            }
+
+        aggregator = IncidentAggregator(gap_seconds=600, max_open=2)
+        incident, is_new, closed = aggregator.add(alert(1, 0))
+        self.assertTrue(is_new)
+        for i in range(2, 300):  # A sustained spill: one alert per minute
+            _, is_new, closed = aggregator.add(alert(i, i, turbidity=5.0 + i, severity='CRITICAL' if i == 50 else 'WARNING'))
+            self.assertFalse(is_new)
+            self.assertEqual(closed, [])
+        summary = incident.to_dict()
+        self.assertEqual(summary['alert_count'], 299)
+        self.assertEqual(summary['peak']['turbidity_ntu'], 304.0)
+        self.assertEqual(summary['trough']['turbidity_ntu'], 5.0)
+        self.assertEqual(summary['severity'], 'CRITICAL')
+        self.assertEqual(summary['models_triggered']['Statistical'], 299)
+
+        _, is_new, _ = aggregator.add(alert(300, 300, cause='Thermal Pollution'))
+        self.assertTrue(is_new)
+        _, is_new, closed = aggregator.add(alert(301, 300, station='station_001'))
+        self.assertTrue(is_new)
+        self.assertEqual([c.id for c in closed], [1])  # max_open evicts the stalest
+
+        closed = aggregator.advance(start + pd.Timedelta(minutes=320))
+        self.assertEqual(sorted(c.id for c in closed), [2, 3])
+        _, is_new, _ = aggregator.add(alert(302, 330))
+        self.assertTrue(is_new)
+        self.assertEqual([c.id for c in aggregator.flush()], [4])
+        self.assertEqual(aggregator.incident_count, 4)
+
+    def test_incident_log_is_in_close_order(self):
+        """Incidents are logged as they close, so range reads key on their end time."""
+        start = pd.Timestamp('2024-01-01 00:00')
+
+        def alert(alert_id, minute, cause):
+            return {'id': alert_id, 'timestamp': str(start + pd.Timedelta(minutes=minute)),
+                    'reading': {'pH': 7.2, 'turbidity_ntu': 5.0, 'tds_mgl': 200.0, 'temp_celsius': 22.0},
+                    'explanation': {'likely_cause': cause, 'recommended_action': 'Inspect.', 'models_triggered': []},
+                    'severity': 'WARNING'}
+
+        aggregator = IncidentAggregator(gap_seconds=600)
+        with tempfile.TemporaryDirectory() as tmp:
+            log = AlertLog(os.path.join(tmp, 'incidents.ndjson'), time_field=INCIDENT_LOG_TIME_FIELD,
+                           flush_records=1)
+            # A long sewage incident from 00:00 outlives a one-alert thermal incident at 00:05
+            for minute in range(0, 31):
+                cause = 'Thermal Pollution' if minute == 5 else 'Sewage/Sediment'
+                for incident in aggregator.add(alert(minute + 1, minute, cause))[2]:
+                    log.write(incident.to_dict())
+            for incident in aggregator.flush():
+                log.write(incident.to_dict())
+            log.close()
+
+            records = list(AlertLogReader(log.path, INCIDENT_LOG_TIME_FIELD).read())
+            self.assertEqual([r['likely_cause'] for r in records], ['Thermal Pollution', 'Sewage/Sediment'])
+            self.assertEqual(records[1]['start'], str(start))
+            late = AlertLogReader(log.path, INCIDENT_LOG_TIME_FIELD).read(start + pd.Timedelta(minutes=10))
+            self.assertEqual([r['likely_cause'] for r in late], ['Sewage/Sediment'])
+            early = AlertLogReader(log.path, INCIDENT_LOG_TIME_FIELD).read(end=start + pd.Timedelta(minutes=6))
+            self.assertEqual([r['likely_cause'] for r in early], ['Thermal Pollution'])
+
+    def test_alert_log_rotation_and_reader(self):
+        """NDJSON log rotates into gzip segments; reader filters by time and severity."""
+        start = pd.Timestamp('2024-01-01 00:00')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alerts.ndjson')
+            log = AlertLog(path, flush_records=10, max_bytes=4000, keep=100)
+            for i in range(300):
+                log.write({'id': i + 1, 'timestamp': start + pd.Timedelta(minutes=i),
+                           'severity': 'CRITICAL' if i % 10 == 0 else 'WARNING', 'reading': {'pH': 7.0}})
+            log.close()
+
+            reader = AlertLogReader(path)
+            segments = reader.segments()
+            self.assertGreater(len(segments), 3)
+            self.assertTrue(all(str(p).endswith('.ndjson.gz') for p, _, _ in segments))
+            self.assertEqual([r['id'] for r in reader.read()], list(range(1, 301)))
+
+            window = list(reader.read(start + pd.Timedelta(minutes=100), str(start + pd.Timedelta(minutes=149))))
+            self.assertEqual([r['id'] for r in window], list(range(101, 151)))
+            critical = list(reader.read(severity='CRITICAL'))
+            self.assertEqual(len(critical), 30)
+            tail = list(reader.read(start + pd.Timedelta(minutes=295)))
+            self.assertEqual([r['id'] for r in tail], list(range(296, 301)))
+
+            # Reopening appends to the active file; pruning keeps the newest segments
+            log = AlertLog(path, flush_records=1, max_bytes=10 ** 9, keep=2)
+            log.write({'id': 301, 'timestamp': start + pd.Timedelta(minutes=300), 'severity': 'WARNING'})
+            self.assertEqual(list(log.read(start + pd.Timedelta(minutes=300)))[0]['id'], 301)
+            log.rotate()
+            self.assertEqual(len(reader.segments()), 2)
+            self.assertEqual(list(reader.read())[-1]['id'], 301)
+
+        # A reopened file is dated by its first record, not by its mtime (which every append moves)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alerts.ndjson')
+            now = pd.Timestamp.now()
+            for age_hours, rotated in ((2, True), (0, False)):
+                log = AlertLog(path, flush_records=1, max_age=3600)
+                log.write({'id': 1, 'timestamp': now - pd.Timedelta(hours=age_hours)})
+                log.close()
+                log = AlertLog(path, flush_records=1, max_age=3600)
+                log.write({'id': 2, 'timestamp': now})
+                log.close()
+                self.assertEqual(len(AlertLogReader(path).segments()), 1)
+                self.assertEqual(os.path.exists(path), not rotated)
+
+    def test_alert_log_across_runs(self):
+        """A later run over earlier times starts a new segment; ids continue and range reads stay exact."""
+        start = pd.Timestamp('2024-01-01 00:00')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alerts.ndjson')
+            written = []
+            for run_start in (start, start - pd.Timedelta(minutes=5)):  # Each run begins before the last ended
+                log = AlertLog(path, flush_records=3)
+                last = log.last()
+                first_id = last['id'] + 1 if last is not None else 1
+                for i in range(10):
+                    record = {'id': first_id + i, 'timestamp': str(run_start + pd.Timedelta(minutes=i))}
+                    log.write(record)
+                    written.append(record)
+                log.close()
+
+            reader = AlertLogReader(path)
+            self.assertEqual(len(reader.segments()), 1)
+            self.assertEqual([r['id'] for r in reader.read()], list(range(1, 21)))
+            self.assertEqual(reader.last()['id'], 20)
+            for bounds in [(None, start + pd.Timedelta(minutes=9)), (start + pd.Timedelta(minutes=4), None),
+                           (start + pd.Timedelta(minutes=4), start + pd.Timedelta(minutes=4))]:
+                low, high = (pd.Timestamp(b) if b is not None else None for b in bounds)
+                expected = sorted(r['id'] for r in written if (low is None or pd.Timestamp(r['timestamp']) >= low)
+                                  and (high is None or pd.Timestamp(r['timestamp']) <= high))
+                self.assertEqual(sorted(r['id'] for r in reader.read(*bounds)), expected)
+
+        aggregator = IncidentAggregator(first_id=8)
+        alert = {'id': 21, 'timestamp': str(start), 'severity': 'WARNING', 'reading': {'station_id': 's'},
+                 'explanation': {'likely_cause': 'Spill', 'recommended_action': 'Inspect.', 'models_triggered': []}}
+        self.assertEqual(aggregator.add(alert)[0].id, 8)
+        self.assertEqual(aggregator.incident_count, 1)
+
+    # --- Startup Tests ---
+    def test_scoring_imports_stay_light(self):
+        """Scoring modules import without pulling in scikit-learn or matplotlib."""
+        probe = (
+            "import sys, src.model_store, src.station_engine, src.streaming, src.main\n"
+            "print(sorted(m for m in ('sklearn', 'matplotlib', 'joblib') if m in sys.modules))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-c', probe], cwd=root, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], '[]')
+
+    # --- Dashboard Tests ---
+    def test_dashboard_incremental_render(self):
+        """Renderer appends readings, keeps spikes when decimating and renders off-thread."""
+        values = np.zeros(100_000)
+        values[12_345] = 9.0
+        values[67_890] = -9.0
+        keep = minmax_decimate(values, 1000)
+        self.assertLessEqual(len(keep), 1004)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(12_345, keep)
+        self.assertIn(67_890, keep)
+        np.testing.assert_array_equal(minmax_decimate(values[:10], 1000), np.arange(10))
+
+        data = self.simulator.generate_dataset_vectorized(3000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'dashboard.png')
+            renderer = DashboardRenderer(filename=path, max_points=500, background=True)
+            for start in range(0, len(data), 1000):
+                renderer.append(data.iloc[start:start + 1000])
+                renderer.render()
+            row = data.iloc[1500]
+            renderer.add_alert({
+                'timestamp': str(row['timestamp']),
+                'reading': row.to_dict(),
+                'explanation': {'likely_cause': 'Thermal Pollution'}
+            })
+            renderer.close()
+
+            self.assertEqual(len(renderer), 3000)
+            self.assertTrue(os.path.exists(path))
+            self.assertGreaterEqual(renderer.render_count, 1)
+            self.assertLessEqual(len(renderer._lines[0].get_xdata()), 504)
+            self.assertEqual(len(renderer._markers[0].get_xdata()), 1)
+            self.assertIn('Thermal Pollution', renderer._summary.get_text())
+
+            # Reused after close (as on a second run): renders still land
+            os.remove(path)
+            count = renderer.render_count
+            renderer.render()
+            deadline = time.monotonic() + 10
+            while renderer.render_count == count and time.monotonic() < deadline:
+                time.sleep(0.01)
+            renderer.close()
+            self.assertGreater(renderer.render_count, count + 1)
+            self.assertTrue(os.path.exists(path))
+
     # --- Explainer Tests ---
     def test_explainer_branches(self):
         """Test all explanation branches."""
@@ -128,5 +827,488 @@ class TestAdvancedCoverage(unittest.TestCase):
         gen = self.explainer.generate_explanation(pd.Series(cases[0][0]), ['Model A', 'Model B', 'Model C'])
         self.assertEqual(gen['confidence'], 'HIGH')
 
+    def test_explainer_batch_and_station_rules(self):
+        """Batch explanations match per-reading ones; station rules override defaults."""
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({
+            'pH': rng.uniform(5, 10, 500),
+            'turbidity_ntu': rng.uniform(0, 6, 500),
+            'tds_mgl': rng.uniform(100, 500, 500),
+            'temp_celsius': rng.uniform(18, 32, 500)
+        })
+        models = [['Statistical', 'Isolation Forest', 'One-Class SVM' if i % 2 else None] for i in range(500)]
+        batch = self.explainer.generate_explanation(data, models)
+        self.assertEqual(len(batch), 500)
+        for i in range(0, 500, 7):
+            single = self.explainer.generate_explanation(data.iloc[i], models[i])
+            self.assertEqual(batch.iloc[i].to_dict(), single)
+
+        explainer = AlertExplainer(rules={
+            'stations': {'station_001': {
+                'thresholds': {'tds': {'high': 200}},
+                'patterns': [{'when': {'tds': 'HIGH', 'turbidity': 'NORMAL'}, 'cause': 'Salt Intrusion',
+                              'action': 'Check tidal gates.'}]
+            }}
+        })
+        reading = {'pH': 7.2, 'turbidity_ntu': 1.5, 'tds_mgl': 250, 'temp_celsius': 22}
+        self.assertEqual(explainer.generate_explanation(reading, [])['likely_cause'], 'Unknown Anomaly')
+        self.assertEqual(explainer.generate_explanation({**reading, 'station_id': 'station_001'}, [])['likely_cause'],
+                         'Salt Intrusion')
+        frame = pd.DataFrame([{**reading, 'station_id': 'station_000'}, {**reading, 'station_id': 'station_001'}])
+        self.assertEqual(explainer.explain_batch(frame)['likely_cause'].tolist(), ['Unknown Anomaly', 'Salt Intrusion'])
+        frame = pd.DataFrame([{**reading, 'station_id': None}, {**reading, 'station_id': 'station_001'}])
+        self.assertEqual(explainer.explain_batch(frame)['likely_cause'].tolist(), ['Unknown Anomaly', 'Salt Intrusion'])
+
+        with self.assertRaises(ValueError):
+            explainer.set_station_rules('station_002', patterns=[{'when': {'chlorine': 'HIGH'}, 'cause': '', 'action': ''}])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            with open(path, 'w') as f:
+                json.dump({'thresholds': {'temp': {'high': 23.0}}}, f)
+            status = AlertExplainer(rules_file=path).get_parameter_status(pd.Series(reading))
+            self.assertEqual(status['temp'], 'NORMAL')
+            status = AlertExplainer(rules_file=path).get_parameter_status(pd.Series({**reading, 'temp_celsius': 24}))
+            self.assertEqual(status['temp'], 'HIGH')
+
+
+class TestDetectionCascade(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = SensorSimulator(seed=123)
+
+    def test_cascade_early_exit(self):
+        """Cascade stops once the majority is decided without changing the result."""
+        data = self.simulator.generate_dataset_vectorized(900, anomaly_count=40, anomaly_start=400)
+        full = AnomalyDetector(background_retrain=False, cascade=False)
+        full.train_models(data[FEATURE_COLUMNS].iloc[:300])
+        self.assertEqual(set(full.measure_model_costs(full.models.current, full.training_data[:1])),
+                         {'Isolation Forest', 'One-Class SVM'})
+        self.assertEqual(full.cascade_order, DETECTION_CASCADE_ORDER)  # Configured, never timed on install
+        with self.assertRaises(ValueError):
+            AnomalyDetector(cascade_order=['Isolation Forest'])
+
+        window = data[FEATURE_COLUMNS].iloc[:300].to_numpy()
+        cascade = AnomalyDetector(background_retrain=False, cascade=True, full_votes=True)
+        cascade.install_models(full.models.current, full.training_data, window)
+        full.install_models(full.models.current, full.training_data, window)
+        for i in range(300, 900):
+            expected = full.detect_anomaly(data.iloc[i])
+            result = cascade.detect_anomaly(data.iloc[i])
+            self.assertEqual(result['is_anomaly'], expected['is_anomaly'])
+            self.assertEqual(result['models_run'][0], 'Rolling Stats')
+            if result['is_anomaly']:
+                self.assertEqual(result['models_triggered'], expected['models_triggered'])
+            else:
+                self.assertLessEqual(len(result['models_run']), 3)
+            for name, vote in zip(MODEL_NAMES, result['votes']):
+                self.assertEqual(vote is None, name not in result['models_run'])  # Skipped, not a False vote
+        skipped = cascade.cascade_order[-1]
+        self.assertLess(cascade.model_calls[skipped], full.model_calls[skipped])
+
+        # Without full votes a flagged reading may stop after two agreeing votes
+        quick = cascade.detect_batch(data.iloc[300:], history=data.iloc[200:300], full_votes=False)
+        reference = full.detect_batch(data.iloc[300:], history=data.iloc[200:300])
+        np.testing.assert_array_equal(quick['is_anomaly'].to_numpy(), reference['is_anomaly'].to_numpy())
+        self.assertTrue((quick['models_run'].map(len) >= 2).all())
+        skipped_rows = quick['models_run'].map(lambda run: skipped not in run).to_numpy()
+        self.assertTrue(skipped_rows.any())
+        column = 'vote_if' if skipped == 'Isolation Forest' else 'vote_svm'
+        self.assertTrue(quick[column][skipped_rows].isna().all())
+        self.assertFalse(quick[column][~skipped_rows].isna().any())
+
+
+class TestMonitoringLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = use_temporary_data_dir(self)
+
+    def test_rejected_cause_collects_every_vote(self):
+        """A cause that needs unanimity is scored with every vote, even when the cascade stops at a majority."""
+        data = SensorSimulator(seed=123).generate_dataset_vectorized(300, anomaly_count=0)
+        system = WAVESystem(dashboard=False, feedback=False, continual_training=False)
+        self.addCleanup(system.feedback_ledger.close)
+        system.detector.cascade, system.detector.full_votes = True, False
+        system.detector.train_models(data[FEATURE_COLUMNS])
+
+        spill = Reading.from_mapping({'timestamp': pd.Timestamp('2024-01-02'), 'pH': 13.5, 'turbidity_ntu': 400.0,
+                                      'tds_mgl': 1900.0, 'temp_celsius': 22.0})
+        cause = system.explainer.likely_cause(spill)
+        for i in range(20):
+            system.feedback_ledger.record(i, 'FALSE_POSITIVE', '2024-01-01', None, cause)
+        self.assertEqual(system.learner.required_votes(None, cause), len(MODEL_NAMES))
+
+        result, required = system._detect(spill)
+        self.assertEqual(required, len(MODEL_NAMES))
+        self.assertEqual(result['votes'], [True] * len(MODEL_NAMES))  # Not suppressed
+        self.assertIn(None, system.detector.detect_anomaly(spill)['votes'])  # The cascade alone stops at two
+
+
+class TestCompactRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = SensorSimulator(seed=123)
+        self.explainer = AlertExplainer()
+
+    def test_compact_records(self):
+        """Reading blocks and compact records flow through validation, detection and storage."""
+        data = self.simulator.generate_dataset_vectorized(300, anomaly_count=10)
+        block = to_block(data)
+        readings = list(iter_readings(block))
+        self.assertEqual(len(readings), 300)
+        self.assertEqual(readings[5]['tds_mgl'], data['tds_mgl'].iloc[5])
+        self.assertEqual(readings[5].timestamp, data['timestamp'].iloc[5])
+        self.assertEqual(readings[5].get('dataset_type'), data['dataset_type'].iloc[5])
+        self.assertIsNone(readings[5].get('station_id'))
+
+        # Station ids longer than the default field survive the round trip untruncated
+        long_id = 'river-north-station-12'
+        long_block = to_block(data.assign(station_id=long_id))
+        self.assertEqual(next(iter_readings(long_block)).station_id, long_id)
+        self.assertEqual(to_block([Reading(readings[0].timestamp, readings[0].values, long_id)])['station_id'][0],
+                         long_id)
+        self.assertIs(to_block(long_block), long_block)
+        self.assertEqual(to_block(data).dtype, READING_DTYPE)
+        np.testing.assert_array_equal(DataValidator().validate_frame(long_block)[0],
+                                      DataValidator().validate_frame(data)[0])
+        self.assertEqual(block_frame(long_block)['station_id'].iloc[0], long_id)
+
+        # Blocks go through validation and detection like DataFrames
+        np.testing.assert_array_equal(DataValidator().validate_frame(block)[0],
+                                      DataValidator().validate_frame(data)[0])
+        detector = AnomalyDetector(background_retrain=False)
+        detector.train_models(data[FEATURE_COLUMNS].iloc[:200])
+        history = data.iloc[100:200]
+        from_block = detector.detect_batch(block[200:], history)
+        from_frame = detector.detect_batch(data.iloc[200:], history)
+        np.testing.assert_array_equal(from_block['is_anomaly'].to_numpy(), from_frame['is_anomaly'].to_numpy())
+        single = detector.detect_anomaly(readings[200], data.iloc[100:200])
+        self.assertEqual(single['votes'], detector.detect_anomaly(data.iloc[200], data.iloc[100:200])['votes'])
+
+        explanation = self.explainer.generate_explanation(readings[0], ['Rolling Stats', 'Isolation Forest', None])
+        alert = build_alert(1, readings[0], explanation)
+        record = alert.to_dict()
+        self.assertEqual(record['timestamp'], str(data['timestamp'].iloc[0]))
+        self.assertEqual(record['reading']['pH'], data['pH'].iloc[0])
+        self.assertEqual(alert['explanation']['likely_cause'], explanation['likely_cause'])
+        self.assertEqual(json.loads(json.dumps(record)), record)
+        self.assertEqual(IncidentAggregator().add(alert)[0].alert_count, 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = ColumnarStorage(root=tmp)
+            for reading in readings[:50]:
+                storage.append_reading(reading)
+            storage.append_frame(block[50:])
+            stored = storage.read_range()
+            self.assertEqual(len(stored), 300)
+            self.assertEqual(stored['dataset_type'].tolist(), data['dataset_type'].tolist())
+
+
+class TestInferenceKernel(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = SensorSimulator(seed=123)
+
+    def test_inference_kernel_matches_sklearn(self):
+        """The NumPy kernel reproduces scikit-learn's decisions and votes."""
+        data = self.simulator.generate_dataset_vectorized(700, anomaly_count=40, anomaly_start=300)
+        X = data[FEATURE_COLUMNS].to_numpy()
+        for backend in ('exact', 'sgd'):
+            detector = AnomalyDetector(background_retrain=False, svm_backend=backend)
+            detector.train_models(data[FEATURE_COLUMNS].iloc[:300])
+            kernel = detector.export_kernel()
+            models = detector.models.current
+            scaled = kernel.transform(X)
+            np.testing.assert_array_equal(scaled, models.scaler.transform(data[FEATURE_COLUMNS]))
+            np.testing.assert_array_equal(kernel.if_decision(scaled), models.isolation_forest.decision_function(scaled))
+            np.testing.assert_allclose(kernel.svm_decision(scaled), models.one_class_svm.decision_function(scaled),
+                                       atol=1e-9)
+            np.testing.assert_array_equal(kernel.if_votes(scaled), models.isolation_forest.predict(scaled) == -1)
+            np.testing.assert_array_equal(kernel.svm_votes(scaled), models.one_class_svm.predict(scaled) == -1)
+            self.assertEqual(kernel.score(X[350]), (bool(kernel.if_votes(scaled[350:351])[0]),
+                                                    bool(kernel.svm_votes(scaled[350:351])[0])))
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'kernel.npz')
+                kernel.save(path)
+                loaded = InferenceKernel.load(path)
+                np.testing.assert_array_equal(loaded.if_decision(scaled), kernel.if_decision(scaled))
+                np.testing.assert_array_equal(loaded.svm_decision(scaled), kernel.svm_decision(scaled))
+
+            # Single-reading detection gives the same votes with and without the kernel
+            plain = AnomalyDetector(background_retrain=False, cascade=False, use_kernel=False)
+            fast = AnomalyDetector(background_retrain=False, cascade=False, use_kernel=True)
+            window = X[:300]
+            for target in (plain, fast):
+                target.install_models(models, detector.training_data, window)
+            for i in range(300, 700):
+                self.assertEqual(fast.detect_anomaly(data.iloc[i])['votes'], plain.detect_anomaly(data.iloc[i])['votes'])
+
+        # Sensitivity recalibration moves the kernel's threshold with the forest's
+        detector.update_contamination_rate(0.2)
+        models = detector.models.current
+        np.testing.assert_array_equal(detector.export_kernel().if_votes(scaled),
+                                      models.isolation_forest.predict(scaled) == -1)
+
+    def test_inference_kernel_parity_at_thresholds(self):
+        """Readings on split and decision thresholds get the same decisions from kernel and scikit-learn."""
+        data = self.simulator.generate_dataset_vectorized(300, anomaly_count=0)
+        detector = AnomalyDetector(background_retrain=False)
+        detector.train_models(data[FEATURE_COLUMNS])
+        models = detector.models.current
+        forest, kernel = models.isolation_forest, detector.export_kernel()
+
+        # Tree walks cast readings to float32: sit on split thresholds and one float32/float64 step either side
+        rng = np.random.default_rng(0)
+        rows = []
+        for estimator in forest.estimators_[:25]:
+            tree = estimator.tree_
+            for node in np.flatnonzero(tree.children_left != -1)[:6]:
+                threshold = tree.threshold[node]
+                single = np.float32(threshold)
+                steps = (np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf),
+                         np.nextafter(single, np.float32(-np.inf)), np.nextafter(single, np.float32(np.inf)))
+                for value in (threshold, single) + steps:
+                    row = detector.training_data[rng.integers(len(detector.training_data))].copy()
+                    row[tree.feature[node]] = value
+                    rows.append(row)
+        X = np.array(rows)
+        np.testing.assert_array_equal(kernel.if_decision(X), forest.decision_function(X))
+        np.testing.assert_array_equal(kernel.if_votes(X), forest.predict(X) == -1)
+
+        # Thresholds set to the readings' own scores put decisions exactly on zero
+        scores = forest.score_samples(X)
+        for offset in scores[:40]:
+            shifted = copy.copy(forest)
+            shifted.offset_ = offset
+            np.testing.assert_array_equal(kernel.with_if_offset(offset).if_votes(X), shifted.predict(X) == -1)
+
+        decision = models.one_class_svm.decision_function(X)
+        clear = np.abs(decision) > 1e-9  # libsvm's last-bit rounding differs from NumPy's
+        np.testing.assert_array_equal(kernel.svm_votes(X)[clear], (models.one_class_svm.predict(X) == -1)[clear])
+
+        # Models the kernel can't read are scored with scikit-learn
+        with mock.patch('src.inference._svm_gamma', side_effect=AttributeError('_gamma')):
+            fallback = AnomalyDetector(background_retrain=False)
+            fallback.train_models(data[FEATURE_COLUMNS])
+        self.assertFalse(fallback.use_kernel)
+        self.assertEqual(fallback.detect_anomaly(data.iloc[0])['is_anomaly'],
+                         detector.detect_anomaly(data.iloc[0])['is_anomaly'])
+
+        # ...and saved without kernel.npz; a failed save leaves no partial version
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ModelStore(root=tmp)
+            with mock.patch('src.inference._svm_gamma', side_effect=AttributeError('_gamma')):
+                version = store.save(fallback).name
+                with mock.patch('src.model_store.np.save', side_effect=OSError('disk full')):
+                    with self.assertRaises(OSError):
+                        store.save(fallback)
+            self.assertFalse((Path(tmp) / version / 'kernel.npz').exists())
+            self.assertEqual(sorted(os.listdir(tmp)), ['LATEST', version])
+            restored = AnomalyDetector(background_retrain=False)
+            store.load_into(restored)
+            self.assertEqual(restored.detect_anomaly(data.iloc[0])['is_anomaly'],
+                             fallback.detect_anomaly(data.iloc[0])['is_anomaly'])
+
+
+class TestContinualTraining(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = SensorSimulator(seed=123)
+        self.data_dir = use_temporary_data_dir(self)
+
+    def test_continual_training(self):
+        """Bounded reservoir, drift monitor and drift-triggered refits."""
+        # The reservoir stays bounded and keeps equal shares of the newest strata
+        reservoir = TrainingReservoir(capacity=300, stratum_seconds=3600, max_strata=3, seed=1)
+        start = pd.Timestamp('2024-01-01')
+        for hour in range(5):
+            values = np.full((500, len(FEATURE_COLUMNS)), float(hour))
+            stamps = start + pd.to_timedelta(hour * 60 + np.arange(500) % 60, unit='min')
+            reservoir.add_block(values, stamps)
+        self.assertEqual(len(reservoir), 300)
+        self.assertEqual(sorted(np.unique(reservoir.sample()[:, 0]).tolist()), [2.0, 3.0, 4.0])
+        self.assertEqual(sorted(reservoir.counts.values()), [100, 100, 100])
+        for stratum, rows in reservoir._rows.items():  # Per-stratum row lists track the rows held
+            self.assertEqual(sorted(rows), np.flatnonzero(reservoir.strata[:len(reservoir)] == stratum).tolist())
+        self.assertFalse(reservoir.add(np.zeros(len(FEATURE_COLUMNS)), start))  # Older than the kept strata
+
+        # The drift statistic stays quiet on stationary data and fires on a shift
+        data = self.simulator.generate_dataset_vectorized(2400, anomaly_count=0)
+        data = data.sample(frac=1, random_state=0, ignore_index=True)  # No diurnal cycle within the test
+        values = data[FEATURE_COLUMNS].to_numpy()
+        monitor = DriftMonitor(half_life=100)
+        monitor.reset(values[:800])
+        monitor.update(values[800:1600])
+        self.assertFalse(monitor.drifted())
+        shifted = values[1600:] + np.array([0.0, 0.0, 0.0, 3.0])
+        for row in shifted[:400]:
+            monitor.update(row)
+        self.assertTrue(monitor.drifted())
+        self.assertEqual(monitor.columns(), ['temp_celsius'])
+
+        # Drift refits the detector on the reservoir sample
+        detector = AnomalyDetector(background_retrain=False)
+        detector.train_models(data[FEATURE_COLUMNS].iloc[:800])
+        trainer = ContinualTraining(detector, TrainingReservoir(capacity=1000), DriftMonitor(half_life=100))
+        trainer.seed(data.iloc[:800])
+        block = to_block(data.iloc[800:1600])
+        self.assertFalse(trainer.observe_block(block, detector.detect_batch(block)['is_anomaly'].to_numpy()))
+        version = detector.models.version
+        refitted = False
+        for reading in iter_readings(to_block(data.iloc[1600:].assign(temp_celsius=shifted[:, 3]))):
+            refitted = trainer.observe(reading, detector.detect_anomaly(reading)['is_anomaly']) or refitted
+        self.assertTrue(refitted)
+        self.assertGreater(detector.models.version, version)
+        self.assertEqual(detector.retrain_metrics[-1]['mode'], 'full')
+        self.assertLessEqual(len(detector.training_data), 1000)
+        self.assertEqual(trainer.refits[0]['columns'], ['temp_celsius'])
+
+        # After a warm start the training rows are dated now, not 1970
+        warm = ContinualTraining(detector, TrainingReservoir(capacity=1000, stratum_seconds=3600))
+        warm.seed_from_detector()
+        self.assertEqual(list(warm.reservoir.counts), [pd.Timestamp.now().value // warm.reservoir.stratum_ns])
+
+    def test_sensitivity_change_keeps_pending_refit(self):
+        """A sensitivity change never cancels a refit; it ends up applied to the refitted models."""
+        data = self.simulator.generate_dataset_vectorized(900, anomaly_count=0)
+        for recalibrate in (True, False):
+            detector = AnomalyDetector(recalibrate_threshold=recalibrate)
+            detector.train_models(data[FEATURE_COLUMNS].iloc[:300])
+
+            # Queued behind other work: the change lands before the refit starts
+            gate = threading.Event()
+            detector._run_retrain(lambda requested_at: gate.wait(), background=True)
+            detector.refit_models(data.iloc[300:700], background=True)
+            detector.update_contamination_rate(0.1)
+            gate.set()
+            detector.wait_for_retrain()
+            self.assertEqual(len(detector.training_data), 400)
+            self.assertEqual(detector.isolation_forest.contamination, 0.1)
+            self.assertIn('full', [entry['mode'] for entry in detector.retrain_metrics])
+
+            # Made while the refit is fitting: applied on top of the new models
+            fit_models = detector._fit_models
+
+            def fit_then_change(*args):
+                models = fit_models(*args)
+                detector.update_contamination_rate(0.12)
+                return models
+
+            with mock.patch.object(detector, '_fit_models', fit_then_change):
+                detector.refit_models(data.iloc[400:900], background=False)
+            self.assertEqual(len(detector.training_data), 500)
+            self.assertEqual(detector.isolation_forest.contamination, 0.12)
+            refit = IsolationForest(contamination=0.12, random_state=42).fit(detector.training_data)
+            np.testing.assert_array_equal(detector.isolation_forest.predict(detector.training_data),
+                                          refit.predict(detector.training_data))
+
+    def test_out_of_core_training(self):
+        """Chunked training matches in-memory training and bounds the sample."""
+        data = self.simulator.generate_dataset_vectorized(3000, anomaly_count=0)
+        chunks = [data.iloc[i:i + 700] for i in range(0, 3000, 700)]
+
+        # With no more rows than the sample size, the result matches in-memory training
+        streamed = AnomalyDetector(background_retrain=False)
+        stats = streamed.train_models_streaming(iter(chunks), sample_size=5000)
+        reference = AnomalyDetector(background_retrain=False)
+        reference.train_models(data[FEATURE_COLUMNS])
+        self.assertEqual((stats['rows'], stats['chunks'], stats['sample_rows']), (3000, 5, 3000))
+        np.testing.assert_allclose(streamed.scaler.mean_, reference.scaler.mean_, rtol=1e-12)
+        np.testing.assert_allclose(streamed.scaler.scale_, reference.scaler.scale_, rtol=1e-12)
+        np.testing.assert_allclose(streamed.training_data, reference.training_data, atol=1e-9)
+        np.testing.assert_array_equal(streamed.rolling_detector.window_values(),
+                                      reference.rolling_detector.window_values())
+
+        # Larger histories are subsampled uniformly; the scaler still sees every row
+        sampled = AnomalyDetector(background_retrain=False)
+        stats = sampled.train_models_streaming((to_block(chunk) for chunk in chunks), sample_size=500)
+        self.assertEqual(stats['sample_rows'], 500)
+        self.assertEqual(len(sampled.training_data), 500)
+        np.testing.assert_allclose(sampled.scaler.mean_, reference.scaler.mean_, rtol=1e-12)
+        self.assertTrue(sampled.detect_batch(data.iloc[-100:])['is_anomaly'].mean() < 0.5)
+        with self.assertRaises(ValueError):
+            AnomalyDetector(background_retrain=False).train_models_streaming(iter([]))
+
+        sample = StreamingSample(100, features=1, seed=0)
+        for offset in range(0, 1000, 64):
+            sample.add(np.arange(offset, min(offset + 64, 1000), dtype=float)[:, None])
+        self.assertEqual((len(sample), sample.seen), (100, 1000))
+        self.assertEqual(len(np.unique(sample.sample())), 100)
+        self.assertGreater(sample.sample().max(), 100)  # Later rows replace early ones
+
+        # The CLI trains out of core from the columnar store, per station
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = ColumnarStorage(root=os.path.join(tmp, 'columnar'))
+            for sid, frame in SensorSimulator(seed=5).generate_station_streams(2, 600).items():
+                storage.append_frame(frame)
+            storage.flush()
+            self.assertEqual(cli_main(['train', '--columnar', os.path.join(tmp, 'columnar'),
+                                       '--station', 'station_001', '--chunk-size', '100',
+                                       '--models-dir', os.path.join(tmp, 'models')]), 0)
+            restored = AnomalyDetector(background_retrain=False)
+            ModelStore(os.path.join(tmp, 'models')).load_into(restored)
+            self.assertTrue(500 < len(restored.training_data) <= 600)  # One station's valid readings
+
+
+class TestCommandLine(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = use_temporary_data_dir(self)
+
+    def test_cli_train_and_score(self):
+        """CLI trains a model store and scores a CSV into the alert log."""
+        sim = SensorSimulator(seed=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.csv')
+            readings = os.path.join(tmp, 'readings.csv')
+            scored = os.path.join(tmp, 'scored.csv')
+            sim.generate_dataset_vectorized(300, anomaly_count=0).to_csv(history, index=False)
+            sim.generate_dataset_vectorized(500, anomaly_count=10).to_csv(readings, index=False)
+            models = ['--models-dir', os.path.join(tmp, 'models')]
+            logs = ['--alerts-log', os.path.join(tmp, 'alerts.ndjson'),
+                    '--incidents-log', os.path.join(tmp, 'incidents.ndjson')]
+
+            self.assertEqual(cli_main(['train', '--input', history] + models), 0)
+            self.assertEqual(cli_main(['score', '--input', readings, '--output', scored,
+                                       '--batch-size', '128'] + models + logs), 0)
+            result = pd.read_csv(scored)
+            self.assertEqual(len(result), 500)
+            self.assertTrue({'valid', 'is_anomaly', 'models_triggered'} <= set(result.columns))
+            alerts = list(AlertLogReader(os.path.join(tmp, 'alerts.ndjson')).read())
+            self.assertEqual(len(alerts), int(result['is_anomaly'].sum()))
+
+            # Station workers score a one-station file exactly like the in-process stream;
+            # alert ids continue from the existing log
+            self.assertEqual(cli_main(['score', '--input', readings, '--output', scored, '--workers', '1',
+                                       '--batch-size', '128'] + models + logs), 0)
+            pd.testing.assert_series_equal(pd.read_csv(scored)['is_anomaly'], result['is_anomaly'])
+            ids = [alert['id'] for alert in AlertLogReader(os.path.join(tmp, 'alerts.ndjson')).read()]
+            self.assertEqual(ids, list(range(1, 2 * len(alerts) + 1)))
+
+        self.assertTrue((self.data_dir / 'models').is_dir())  # Not the project's data directory
+
+        # Station workers score each station at its sensitivity from the feedback ledger
+        with tempfile.TemporaryDirectory() as tmp:
+            streams = SensorSimulator(seed=4).generate_station_streams(2, 400)
+            history = os.path.join(tmp, 'history.csv')
+            readings = os.path.join(tmp, 'readings.csv')
+            pd.concat([df.iloc[:300] for df in streams.values()]).to_csv(history, index=False)
+            pd.concat([df.iloc[300:] for df in streams.values()]).sort_values('timestamp').to_csv(readings, index=False)
+            ledger = FeedbackLedger(os.path.join(tmp, 'feedback.ndjson'), fsync=False)
+            ledger.record_adjustment(0.09, station_id='station_001')
+            ledger.close()
+            models = ['--models-dir', os.path.join(tmp, 'models')]
+            self.assertEqual(cli_main(['train', '--input', history] + models), 0)
+            update = MultiStationEngine.update_contamination_rate
+            with mock.patch.object(MultiStationEngine, 'update_contamination_rate', autospec=True,
+                                   side_effect=update) as applied:
+                self.assertEqual(cli_main(['score', '--input', readings, '--workers', '1', '--no-explain',
+                                           '--feedback-log', os.path.join(tmp, 'feedback.ndjson')] + models), 0)
+            self.assertEqual([call.args[1] for call in applied.call_args_list], [{'station_001': 0.09}])
+        with self.assertRaises(SystemExit):
+            cli_main(['score'])
+        self.assertEqual(cli_main(['simulate', '--stations', '1', '--workers', '2']), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,9 @@ import unittest
 import pandas as pd
 import numpy as np
 from src.simulator import SensorSimulator
-from src.pipeline import DataValidator
+from src.pipeline import (
+    DataValidator, spike_columns, REASON_OK, REASON_MISSING, REASON_ABOVE_RANGE, REASON_STUCK, REASON_SPIKE
+)
 from src.ml_engine import AnomalyDetector
 from src.explainer import AlertExplainer
 from src.config import BASELINE_PH, BASELINE_TURBIDITY
@@ -45,6 +47,55 @@ class TestWAVEComponents(unittest.TestCase):
         })
         self.assertFalse(self.validator.validate_reading(invalid_reading))
 
+    def test_validator_frame(self):
+        """Vectorized validation agrees with validate_reading and reports reasons."""
+        df = self.simulator.generate_dataset_vectorized(300)
+        df.loc[10, 'pH'] = 15.0
+        df.loc[20, 'tds_mgl'] = np.nan
+        df.loc[100:115, 'temp_celsius'] = 22.0  # Stuck sensor
+        df.loc[200, 'turbidity_ntu'] = 600.0     # In range, but a spike
+
+        mask, reasons = self.validator.validate_frame(df)
+        self.assertEqual(reasons.loc[10, 'pH'], REASON_ABOVE_RANGE)
+        self.assertEqual(reasons.loc[20, 'tds_mgl'], REASON_MISSING)
+        self.assertEqual(list(reasons.loc[100:115, 'temp_celsius'] == REASON_STUCK), [False] * 10 + [True] * 6)
+        self.assertEqual(reasons.loc[200, 'turbidity_ntu'], REASON_SPIKE)
+        self.assertEqual(reasons.loc[11, 'pH'], REASON_OK)  # Recovery after an invalid value
+        for i in [0, 10, 20, 50]:
+            self.assertEqual(bool(mask[i]), self.validator.validate_reading(df.iloc[i]))
+        self.assertEqual(len(DataValidator().filter_valid(df.iloc[:50])), 48)
+
+    def test_validator_spikes_reach_detection(self):
+        """A contamination onset is flagged as a spike but still scored and explained, never trained on."""
+        df = self.simulator.generate_dataset_vectorized(100)
+        df.loc[50:59, 'turbidity_ntu'] = 350.0  # Onset at 50, recovery at 60
+
+        mask, reasons = self.validator.validate_frame(df)
+        self.assertEqual(reasons.loc[50, 'turbidity_ntu'], REASON_SPIKE)
+        self.assertEqual(reasons.loc[60, 'turbidity_ntu'], REASON_SPIKE)
+        self.assertTrue(mask[50] and mask[60])
+        trainable = self.validator.training_mask(mask, reasons)
+        self.assertFalse(trainable[50] or trainable[60])
+        self.assertTrue(trainable[55])
+        self.assertEqual(len(DataValidator().filter_valid(df, training=True)), 98)
+
+        spikes = spike_columns(reasons)
+        self.assertEqual(spikes[50], ['turbidity_ntu'])
+        explanation = self.explainer.generate_explanation(df.iloc[50], [], spikes=spikes[50])
+        self.assertEqual(explanation['sudden_changes'], ['turbidity jumped'])
+        batch = self.explainer.explain_batch(df.iloc[49:52], spikes=spikes[49:52])
+        self.assertEqual(batch['sudden_changes'].tolist(), [[], ['turbidity jumped'], []])
+
+    def test_validator_stuck_sensor_across_blocks(self):
+        """Flatlines spanning block boundaries are still detected."""
+        flat = pd.DataFrame([{'pH': 7.1, 'turbidity_ntu': 1.5, 'tds_mgl': 200.0, 'temp_celsius': 22.0}] * 6)
+        first, _ = self.validator.validate_frame(flat)
+        second, reasons = self.validator.validate_frame(flat)
+        self.assertTrue(first.all())
+        self.assertEqual(list(second), [True] * 4 + [False] * 2)
+        self.assertTrue((reasons.iloc[-1] == REASON_STUCK).all())
+        self.assertTrue((self.validator.detect_sensor_issues(pd.concat([flat, flat])).iloc[-1] == REASON_STUCK).all())
+
     def test_ml_engine_training(self):
         """Test if models can be trained without error."""
         # Generate dummy data